@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+import aiohttp
+
+
+logger = logging.getLogger("fastsupport.attachments")
+
+DOWNLOAD_CHUNK = 64 * 1024
+
+
+class AttachmentStore:
+    """
+    Stockage local des pièces jointes adressé par contenu (SHA-256).
+
+    - un fichier identique posté dans plusieurs tickets n'est stocké qu'une fois
+      (`<root>/ab/cd/<sha256>`) ;
+    - les téléchargements sont limités à `concurrency` en parallèle et streamés
+      par morceaux (hash calculé à la volée, mémoire bornée) ;
+    - au-delà de `max_bytes`, les fichiers les moins récemment utilisés (mtime,
+      rafraîchie à chaque réutilisation) sont supprimés.
+    """
+
+    def __init__(self, root: str, max_bytes: int, concurrency: int = 4):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._sem = asyncio.Semaphore(concurrency)
+        self._session = None
+        self._total = None          # taille totale connue (calculée au premier usage)
+        self._evict_lock = asyncio.Lock()
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300))
+        return self._session
+
+    def _scan_total(self) -> int:
+        total = 0
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith("tmp_"):
+                    continue
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    async def save(self, attachment) -> dict:
+        """
+        Télécharge `attachment` (discord.Attachment) dans le store et retourne sa référence
+        {sha256, size, filename, content_type}. Ne lève pas : sha256 vaut None en cas d'échec.
+        """
+        ref = {
+            "sha256": None,
+            "size": attachment.size,
+            "filename": attachment.filename,
+            "content_type": attachment.content_type,
+        }
+        if attachment.size and attachment.size > self.max_bytes:
+            logger.warning("Pièce jointe %s trop volumineuse pour le store (%d octets)", attachment.filename, attachment.size)
+            return ref
+        loop = asyncio.get_running_loop()
+        async with self._sem:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                if self._total is None:
+                    self._total = await loop.run_in_executor(None, self._scan_total)
+                ref["sha256"], added = await self._download(attachment.url)
+            except Exception:
+                logger.exception("Impossible d'archiver la pièce jointe %s", attachment.filename)
+                return ref
+        if added:
+            self._total += added
+            if self._total > self.max_bytes:
+                await self.evict()
+        return ref
+
+    async def _download(self, url: str):
+        """Retourne (sha256, octets ajoutés au store)."""
+        loop = asyncio.get_running_loop()
+        session = await self._get_session()
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(prefix="tmp_", dir=self.root)
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK):
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        await loop.run_in_executor(None, f.write, chunk)
+            digest = hasher.hexdigest()
+            final = self.path_for(digest)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            # création exclusive du chemin final : si deux sauvegardes du même contenu se croisent,
+            # une seule l'ajoute (et compte sa taille dans _total)
+            try:
+                os.link(tmp_path, final)
+            except FileExistsError:
+                # déjà stocké : on rafraîchit juste la date d'usage (LRU)
+                os.utime(final, None)
+                return digest, 0
+            except OSError:
+                # système de fichiers sans liens physiques
+                if os.path.exists(final):
+                    os.utime(final, None)
+                    return digest, 0
+                os.replace(tmp_path, final)
+            return digest, size
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+
+    def _evict_sync(self, target: int) -> tuple:
+        entries = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith("tmp_"):
+                    continue
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+        total = sum(e[1] for e in entries)
+        removed = freed = 0
+        for _, size, p in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+            removed += 1
+        return total, removed, freed
+
+    async def evict(self):
+        """Supprime les fichiers les moins récemment utilisés jusqu'à 90% de `max_bytes`."""
+        async with self._evict_lock:
+            if self._total is not None and self._total <= self.max_bytes:
+                return
+            loop = asyncio.get_running_loop()
+            t0 = time.perf_counter()
+            self._total, removed, freed = await loop.run_in_executor(None, self._evict_sync, int(self.max_bytes * 0.9))
+            logger.info("Éviction du store de pièces jointes: %d fichier(s), %d octets libérés en %.0f ms",
+                        removed, freed, (time.perf_counter() - t0) * 1000)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,295 @@
+"""
+Micro-benchmarks hors-ligne des chemins chauds de support.py (aucun accès réseau).
+
+    python benchmarks/bench_support.py                      # échelles par défaut
+    python benchmarks/bench_support.py --guilds 1000 --quick
+    python benchmarks/bench_support.py --only slugify,get_gcfg
+    python benchmarks/bench_support.py --fail-on-regression 20
+
+Chaque exécution écrit benchmarks/results/<date>.json et se compare au résultat
+précédent (ou à --compare FICHIER). Avec --fail-on-regression PCT, le code de sortie
+est 1 si un benchmark est plus lent de PCT % ou plus.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+
+NAMES = ["Éloïse", "razox8", "Ça va pas ?!", "ゆうき", "  Jean   Dupont ", "x" * 120, "Gestion Staff", "Partenariat"]
+
+
+def load_support(workdir: str):
+    """
+    Importe support.py avec un token factice et la config `workdir`/guild_config.json
+    (vide si absente ; l'import ne contacte pas Discord : seul bot.run le ferait).
+    """
+    os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+    os.environ["FASTSUPPORT_CONFIG"] = os.path.join(workdir, "guild_config.json")
+    os.environ["FASTSUPPORT_TRACE_FILE"] = ""
+    os.environ["FASTSUPPORT_RECORD_FILE"] = ""
+    # startup_load --active : les guildes absentes de bot.guilds ne doivent pas être marquées quittées
+    os.environ["FASTSUPPORT_ARCHIVE_AFTER_DAYS"] = "0"
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    import support
+    logging.disable(logging.INFO)
+    return support
+
+
+# ---------------- Données synthétiques ----------------
+def make_guild_cfg(support, guild, tickets: int, staff_roles: int = 20, categories: int = 25):
+    from config_model import Category, Ticket
+    gcfg = support.get_gcfg({}, guild.id)
+    gcfg.staff_role_ids = tuple(guild.add_role(f"staff-{i}").id for i in range(staff_roles))
+    for i in range(categories - len(gcfg.categories)):
+        gcfg.own_categories().append(Category(f"Catégorie {i}", "Demande générée", "📁",
+                                        close_role_ids=[guild.add_role(f"close-{i}-{j}").id for j in range(3)]))
+    labels = [c.label for c in gcfg.categories]
+    ot = gcfg.open_tickets
+    for i in range(tickets):
+        cid = 10 ** 18 + i
+        ot[cid] = Ticket(cid, owner_id=5 * 10 ** 17 + i, category=labels[i % len(labels)], message_id=2 * 10 ** 18 + i)
+    return gcfg
+
+
+def make_config(support, guilds: int, tickets: int):
+    """GuildStore (fichier support.CONFIG_FILE) avec `guilds` guildes, toutes chargées."""
+    from fakes import FakeGuild
+    from config_model import GuildConfig
+    from config_store import GuildStore
+    template = make_guild_cfg(support, FakeGuild(), tickets)
+    blob = json.dumps(template.to_dict())
+    store = GuildStore(support.CONFIG_FILE)
+    for i in range(guilds):
+        store[10 ** 17 + i] = GuildConfig.from_dict(json.loads(blob))
+    return store
+
+
+def make_ticket_embed():
+    import discord
+    embed = discord.Embed(title="🎫 Ticket", color=discord.Color.from_rgb(54, 57, 63))
+    embed.add_field(name="\u200b", value="• Ticket ouvert par <@1> — catégorie **Partenariat**", inline=False)
+    embed.add_field(name="\u200b", value="---------------------------------------------", inline=False)
+    embed.add_field(name="\u200b", value="• Le ticket est en attente de prise en charge.", inline=False)
+    embed.add_field(name="\u200b", value="• Merci de patienter.", inline=False)
+    return embed
+
+
+# ---------------- Mesure ----------------
+def measure(fn, min_time: float = 0.2, repeat: int = 5) -> dict:
+    """Calibre le nombre d'itérations pour durer >= min_time, puis répète `repeat` fois."""
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or n >= 10 ** 7:
+            break
+        n = max(n * 2, int(n * min_time / max(elapsed, 1e-9) * 1.1))
+    samples = [elapsed / n]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        samples.append((time.perf_counter() - t0) / n)
+    return {
+        "iterations": n,
+        "min_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+    }
+
+
+def build_benchmarks(support, args):
+    from fakes import FakeCategory, FakeGuild, FakeInteraction, FakeMember
+
+    benches = {}
+
+    # --- slugify ---
+    names = NAMES * 4
+    benches["slugify"] = lambda: [support.slugify(n) for n in names]
+
+    # --- set_status_in_embed ---
+    embed = make_ticket_embed()
+    statuses = ["• Le ticket est pris en charge par <@2>.", "• Le ticket est en attente de prise en charge."]
+    state = {"i": 0}
+
+    def bench_status():
+        state["i"] ^= 1
+        support.set_status_in_embed(embed, statuses[state["i"]])
+    benches["set_status_in_embed"] = bench_status
+
+    # --- get_gcfg sur une config à N guildes ---
+    cfg = make_config(support, args.guilds, 0)
+    gids = [int(g) for g in random.Random(1).sample(list(cfg), min(1000, len(cfg)))]
+
+    def bench_gcfg():
+        for gid in gids:
+            support.get_gcfg(cfg, gid)
+    benches[f"get_gcfg[x{len(gids)}, {args.guilds} guildes]"] = bench_gcfg
+
+    fresh = {"next": 9 * 10 ** 17}
+
+    def bench_gcfg_new():
+        fresh["next"] += 1
+        support.get_gcfg(cfg, fresh["next"])
+    benches["get_gcfg[nouvelle guilde]"] = bench_gcfg_new
+
+    # --- permissions : membre sans privilège avec N rôles (pire cas : tous les checks échouent) ---
+    guild = FakeGuild(roles=args.roles)
+    gcfg = make_guild_cfg(support, guild, args.tickets)
+    guild.add_role(support.STAFF_ROLE)
+    member = FakeMember(guild, "lambda", roles=guild.roles[1:args.roles + 1])
+    entry = next(iter(gcfg.open_tickets.values()))
+    label = gcfg.categories[-1].label
+    benches[f"user_can_manage_tickets[{args.roles} rôles, refus]"] = (
+        lambda: support.user_can_manage_tickets(member, guild, gcfg, category_label=label, ticket_entry=entry)
+    )
+    staff = FakeMember(guild, "staff", roles=guild.roles[1:args.roles] + [guild.get_role(gcfg.staff_role_ids[-1])])
+    benches[f"user_can_manage_tickets[{args.roles} rôles, staff]"] = (
+        lambda: support.user_can_manage_tickets(staff, guild, gcfg, category_label=label, ticket_entry=entry)
+    )
+    benches[f"_user_has_ticket_manage_privs[{args.roles} rôles, refus]"] = (
+        lambda: support._user_has_ticket_manage_privs(member, guild, gcfg, entry)
+    )
+
+    # --- scans « ticket déjà ouvert ? » de TicketSelect.callback (config puis salons de la catégorie) ---
+    category = FakeCategory(guild, support.TICKET_CATEGORY_NAME)
+    guild.categories.append(category)
+    for i in range(min(args.tickets, 500)):     # limite Discord : 500 salons par serveur
+        guild.add_text_channel(f"ticket-user{i}", category)
+    interaction = FakeInteraction(guild, FakeMember(guild, "nouveau"))
+    ot = gcfg.open_tickets
+    base_channel_name = f"{support.slugify(label)}-{support.slugify(interaction.user.name)}"
+
+    def bench_duplicate_scan():
+        existing, _ = support.find_user_open_ticket(interaction.guild, ot, interaction.user.id)
+        if existing is None:
+            for ch in category.text_channels:
+                if ch.name == base_channel_name:
+                    break
+    benches[f"duplicate_scan[{args.tickets} tickets]"] = bench_duplicate_scan
+
+    # --- save_config sur une config réaliste ---
+    save_cfg = make_config(support, args.guilds, args.save_tickets)
+    loop = asyncio.new_event_loop()
+    benches[f"save_config[{args.guilds} guildes x {args.save_tickets} tickets]"] = (
+        lambda: loop.run_until_complete(support.save_config(save_cfg))
+    )
+
+    # --- chargement à la demande : ouverture (index seul) et sauvegarde avec 10 guildes chargées ---
+    from config_store import GuildStore
+    loop.run_until_complete(support.save_config(save_cfg))
+    benches[f"config_open[{args.guilds} guildes]"] = lambda: GuildStore(support.CONFIG_FILE).open()
+    lazy_cfg = GuildStore(support.CONFIG_FILE).open()
+    for gid in list(lazy_cfg.keys())[:10]:
+        support.get_gcfg(lazy_cfg, gid)
+    benches[f"save_config[{args.guilds} guildes, 10 chargées]"] = (
+        lambda: loop.run_until_complete(support.save_config(lazy_cfg))
+    )
+    return benches
+
+
+# ---------------- Résultats ----------------
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def previous_result(exclude: str = None):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "[0-9]*.json")))     # exclut startup-*.json
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def compare(current: dict, previous: dict, threshold: float = None) -> bool:
+    """Affiche l'écart par benchmark ; retourne False si une régression dépasse `threshold` %."""
+    ok = True
+    print(f"\nComparaison avec {previous['meta'].get('timestamp')} (rev {previous['meta'].get('git')})")
+    for name, res in current["results"].items():
+        old = previous["results"].get(name)
+        if not old:
+            print(f"  {name:<55} nouveau")
+            continue
+        delta = (res["min_us"] - old["min_us"]) / old["min_us"] * 100.0
+        flag = ""
+        if threshold is not None and delta >= threshold:
+            flag = "  ⚠ régression"
+            ok = False
+        print(f"  {name:<55} {old['min_us']:>12.2f} -> {res['min_us']:>12.2f} µs  ({delta:+.1f} %){flag}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks hors-ligne de support.py")
+    parser.add_argument("--guilds", type=int, default=10_000)
+    parser.add_argument("--tickets", type=int, default=1_000, help="tickets ouverts par guilde (scan / permissions)")
+    parser.add_argument("--save-tickets", type=int, default=10, help="tickets ouverts par guilde pour save_config")
+    parser.add_argument("--roles", type=int, default=200, help="rôles par membre")
+    parser.add_argument("--only", help="noms de benchmarks (préfixes) séparés par des virgules")
+    parser.add_argument("--quick", action="store_true", help="mesures plus courtes (min 0.05 s, 3 répétitions)")
+    parser.add_argument("--compare", help="fichier de résultats de référence (défaut: le précédent)")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PCT")
+    parser.add_argument("--no-save", action="store_true", help="ne pas enregistrer les résultats")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="fastsupport-bench-") as workdir:
+        support = load_support(workdir)
+        benches = build_benchmarks(support, args)
+        only = [p.strip() for p in args.only.split(",")] if args.only else None
+        min_time, repeat = (0.05, 3) if args.quick else (0.2, 5)
+
+        results = {}
+        for name, fn in benches.items():
+            if only and not any(name.startswith(p) for p in only):
+                continue
+            res = measure(fn, min_time=min_time, repeat=repeat)
+            results[name] = res
+            print(f"{name:<55} {res['min_us']:>12.2f} µs (médiane {res['median_us']:.2f}, n={res['iterations']})")
+        os.chdir(ROOT)
+
+    current = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    ref_path = args.compare or previous_result()
+    ok = True
+    if ref_path:
+        with open(ref_path, "r", encoding="utf-8") as f:
+            ok = compare(current, json.load(f), args.fail_on_regression)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {out}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
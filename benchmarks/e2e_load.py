@@ -0,0 +1,253 @@
+"""
+Test de charge de bout en bout : support.py tourne contre le faux Discord local
+(benchmarks/fake_discord.py), des utilisateurs virtuels ouvrent des tickets en parallèle,
+le staff les prend en charge puis les ferme. Aucun accès réseau.
+
+    python benchmarks/e2e_load.py --users 200 --guilds 4
+    python benchmarks/e2e_load.py --users 50 --rounds 3 --latency-ms 80 --think 0.5
+    python benchmarks/e2e_load.py --users 50 --record /tmp/trafic.jsonl   # puis replay.py
+    python benchmarks/e2e_load.py --users 50 --guilds 8 --shards 4        # AutoShardedBot
+
+Affiche les latences p50/p95/p99 par étape (accusé de réception de l'interaction, fin de
+l'étape), les 429 et interactions expirées (> 3 s) côté faux Discord, puis /perf-stats du bot.
+Le bot et le faux Discord partagent la même boucle asyncio : à garder en tête pour les
+mesures CPU-bound.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+
+sys.path.insert(0, HERE)
+from fake_discord import FakeDiscord, point_client_at  # noqa: E402
+
+
+def percentiles(values):
+    if not values:
+        return {"n": 0}
+    values = sorted(values)
+
+    def q(p):
+        return values[min(len(values) - 1, int(p * len(values)))] * 1000.0
+    return {"n": len(values), "p50_ms": q(0.50), "p95_ms": q(0.95), "p99_ms": q(0.99), "max_ms": values[-1] * 1000.0}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def error(self, name: str, exc: BaseException):
+        key = f"{name}: {type(exc).__name__}"
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+async def ticket_flow(fake: FakeDiscord, guild, user_id: int, rec: Recorder, think: float, rng: random.Random,
+                      timeout: float = 60.0):
+    """Ouverture -> prise en charge -> fermeture d'un ticket par un utilisateur."""
+    support = guild.channel_named("support")
+    panel = fake.find_component_message(int(support["id"]), "fastsupport_ticket_select_")
+    select = next(c for row in panel["components"] for c in row["components"]
+                  if str(c.get("custom_id", "")).startswith("fastsupport_ticket_select_"))
+    label = rng.choice(select["options"])["label"]
+
+    # 1) ouverture
+    step = "ouverture"
+    try:
+        created = asyncio.ensure_future(fake.wait_for(
+            "channel_create", lambda c: any(str(o["id"]) == str(user_id) for o in c["permission_overwrites"]), timeout=timeout))
+        t0 = time.perf_counter()
+        inter = await fake.select(guild, user_id, int(support["id"]), panel, select["custom_id"], [label])
+        await inter.wait_ack()
+        rec.add("ouverture/ack", inter.ack_latency)
+        await inter.wait_followup(timeout)
+        rec.add("ouverture/total", time.perf_counter() - t0)
+        channel = await created
+    except Exception as e:
+        rec.error(step, e)
+        return
+    cid = int(channel["id"])
+    ticket_msg = fake.find_component_message(cid, "fastsupport_claim")
+    if ticket_msg is None:
+        rec.error(step, LookupError("message du ticket introuvable"))
+        return
+    staff_id = rng.choice(guild.staff)
+
+    # 2) prise en charge
+    step = "prise_en_charge"
+    await asyncio.sleep(rng.uniform(0, think))
+    try:
+        t0 = time.perf_counter()
+        inter = await fake.click(guild, staff_id, cid, ticket_msg, "fastsupport_claim")
+        await inter.wait_ack()
+        rec.add("prise_en_charge/ack", inter.ack_latency)
+    except Exception as e:
+        rec.error(step, e)
+
+    # 3) fermeture (transcript + suppression du salon)
+    step = "fermeture"
+    await asyncio.sleep(rng.uniform(0, think))
+    try:
+        deleted = asyncio.ensure_future(fake.wait_for("channel_delete", lambda c: int(c["id"]) == cid, timeout=timeout))
+        t0 = time.perf_counter()
+        inter = await fake.click(guild, staff_id, cid, ticket_msg, "fastsupport_close_actions")
+        await inter.wait_ack()
+        rec.add("fermeture/ack", inter.ack_latency)
+        await deleted
+        rec.add("fermeture/total", time.perf_counter() - t0)
+    except Exception as e:
+        rec.error(step, e)
+
+
+async def wait_until(predicate, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError(what)
+        await asyncio.sleep(0.05)
+
+
+async def start_bot(fake: FakeDiscord, workdir: str, timeout: float = 60.0, record_file: str = None):
+    """
+    Lance support.main() contre le faux Discord (config : `workdir`/guild_config.json) ; retourne
+    (support, tâche). `record_file` : trafic enregistré comme en production (rejouable avec replay.py).
+    """
+    point_client_at(fake.base_url, fake.gateway_url)
+    from bench_support import load_support
+    os.environ["PORT"] = "0"
+    support = load_support(workdir)
+    support.TRANSCRIPT_UPLOAD = False
+    support.RECORD_FILE = record_file or ""
+    support.bot._connection.guild_ready_timeout = 0.2
+    logging.disable(logging.WARNING)
+
+    bot_task = asyncio.ensure_future(support.main())
+    await wait_until(lambda: support.HEALTH.restored_once or bot_task.done(), timeout, "démarrage du bot")
+    if bot_task.done():
+        bot_task.result()
+    return support, bot_task
+
+
+async def stop_bot(support, bot_task):
+    # même séquence qu'un SIGTERM en production : interactions terminées, files vidées, config sauvegardée
+    await support.graceful_shutdown("fin du benchmark")
+    try:
+        await asyncio.wait_for(bot_task, 10.0)
+    except Exception:
+        pass
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    fake = FakeDiscord(latency_ms=args.latency_ms, seed=args.seed)
+    guilds = [fake.add_guild(f"Serveur {i}", members=max(1, args.users // args.guilds + 1), staff=args.staff)
+              for i in range(args.guilds)]
+    await fake.start()
+
+    t0 = time.perf_counter()
+    support, bot_task = await start_bot(fake, args.workdir, record_file=args.record)
+    try:
+        await wait_until(
+            lambda: all(fake.find_component_message(int(g.channel_named("support")["id"]), "fastsupport_ticket_select_")
+                        for g in guilds) or bot_task.done(),
+            30.0, "messages support")
+        if bot_task.done():
+            bot_task.result()
+        ready_s = time.perf_counter() - t0
+        print(f"Bot prêt en {ready_s:.2f} s ({args.guilds} guildes)")
+
+        rec = Recorder()
+        users = [(g, uid) for g in guilds for uid in g.users]
+        rng.shuffle(users)
+        users = users[:args.users]
+        started = time.perf_counter()
+
+        async def virtual_user(guild, uid):
+            await asyncio.sleep(rng.uniform(0, args.ramp))
+            for _ in range(args.rounds):
+                await ticket_flow(fake, guild, uid, rec, args.think, rng, args.timeout)
+
+        await asyncio.gather(*(virtual_user(g, uid) for g, uid in users))
+        elapsed = time.perf_counter() - started
+        perf_table = support.stats_table()
+    finally:
+        await stop_bot(support, bot_task)
+        await fake.stop()
+
+    flows = len(rec.samples.get("fermeture/total", []))
+    return {
+        "ready_s": ready_s,
+        "elapsed_s": elapsed,
+        "flows_completed": flows,
+        "flows_per_s": flows / elapsed if elapsed else 0.0,
+        "steps": {k: percentiles(v) for k, v in sorted(rec.samples.items())},
+        "errors": rec.errors,
+        "fake_discord": fake.stats,
+        "perf_stats": perf_table,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de bout en bout contre un faux Discord local")
+    parser.add_argument("--users", type=int, default=100, help="utilisateurs virtuels simultanés")
+    parser.add_argument("--guilds", type=int, default=2)
+    parser.add_argument("--staff", type=int, default=5, help="membres staff par guilde")
+    parser.add_argument("--rounds", type=int, default=1, help="tickets par utilisateur")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="latence médiane simulée de l'API")
+    parser.add_argument("--think", type=float, default=1.0, help="pause max (s) entre deux étapes")
+    parser.add_argument("--ramp", type=float, default=5.0, help="étalement (s) des arrivées")
+    parser.add_argument("--timeout", type=float, default=60.0, help="attente max (s) d'une étape (salon créé, supprimé...)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=0, help="AutoShardedBot avec N shards (0 = commands.Bot)")
+    parser.add_argument("--record", metavar="FICHIER", help="enregistre le trafic (rejouable avec replay.py)")
+    parser.add_argument("--no-save", action="store_true", help="ne pas enregistrer les résultats")
+    args = parser.parse_args(argv)
+    if args.record:
+        args.record = os.path.abspath(args.record)
+    if args.shards:
+        os.environ["FASTSUPPORT_SHARD_COUNT"] = str(args.shards)
+
+    with tempfile.TemporaryDirectory(prefix="fastsupport-e2e-") as workdir:
+        args.workdir = workdir
+        res = asyncio.run(run(args))
+        os.chdir(HERE)
+    del args.workdir
+
+    print(f"\n{res['flows_completed']} tickets complets en {res['elapsed_s']:.1f} s ({res['flows_per_s']:.2f}/s)")
+    print(f"{'étape':<22} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, p in res["steps"].items():
+        print(f"{name:<22} {p['n']:>5} {p['p50_ms']:>8.0f} {p['p95_ms']:>8.0f} {p['p99_ms']:>8.0f} {p['max_ms']:>8.0f}")
+    fd = res["fake_discord"]
+    print(f"\nFaux Discord : {fd['requests']} requêtes, {fd['ratelimited']} réponses 429, "
+          f"{fd['expired_interactions']} interactions expirées")
+    for route, n in fd["unknown_routes"].items():
+        print(f"  route non implémentée : {route} ({n})")
+    for err, n in res["errors"].items():
+        print(f"  erreur {err} ({n})")
+    print("\n/perf-stats du bot :\n" + res["perf_stats"])
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, "e2e-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(timespec="seconds"), "args": vars(args), **res},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {out}")
+    return 1 if res["errors"] or not res["flows_completed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Bascule leader -> standby : deux processus support.py partagent la config et un bail de leader
+(FASTSUPPORT_LEADER_LEASE) face au faux Discord. Le leader est tué (SIGKILL, pas d'arrêt propre)
+et on mesure le temps jusqu'à ce qu'un ticket puisse de nouveau être ouvert.
+
+    python benchmarks/failover.py --guilds 20 --ttl 5
+    python benchmarks/failover.py --guilds 20 --cold      # sans standby : relance à froid du processus
+
+Le standby a déjà importé le bot, lu la config, construit les vues et fait son login REST : il
+ne lui reste que l'expiration du bail (--ttl), la connexion gateway et on_ready.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+
+sys.path.insert(0, HERE)
+from e2e_load import Recorder, ticket_flow, wait_until  # noqa: E402
+from fake_discord import FakeDiscord  # noqa: E402
+
+
+# ---------------- Processus enfant : un bot ----------------
+def child(workdir: str, base_url: str, gateway_url: str):
+    from fake_discord import point_client_at
+    from bench_support import load_support
+
+    point_client_at(base_url, gateway_url)
+    support = load_support(workdir)
+    support.TRANSCRIPT_UPLOAD = False
+    support.bot._connection.guild_ready_timeout = 0.2
+    asyncio.run(support.main())
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BotProcess:
+    def __init__(self, name: str, workdir: str, fake: FakeDiscord, ttl: float = None):
+        self.name = name
+        self.port = free_port()
+        # ttl None : pas de bail (déploiement sans standby)
+        lease = os.path.join(workdir, "leader.lease") if ttl is not None else ""
+        env = dict(os.environ, PORT=str(self.port), FASTSUPPORT_LEADER_LEASE=lease, FASTSUPPORT_LEASE_TTL=str(ttl or 0))
+        self.log = open(os.path.join(workdir, f"{name}.log"), "w")
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child", workdir, fake.base_url, fake.gateway_url],
+            env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    async def probe(self, path: str):
+        """(statut, JSON) d'une route de santé ; (None, {}) si le processus ne répond pas."""
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{self.port}{path}",
+                                       timeout=aiohttp.ClientTimeout(total=1.0)) as resp:
+                    return resp.status, await resp.json()
+        except Exception:
+            return None, {}
+
+    async def wait_for(self, predicate, what: str, timeout: float, path: str = "/healthz"):
+        deadline = time.monotonic() + timeout
+        while not predicate(*await self.probe(path)):
+            if time.monotonic() > deadline or self.proc.poll() is not None:
+                raise TimeoutError(f"{self.name} : {what}")
+            await asyncio.sleep(0.1)
+
+    async def wait_standby(self, timeout: float = 60.0):
+        await self.wait_for(lambda status, body: body.get("role") == "standby", "pas en standby", timeout)
+
+    async def wait_ready(self, timeout: float = 60.0):
+        await self.wait_for(lambda status, body: status == 200, "pas prêt", timeout, "/readyz")
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.wait()
+
+    async def stop(self, timeout: float = 30.0):
+        """SIGTERM (arrêt propre : le faux Discord doit continuer à répondre pendant l'attente), puis kill."""
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            deadline = time.monotonic() + timeout
+            while self.proc.poll() is None and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            if self.proc.poll() is None:
+                self.kill()
+        self.log.close()
+
+
+def support_ready(fake: FakeDiscord, guilds) -> bool:
+    return all(fake.find_component_message(int(g.channel_named("support")["id"]), "fastsupport_ticket_select_")
+               for g in guilds)
+
+
+async def first_ticket(fake: FakeDiscord, guilds, rng: random.Random, deadline: float) -> float:
+    """Tente d'ouvrir un ticket jusqu'au succès ; retourne l'instant (perf_counter) du succès."""
+    while time.perf_counter() < deadline:
+        guild = rng.choice(guilds)
+        rec = Recorder()
+        await ticket_flow(fake, guild, rng.choice(guild.users), rec, 0.0, rng, timeout=3.0)
+        if rec.samples.get("fermeture/total"):
+            return time.perf_counter()
+        await asyncio.sleep(0.1)
+    raise TimeoutError("aucun ticket ouvert après la bascule")
+
+
+async def run(args, workdir: str) -> dict:
+    rng = random.Random(args.seed)
+    fake = FakeDiscord(latency_ms=args.latency_ms, seed=args.seed)
+    guilds = [fake.add_guild(f"Serveur {i}", members=5, staff=2) for i in range(args.guilds)]
+    await fake.start()
+    procs = []
+    try:
+        ttl = None if args.cold else args.ttl
+        leader = BotProcess("leader", workdir, fake, ttl)
+        procs.append(leader)
+        await leader.wait_ready()
+        await wait_until(lambda: support_ready(fake, guilds), 60.0, "messages support")
+        await first_ticket(fake, guilds, rng, time.perf_counter() + 30.0)
+
+        if not args.cold:
+            standby = BotProcess("standby", workdir, fake, ttl)
+            procs.append(standby)
+            await standby.wait_standby()
+            await asyncio.sleep(1.0)        # préchargement terminé
+
+        t0 = time.perf_counter()
+        leader.kill()
+        if args.cold:
+            # ce que ferait un superviseur (systemd, Docker...) : relance immédiate
+            standby = BotProcess("relance", workdir, fake, ttl)
+            procs.append(standby)
+        await standby.wait_ready(args.ttl + 60.0)
+        t_leader = time.perf_counter()
+        t_ticket = await first_ticket(fake, guilds, rng, t0 + args.ttl + 120.0)
+        return {
+            "mode": "cold" if args.cold else "standby",
+            "guilds": args.guilds,
+            "ttl_s": args.ttl,
+            "leader_s": t_leader - t0,
+            "first_ticket_s": t_ticket - t0,
+            "fake_discord": {k: v for k, v in fake.stats.items() if k != "unknown_routes"},
+        }
+    finally:
+        for p in procs:
+            await p.stop()
+        await fake.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temps de bascule leader -> standby contre le faux Discord")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--ttl", type=float, default=5.0, help="durée du bail de leader (s)")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--cold", action="store_true", help="sans standby : relance à froid après le kill")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help="ne pas enregistrer les résultats")
+    parser.add_argument("--child", nargs=3, metavar=("WORKDIR", "BASE_URL", "GATEWAY_URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(*args.child)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="fastsupport-failover-") as workdir:
+        res = asyncio.run(run(args, workdir))
+    print(f"Mode {res['mode']} ({res['guilds']} guildes" + ("" if args.cold else f", bail {res['ttl_s']:.0f} s") + ")")
+    print(f"  /readyz OK après           {res['leader_s']:6.2f} s")
+    print(f"  premier ticket servi après {res['first_ticket_s']:6.2f} s")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, "failover-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(timespec="seconds"), "args": vars(args), **res},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
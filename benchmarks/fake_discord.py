@@ -0,0 +1,1060 @@
+"""
+Faux Discord local (REST + gateway) pour les tests de charge de bout en bout, sans réseau.
+
+Implémente les routes utilisées par support.py (salons, messages, historique, permissions,
+interactions / webhooks, synchro des commandes), avec une latence simulée et des buckets de
+rate-limit (en-têtes X-RateLimit-*, réponses 429). Le gateway envoie des trames JSON texte :
+HELLO, READY, GUILD_CREATE, puis les événements (CHANNEL_*, MESSAGE_*, INTERACTION_CREATE).
+
+    fake = FakeDiscord(latency_ms=40)
+    guild = fake.add_guild("Serveur", members=200, staff=5)
+    await fake.start()
+    point_client_at(fake.base_url, fake.gateway_url)   # avant bot.start()
+    ...
+    inter = await fake.select(guild, user, channel, message, custom_id, ["Partenariat"])
+    await inter.wait_followup()
+"""
+import asyncio
+import itertools
+import json
+import logging
+import math
+import random
+import secrets
+import time
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+
+logger = logging.getLogger("fastsupport.fake_discord")
+
+DISCORD_EPOCH = 1420070400000
+API_PREFIX = "/api/v10"
+
+# permissions (bits Discord)
+ADMINISTRATOR = 1 << 3
+MANAGE_CHANNELS = 1 << 4
+VIEW_CHANNEL = 1 << 10
+SEND_MESSAGES = 1 << 11
+MANAGE_MESSAGES = 1 << 13
+READ_MESSAGE_HISTORY = 1 << 16
+ALL_PERMISSIONS = (1 << 50) - 1
+EVERYONE_PERMISSIONS = VIEW_CHANNEL | SEND_MESSAGES | READ_MESSAGE_HISTORY
+
+# (limite, fenêtre en s) par route ; les autres routes utilisent DEFAULT_RATE_LIMIT.
+# Le bucket est la route + son paramètre majeur (salon, guilde ou webhook), comme chez Discord.
+RATE_LIMITS = {
+    "POST /channels/{channel_id}/messages": (5, 5.0),
+    "PATCH /channels/{channel_id}/messages/{message_id}": (5, 5.0),
+    "DELETE /channels/{channel_id}/messages/{message_id}": (5, 1.0),
+    "PATCH /channels/{channel_id}": (2, 600.0),
+    "POST /guilds/{guild_id}/channels": (10, 10.0),
+    "DELETE /channels/{channel_id}": (5, 5.0),
+    "PUT /channels/{channel_id}/permissions/{overwrite_id}": (10, 10.0),
+    "DELETE /channels/{channel_id}/permissions/{overwrite_id}": (10, 10.0),
+    "POST /webhooks/{webhook_id}/{webhook_token}": (5, 2.0),
+    "PUT /applications/{application_id}/commands": (2, 60.0),
+}
+DEFAULT_RATE_LIMIT = (50, 1.0)
+# routes d'interaction : hors limite globale, comme chez Discord
+GLOBAL_EXEMPT_PREFIXES = ("/interactions/", "/webhooks/")
+GLOBAL_RATE_LIMIT = 50          # requêtes / seconde
+INTERACTION_ACK_TIMEOUT = 3.0   # au-delà, le callback répond 10062 Unknown interaction
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def json_response(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py ne décode le JSON que si Content-Type vaut exactement "application/json" (sans charset)
+    h = {"Content-Type": "application/json"}
+    if headers:
+        h.update(headers)
+    return web.Response(body=json.dumps(data).encode("utf-8"), status=status, headers=h)
+
+
+class RateBucket:
+    __slots__ = ("limit", "window", "remaining", "reset_at", "hash")
+
+    def __init__(self, limit: int, window: float, bucket_hash: str):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.hash = bucket_hash
+
+    def take(self, now: float):
+        """Retourne (autorisé, retry_after)."""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        if self.remaining <= 0:
+            return False, self.reset_at - now
+        self.remaining -= 1
+        return True, 0.0
+
+    def headers(self, now: float) -> dict:
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": f"{time.time() + max(0.0, self.reset_at - now):.3f}",
+            "X-RateLimit-Reset-After": f"{max(0.0, self.reset_at - now):.3f}",
+            "X-RateLimit-Bucket": self.hash,
+        }
+
+
+class FakeGuildState:
+    def __init__(self, fake, guild_id: int, name: str):
+        self.fake = fake
+        self.id = guild_id
+        self.name = name
+        self.owner_id = None
+        self.roles = {}         # id -> role payload
+        self.members = {}       # user id -> member payload
+        self.channels = {}      # id -> channel payload (+ "_messages")
+        self.users = []         # ids des membres « utilisateurs » (ouvrent des tickets)
+        self.staff = []         # ids des membres staff
+
+    def permissions_of(self, user_id: int) -> int:
+        if user_id == self.owner_id:
+            return ALL_PERMISSIONS
+        member = self.members.get(user_id)
+        perms = int(self.roles[self.id]["permissions"])
+        for rid in (member or {}).get("roles", []):
+            role = self.roles.get(int(rid))
+            if role:
+                perms |= int(role["permissions"])
+        return ALL_PERMISSIONS if perms & ADMINISTRATOR else perms
+
+    def channel_named(self, name: str):
+        for ch in self.channels.values():
+            if ch["name"] == name:
+                return ch
+        return None
+
+    def payload(self) -> dict:
+        return {
+            "id": str(self.id),
+            "name": self.name,
+            "icon": None,
+            "owner_id": str(self.owner_id),
+            "roles": list(self.roles.values()),
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "member_count": len(self.members),
+            "members": list(self.members.values()),
+            "channels": [self.fake.public_channel(c) for c in self.channels.values()],
+            "threads": [],
+            "presences": [],
+            "voice_states": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+            "soundboard_sounds": [],
+            "large": False,
+            "unavailable": False,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "premium_tier": 0,
+            "nsfw_level": 0,
+            "preferred_locale": "fr",
+            "system_channel_id": None,
+            "afk_channel_id": None,
+            "afk_timeout": 300,
+            "joined_at": now_iso(),
+        }
+
+
+class FakeInteraction:
+    """Suivi d'une interaction émise : accusé de réception, réponse initiale, followups."""
+
+    def __init__(self, interaction_id: int, token: str, guild: FakeGuildState, channel_id: int, user_id: int):
+        self.id = interaction_id
+        self.token = token
+        self.guild = guild
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.sent_at = time.perf_counter()
+        self.acked_at = None
+        self.response_type = None
+        self.original = None        # message de la réponse initiale
+        self.followups = []
+        self.expired = False
+        self.message_id = None      # message portant le composant (interactions de composant)
+        self._acked = asyncio.Event()
+        self._followup = asyncio.Event()
+
+    @property
+    def ack_latency(self):
+        return None if self.acked_at is None else self.acked_at - self.sent_at
+
+    async def wait_ack(self, timeout: float = 30.0):
+        await asyncio.wait_for(self._acked.wait(), timeout)
+        return self
+
+    async def wait_followup(self, timeout: float = 30.0):
+        await asyncio.wait_for(self._followup.wait(), timeout)
+        return self.followups[-1]
+
+
+class _Session:
+    __slots__ = ("ws", "seq", "shard_id", "shard_count", "identified", "session_id")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.seq = 0
+        self.shard_id = 0
+        self.shard_count = 1
+        self.identified = False
+        self.session_id = secrets.token_hex(16)
+
+
+class FakeDiscord:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 40.0, jitter: float = 0.3,
+                 rate_limits: dict = None, global_rate_limit: int = GLOBAL_RATE_LIMIT, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.rate_limits = dict(RATE_LIMITS if rate_limits is None else rate_limits)
+        self.global_rate_limit = global_rate_limit
+        self._rng = random.Random(seed)
+        self._counter = itertools.count()
+        self.application_id = self.snowflake()
+        self.bot_user = self.user_payload(self.application_id, "FastSupport", bot=True)
+        self.token = "fake-token"
+        self.guilds = {}
+        self.channels = {}          # id -> channel (toutes guildes)
+        self.users = {self.application_id: self.bot_user}
+        self.interactions = {}      # token -> FakeInteraction
+        self.commands = []
+        self.sessions = []
+        self.buckets = {}
+        self._global_window = (0.0, 0)
+        self.stats = {"requests": 0, "ratelimited": 0, "unknown_routes": {}, "expired_interactions": 0}
+        self._waiters = []          # (kind, prédicat, future)
+        self.listeners = []         # callbacks (kind, objet) appelés à chaque événement émis
+        self.attachments = {}       # (message_id, nom de fichier) -> taille
+        self._runner = None
+        self.app = self._build_app()
+
+    # ---------------- Identifiants / payloads ----------------
+    def snowflake(self) -> int:
+        ms = int(time.time() * 1000) - DISCORD_EPOCH
+        return (ms << 22) | (next(self._counter) & 0x3FFFFF)
+
+    @staticmethod
+    def user_payload(user_id: int, name: str, bot: bool = False) -> dict:
+        return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": None,
+                "avatar": None, "bot": bot, "public_flags": 0}
+
+    def public_channel(self, channel: dict) -> dict:
+        return {k: v for k, v in channel.items() if not k.startswith("_")}
+
+    def member_payload(self, guild: FakeGuildState, user_id: int, with_permissions: bool = False) -> dict:
+        member = dict(guild.members[user_id])
+        if with_permissions:
+            member["permissions"] = str(guild.permissions_of(user_id))
+        return member
+
+    # ---------------- Construction des guildes ----------------
+    def add_guild(self, name: str = "Serveur de test", members: int = 50, staff: int = 3,
+                  support_channel: str = "support") -> FakeGuildState:
+        gid = self.snowflake()
+        guild = FakeGuildState(self, gid, name)
+        self.guilds[gid] = guild
+
+        def role(role_id, role_name, perms, position):
+            guild.roles[role_id] = {"id": str(role_id), "name": role_name, "permissions": str(perms),
+                                    "position": position, "color": 0, "hoist": False, "managed": False,
+                                    "mentionable": False, "flags": 0, "icon": None, "unicode_emoji": None}
+        role(gid, "@everyone", EVERYONE_PERMISSIONS, 0)
+        staff_role, bot_role = self.snowflake(), self.snowflake()
+        role(staff_role, "Staff", EVERYONE_PERMISSIONS | MANAGE_MESSAGES, 1)
+        role(bot_role, "FastSupport", ADMINISTRATOR, 2)
+
+        def member(user_id, user, roles):
+            self.users[user_id] = user
+            guild.members[user_id] = {"user": user, "roles": [str(r) for r in roles], "nick": None,
+                                      "joined_at": now_iso(), "deaf": False, "mute": False, "flags": 0,
+                                      "pending": False, "avatar": None, "premium_since": None}
+        member(self.application_id, self.bot_user, [bot_role])
+        owner = self.snowflake()
+        member(owner, self.user_payload(owner, f"owner-{gid % 10000}"), [])
+        guild.owner_id = owner
+        for i in range(staff):
+            uid = self.snowflake()
+            member(uid, self.user_payload(uid, f"staff{i}"), [staff_role])
+            guild.staff.append(uid)
+        for i in range(members):
+            uid = self.snowflake()
+            member(uid, self.user_payload(uid, f"user{i}"), [])
+            guild.users.append(uid)
+        if support_channel:
+            self._new_channel(guild, {"name": support_channel, "type": 0})
+        return guild
+
+    def add_guild_snapshot(self, snapshot: dict) -> FakeGuildState:
+        """
+        Guilde reconstruite depuis un instantané enregistré (traffic_recorder) : mêmes IDs de
+        guilde, rôles et salons. Le bot y reçoit un rôle administrateur ; les membres sont
+        ajoutés au fil du rejeu (ensure_member).
+        """
+        gid = int(snapshot["id"])
+        guild = FakeGuildState(self, gid, snapshot.get("name") or "Serveur")
+        self.guilds[gid] = guild
+        for r in snapshot.get("roles") or []:
+            guild.roles[int(r["id"])] = {"id": str(r["id"]), "name": r.get("name") or "", "permissions": str(r.get("permissions") or 0),
+                                         "position": int(r.get("position") or 0), "color": 0, "hoist": False, "managed": False,
+                                         "mentionable": False, "flags": 0, "icon": None, "unicode_emoji": None}
+        if gid not in guild.roles:
+            guild.roles[gid] = {"id": str(gid), "name": "@everyone", "permissions": str(EVERYONE_PERMISSIONS), "position": 0,
+                                "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+                                "icon": None, "unicode_emoji": None}
+        bot_role = self.snowflake()
+        guild.roles[bot_role] = {"id": str(bot_role), "name": "FastSupport", "permissions": str(ADMINISTRATOR),
+                                 "position": len(guild.roles), "color": 0, "hoist": False, "managed": True,
+                                 "mentionable": False, "flags": 0, "icon": None, "unicode_emoji": None}
+        self.ensure_member(guild, self.application_id, [bot_role])
+        if snapshot.get("owner_id"):
+            guild.owner_id = int(snapshot["owner_id"])
+            self.ensure_member(guild, guild.owner_id, [])
+        for c in sorted(snapshot.get("channels") or [], key=lambda c: c.get("type") != 4):  # catégories d'abord
+            self._new_channel(guild, c, channel_id=int(c["id"]))
+        return guild
+
+    def remove_guild(self, guild_id: int):
+        guild = self.guilds.pop(guild_id, None)
+        if guild is not None:
+            for cid in guild.channels:
+                self.channels.pop(cid, None)
+        return guild
+
+    def ensure_member(self, guild: FakeGuildState, user_id: int, roles=()):
+        """Ajoute le membre s'il est inconnu ; met à jour ses rôles sinon."""
+        roles = [str(r) for r in roles if int(r) in guild.roles]
+        member = guild.members.get(user_id)
+        if member is not None:
+            if roles:
+                member["roles"] = roles
+            return member
+        user = self.users.get(user_id) or self.user_payload(user_id, f"user-{user_id % 100000}")
+        self.users[user_id] = user
+        member = guild.members[user_id] = {"user": user, "roles": roles, "nick": None, "joined_at": now_iso(),
+                                           "deaf": False, "mute": False, "flags": 0, "pending": False,
+                                           "avatar": None, "premium_since": None}
+        return member
+
+    def _new_channel(self, guild: FakeGuildState, data: dict, channel_id: int = None) -> dict:
+        cid = channel_id or self.snowflake()
+        channel = {
+            "id": str(cid),
+            "guild_id": str(guild.id),
+            "type": int(data.get("type", 0)),
+            "name": data.get("name", "salon"),
+            "position": int(data.get("position") or len(guild.channels)),
+            "permission_overwrites": list(data.get("permission_overwrites") or []),
+            "parent_id": str(data["parent_id"]) if data.get("parent_id") else None,
+            "topic": data.get("topic"),
+            "nsfw": bool(data.get("nsfw", False)),
+            "rate_limit_per_user": int(data.get("rate_limit_per_user") or 0),
+            "last_message_id": None,
+            "flags": 0,
+            "_messages": {},
+        }
+        guild.channels[cid] = channel
+        self.channels[cid] = channel
+        return channel
+
+    # ---------------- Serveur ----------------
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}{API_PREFIX}"
+
+    @property
+    def cdn_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def gateway_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/gateway"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        logger.info("Faux Discord en écoute sur %s", self.base_url)
+
+    async def stop(self):
+        for s in list(self.sessions):
+            await s.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware], client_max_size=64 * 1024 * 1024)
+        r = app.router
+        p = API_PREFIX
+        r.add_get("/gateway", self.gateway)
+        r.add_get("/attachments/{message_id}/{filename}", self.get_attachment)     # « CDN » : hors latence / rate-limit
+        r.add_get(p + "/gateway", self.get_gateway)
+        r.add_get(p + "/gateway/bot", self.get_gateway)
+        r.add_get(p + "/users/@me", self.get_me)
+        r.add_get(p + "/users/{user_id}", self.get_user)
+        r.add_get(p + "/oauth2/applications/@me", self.get_application)
+        r.add_get(p + "/applications/@me", self.get_application)
+        r.add_put(p + "/applications/{application_id}/commands", self.put_commands)
+        r.add_get(p + "/applications/{application_id}/commands", self.get_commands)
+        r.add_put(p + "/applications/{application_id}/guilds/{guild_id}/commands", self.put_commands)
+        r.add_get(p + "/guilds/{guild_id}", self.get_guild)
+        r.add_get(p + "/guilds/{guild_id}/channels", self.get_guild_channels)
+        r.add_post(p + "/guilds/{guild_id}/channels", self.create_channel)
+        r.add_get(p + "/guilds/{guild_id}/members/{user_id}", self.get_member)
+        r.add_get(p + "/channels/{channel_id}", self.get_channel)
+        r.add_patch(p + "/channels/{channel_id}", self.edit_channel)
+        r.add_delete(p + "/channels/{channel_id}", self.delete_channel)
+        r.add_put(p + "/channels/{channel_id}/permissions/{overwrite_id}", self.put_permission)
+        r.add_delete(p + "/channels/{channel_id}/permissions/{overwrite_id}", self.delete_permission)
+        r.add_get(p + "/channels/{channel_id}/messages", self.get_messages)
+        r.add_post(p + "/channels/{channel_id}/messages", self.create_message)
+        r.add_get(p + "/channels/{channel_id}/messages/{message_id}", self.get_message)
+        r.add_patch(p + "/channels/{channel_id}/messages/{message_id}", self.edit_message)
+        r.add_delete(p + "/channels/{channel_id}/messages/{message_id}", self.delete_message)
+        r.add_post(p + "/interactions/{interaction_id}/{token}/callback", self.interaction_callback)
+        r.add_post(p + "/webhooks/{application_id}/{token}", self.create_followup)
+        r.add_get(p + "/webhooks/{application_id}/{token}/messages/{message_id}", self.get_webhook_message)
+        r.add_patch(p + "/webhooks/{application_id}/{token}/messages/{message_id}", self.edit_webhook_message)
+        r.add_delete(p + "/webhooks/{application_id}/{token}/messages/{message_id}", self.delete_webhook_message)
+        r.add_route("*", p + "/{tail:.*}", self.unknown_route)
+        return app
+
+    # ---------------- Latence + rate-limits ----------------
+    def _latency(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000.0 * math.exp(self._rng.gauss(0.0, self.jitter))
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if not request.path.startswith(API_PREFIX):
+            return await handler(request)
+        self.stats["requests"] += 1
+        await asyncio.sleep(self._latency())
+
+        now = time.monotonic()
+        path = request.path[len(API_PREFIX):]
+        resource = request.match_info.route.resource
+        template = resource.canonical[len(API_PREFIX):] if resource is not None else path
+        # harmonise les noms de paramètres avec ceux des Route de discord.py (clé du bucket)
+        template = template.replace("{application_id}/{token}", "{webhook_id}/{webhook_token}")
+        key = f"{request.method} {template}"
+
+        if not path.startswith(GLOBAL_EXEMPT_PREFIXES):
+            window_start, count = self._global_window
+            if now - window_start >= 1.0:
+                window_start, count = now, 0
+            if count >= self.global_rate_limit:
+                return self._ratelimited(window_start + 1.0 - now, None, scope="global")
+            self._global_window = (window_start, count + 1)
+
+        info = request.match_info
+        major = info.get("channel_id") or info.get("guild_id") or info.get("token") or ""
+        bucket = self.buckets.get((key, major))
+        if bucket is None:
+            limit, window = self.rate_limits.get(key, DEFAULT_RATE_LIMIT)
+            bucket = self.buckets[(key, major)] = RateBucket(limit, window, secrets.token_hex(8))
+        allowed, retry_after = bucket.take(now)
+        if not allowed:
+            return self._ratelimited(retry_after, bucket, now=now)
+
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            response = e
+        response.headers.update(bucket.headers(now))
+        return response
+
+    def _ratelimited(self, retry_after: float, bucket, scope: str = "user", now: float = None):
+        self.stats["ratelimited"] += 1
+        # sans en-tête Via, discord.py prend le 429 pour un ban Cloudflare et n'attend pas
+        headers = {"Retry-After": f"{math.ceil(retry_after)}", "X-RateLimit-Scope": scope, "Via": "1.1 google"}
+        if bucket is not None:
+            headers.update(bucket.headers(now))
+        if scope == "global":
+            headers["X-RateLimit-Global"] = "true"
+        return json_response(
+            {"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": scope == "global"},
+            status=429, headers=headers,
+        )
+
+    @staticmethod
+    def _error(status: int, code: int, message: str):
+        return json_response({"message": message, "code": code}, status=status)
+
+    async def unknown_route(self, request: web.Request):
+        key = f"{request.method} {request.path[len(API_PREFIX):]}"
+        self.stats["unknown_routes"][key] = self.stats["unknown_routes"].get(key, 0) + 1
+        logger.warning("Route non implémentée par le faux Discord : %s", key)
+        return self._error(404, 0, "404: Not Found (faux Discord)")
+
+    # ---------------- Attente d'événements (pilote de charge) ----------------
+    def _emit(self, kind: str, obj):
+        for callback in list(self.listeners):
+            try:
+                callback(kind, obj)
+            except Exception:
+                logger.exception("Écouteur du faux Discord en erreur (%s)", kind)
+        for waiter in list(self._waiters):
+            k, pred, fut = waiter
+            if k == kind and not fut.done():
+                try:
+                    ok = pred(obj)
+                except Exception:
+                    ok = False
+                if ok:
+                    fut.set_result(obj)
+                    self._waiters.remove(waiter)
+
+    async def wait_for(self, kind: str, predicate, timeout: float = 30.0):
+        """Attend le prochain événement `kind` (channel_create, channel_delete, message_create...) vérifiant `predicate`."""
+        fut = asyncio.get_running_loop().create_future()
+        waiter = (kind, predicate, fut)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    # ---------------- Gateway ----------------
+    async def get_gateway(self, request: web.Request):
+        return json_response({
+            "url": self.gateway_url,
+            "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 16},
+        })
+
+    async def gateway(self, request: web.Request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = _Session(ws)
+        self.sessions.append(session)
+        try:
+            await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": 41250}, "s": None, "t": None}))
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    if msg.type in (WSMsgType.ERROR, WSMsgType.CLOSE):
+                        break
+                    continue
+                await self._on_gateway_message(session, json.loads(msg.data))
+        finally:
+            if session in self.sessions:
+                self.sessions.remove(session)
+        return ws
+
+    def _owns(self, session: _Session, guild_id: int) -> bool:
+        return (guild_id >> 22) % session.shard_count == session.shard_id
+
+    async def _send(self, session: _Session, op: int, d, t: str = None):
+        if op == 0:
+            session.seq += 1
+        payload = {"op": op, "d": d, "s": session.seq if op == 0 else None, "t": t}
+        try:
+            await session.ws.send_str(json.dumps(payload))
+        except ConnectionResetError:
+            pass
+
+    async def _on_gateway_message(self, session: _Session, msg: dict):
+        op = msg.get("op")
+        if op == 1:         # heartbeat
+            await self._send(session, 11, None)
+        elif op == 2:       # identify
+            shard = (msg.get("d") or {}).get("shard") or [0, 1]
+            session.shard_id, session.shard_count = int(shard[0]), int(shard[1])
+            owned = [g for g in self.guilds.values() if self._owns(session, g.id)]
+            await self._send(session, 0, {
+                "v": 10,
+                "user": self.bot_user,
+                "guilds": [{"id": str(g.id), "unavailable": True} for g in owned],
+                "session_id": session.session_id,
+                "resume_gateway_url": self.gateway_url,
+                "shard": [session.shard_id, session.shard_count],
+                "application": {"id": str(self.application_id), "flags": 0},
+                "private_channels": [],
+                "relationships": [],
+                "presences": [],
+                "guild_join_requests": [],
+                "geo_ordered_rtc_regions": [],
+                "user_settings": {},
+                "session_type": "normal",
+                "auth": {},
+            }, "READY")
+            session.identified = True
+            for g in owned:
+                await self._send(session, 0, g.payload(), "GUILD_CREATE")
+        elif op == 6:       # resume
+            session.identified = True
+            await self._send(session, 0, {}, "RESUMED")
+        elif op == 8:       # request guild members
+            d = msg.get("d") or {}
+            gid = int(d.get("guild_id"))
+            guild = self.guilds.get(gid)
+            if guild is not None:
+                await self._send(session, 0, {
+                    "guild_id": str(gid), "members": list(guild.members.values()),
+                    "chunk_index": 0, "chunk_count": 1, "nonce": d.get("nonce"),
+                }, "GUILD_MEMBERS_CHUNK")
+
+    async def dispatch(self, event: str, data: dict, guild_id: int = None):
+        """Envoie un événement DISPATCH aux sessions concernées (selon le shard de la guilde)."""
+        for session in list(self.sessions):
+            if session.identified and (guild_id is None or self._owns(session, guild_id)):
+                await self._send(session, 0, data, event)
+
+    # ---------------- Interactions émises ----------------
+    def _new_interaction(self, guild: FakeGuildState, channel_id: int, user_id: int, itype: int, data: dict,
+                         message: dict = None) -> tuple:
+        iid = self.snowflake()
+        token = "fake-" + secrets.token_urlsafe(24)
+        inter = FakeInteraction(iid, token, guild, channel_id, user_id)
+        self.interactions[token] = inter
+        payload = {
+            "id": str(iid),
+            "application_id": str(self.application_id),
+            "type": itype,
+            "data": data,
+            "guild_id": str(guild.id),
+            "channel_id": str(channel_id),
+            "channel": self.public_channel(self.channels[channel_id]),
+            "member": self.member_payload(guild, user_id, with_permissions=True),
+            "token": token,
+            "version": 1,
+            "locale": "fr",
+            "guild_locale": "fr",
+            "app_permissions": str(ALL_PERMISSIONS),
+            "entitlements": [],
+            "authorizing_integration_owners": {"0": str(guild.id)},
+            "context": 0,
+            "attachment_size_limit": 10 * 1024 * 1024,
+        }
+        if message is not None:
+            payload["message"] = message
+            inter.message_id = int(message["id"])
+        return inter, payload
+
+    async def interaction(self, guild: FakeGuildState, user_id: int, channel_id: int, itype: int, data: dict,
+                          message: dict = None) -> FakeInteraction:
+        """Émet une interaction quelconque (type Discord : 2 commande, 3 composant, 4 autocomplétion, 5 modal)."""
+        inter, payload = self._new_interaction(guild, channel_id, user_id, itype, data, message)
+        await self.dispatch("INTERACTION_CREATE", payload, guild.id)
+        return inter
+
+    async def select(self, guild: FakeGuildState, user_id: int, channel_id: int, message: dict,
+                     custom_id: str, values: list) -> FakeInteraction:
+        """Simule le choix d'une option dans un menu déroulant."""
+        return await self.interaction(
+            guild, user_id, channel_id, 3, {"custom_id": custom_id, "component_type": 3, "values": list(values)}, message)
+
+    async def click(self, guild: FakeGuildState, user_id: int, channel_id: int, message: dict, custom_id: str) -> FakeInteraction:
+        """Simule un clic sur un bouton."""
+        return await self.interaction(guild, user_id, channel_id, 3, {"custom_id": custom_id, "component_type": 2}, message)
+
+    async def slash(self, guild: FakeGuildState, user_id: int, channel_id: int, name: str, options: list = ()) -> FakeInteraction:
+        """Simule une commande slash (options : [{"name", "type", "value"}])."""
+        cmd = next((c for c in self.commands if c["name"] == name), None)
+        data = {"id": cmd["id"] if cmd else str(self.snowflake()), "name": name, "type": 1, "options": list(options)}
+        return await self.interaction(guild, user_id, channel_id, 2, data)
+
+    async def user_message(self, channel_id: int, author_id: int, content: str = "", attachment_sizes=()) -> dict:
+        """Message d'un membre dans un salon (historique + MESSAGE_CREATE), pièces jointes téléchargeables."""
+        channel = self.channels[channel_id]
+        author = self.users.get(author_id) or self.user_payload(author_id, f"user-{author_id % 100000}")
+        files = [{"filename": f"fichier{i}.bin", "size": int(size)} for i, size in enumerate(attachment_sizes)]
+        msg = self._message(channel, author, {"content": content}, files)
+        for f in files:
+            self.attachments[(msg["id"], f["filename"])] = f["size"]
+        await self._store_message(channel, msg)
+        return msg
+
+    def find_component_message(self, channel_id: int, custom_id_prefix: str):
+        """Dernier message du salon portant un composant dont le custom_id commence par le préfixe."""
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            return None
+        for msg in reversed(list(channel["_messages"].values())):
+            for row in msg.get("components") or []:
+                for comp in row.get("components") or []:
+                    if str(comp.get("custom_id", "")).startswith(custom_id_prefix):
+                        return msg
+        return None
+
+    # ---------------- Payloads reçus ----------------
+    @staticmethod
+    async def _read_payload(request: web.Request):
+        """(payload JSON, pièces jointes) — gère le multipart (payload_json + files[n])."""
+        if request.content_type.startswith("multipart/"):
+            payload, files = {}, []
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    payload = json.loads(await part.text())
+                else:
+                    data = await part.read()
+                    files.append({"filename": part.filename or part.name, "size": len(data)})
+            return payload, files
+        if request.can_read_body:
+            try:
+                return await request.json(), []
+            except json.JSONDecodeError:
+                return {}, []
+        return {}, []
+
+    def _message(self, channel: dict, author: dict, payload: dict, files=(), webhook_id=None) -> dict:
+        mid = self.snowflake()
+        attachments = [
+            {"id": str(self.snowflake()), "filename": f["filename"], "size": f["size"],
+             "url": f"{self.cdn_url}/attachments/{mid}/{f['filename']}",
+             "proxy_url": f"{self.cdn_url}/attachments/{mid}/{f['filename']}", "content_type": "application/octet-stream"}
+            for f in files
+        ]
+        msg = {
+            "id": str(mid),
+            "channel_id": channel["id"],
+            "guild_id": channel.get("guild_id"),
+            "author": author,
+            "content": payload.get("content") or "",
+            "timestamp": now_iso(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": attachments,
+            "embeds": payload.get("embeds") or [],
+            "components": payload.get("components") or [],
+            "pinned": False,
+            "type": 0,
+            "flags": int(payload.get("flags") or 0),
+        }
+        if webhook_id is not None:
+            msg["webhook_id"] = str(webhook_id)
+        return msg
+
+    async def _store_message(self, channel: dict, msg: dict):
+        channel["_messages"][int(msg["id"])] = msg
+        channel["last_message_id"] = msg["id"]
+        self._emit("message_create", msg)
+        await self.dispatch("MESSAGE_CREATE", msg, int(channel["guild_id"]))
+
+    def _channel_or_404(self, request: web.Request):
+        return self.channels.get(int(request.match_info["channel_id"]))
+
+    # ---------------- Routes : utilisateurs / application ----------------
+    async def get_me(self, request):
+        return json_response(self.bot_user)
+
+    async def get_user(self, request):
+        user = self.users.get(int(request.match_info["user_id"]))
+        return json_response(user) if user else self._error(404, 10013, "Unknown User")
+
+    async def get_application(self, request):
+        return json_response({"id": str(self.application_id), "name": "FastSupport", "bot": self.bot_user,
+                                  "owner": self.bot_user, "flags": 0, "team": None, "verify_key": "0" * 64,
+                                  "description": "", "icon": None, "bot_public": True, "bot_require_code_grant": False})
+
+    async def put_commands(self, request):
+        payload, _ = await self._read_payload(request)
+        out = []
+        for cmd in payload or []:
+            cmd = dict(cmd)
+            cmd.setdefault("id", str(self.snowflake()))
+            cmd.setdefault("application_id", str(self.application_id))
+            cmd.setdefault("version", str(self.snowflake()))
+            cmd.setdefault("type", 1)
+            cmd.setdefault("default_member_permissions", None)
+            out.append(cmd)
+        if "guild_id" not in request.match_info:
+            self.commands = out
+        return json_response(out)
+
+    async def get_commands(self, request):
+        return json_response(self.commands)
+
+    # ---------------- Routes : guildes / membres ----------------
+    async def get_guild(self, request):
+        guild = self.guilds.get(int(request.match_info["guild_id"]))
+        if guild is None:
+            return self._error(404, 10004, "Unknown Guild")
+        data = guild.payload()
+        for k in ("members", "channels", "threads", "presences", "voice_states"):
+            data.pop(k, None)
+        return json_response(data)
+
+    async def get_guild_channels(self, request):
+        guild = self.guilds.get(int(request.match_info["guild_id"]))
+        if guild is None:
+            return self._error(404, 10004, "Unknown Guild")
+        return json_response([self.public_channel(c) for c in guild.channels.values()])
+
+    async def get_member(self, request):
+        guild = self.guilds.get(int(request.match_info["guild_id"]))
+        uid = int(request.match_info["user_id"])
+        if guild is None or uid not in guild.members:
+            return self._error(404, 10007, "Unknown Member")
+        return json_response(guild.members[uid])
+
+    # ---------------- Routes : salons ----------------
+    async def create_channel(self, request):
+        guild = self.guilds.get(int(request.match_info["guild_id"]))
+        if guild is None:
+            return self._error(404, 10004, "Unknown Guild")
+        payload, _ = await self._read_payload(request)
+        channel = self._new_channel(guild, payload)
+        public = self.public_channel(channel)
+        self._emit("channel_create", public)
+        await self.dispatch("CHANNEL_CREATE", public, guild.id)
+        return json_response(public, status=201)
+
+    async def get_channel(self, request):
+        channel = self._channel_or_404(request)
+        return json_response(self.public_channel(channel)) if channel else self._error(404, 10003, "Unknown Channel")
+
+    async def edit_channel(self, request):
+        channel = self._channel_or_404(request)
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        payload, _ = await self._read_payload(request)
+        for k in ("name", "topic", "position", "nsfw", "rate_limit_per_user", "permission_overwrites"):
+            if k in payload:
+                channel[k] = payload[k]
+        if "parent_id" in payload:
+            channel["parent_id"] = str(payload["parent_id"]) if payload["parent_id"] else None
+        public = self.public_channel(channel)
+        self._emit("channel_update", public)
+        await self.dispatch("CHANNEL_UPDATE", public, int(channel["guild_id"]))
+        return json_response(public)
+
+    async def delete_channel(self, request):
+        channel = self._channel_or_404(request)
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        cid = int(channel["id"])
+        guild = self.guilds[int(channel["guild_id"])]
+        guild.channels.pop(cid, None)
+        self.channels.pop(cid, None)
+        public = self.public_channel(channel)
+        self._emit("channel_delete", public)
+        await self.dispatch("CHANNEL_DELETE", public, guild.id)
+        return json_response(public)
+
+    async def put_permission(self, request):
+        channel = self._channel_or_404(request)
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        payload, _ = await self._read_payload(request)
+        oid = request.match_info["overwrite_id"]
+        ow = [o for o in channel["permission_overwrites"] if str(o["id"]) != oid]
+        ow.append({"id": oid, "type": int(payload.get("type", 1)),
+                   "allow": str(payload.get("allow", "0")), "deny": str(payload.get("deny", "0"))})
+        channel["permission_overwrites"] = ow
+        public = self.public_channel(channel)
+        self._emit("channel_update", public)
+        await self.dispatch("CHANNEL_UPDATE", public, int(channel["guild_id"]))
+        return web.Response(status=204)
+
+    async def delete_permission(self, request):
+        channel = self._channel_or_404(request)
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        oid = request.match_info["overwrite_id"]
+        channel["permission_overwrites"] = [o for o in channel["permission_overwrites"] if str(o["id"]) != oid]
+        public = self.public_channel(channel)
+        self._emit("channel_update", public)
+        await self.dispatch("CHANNEL_UPDATE", public, int(channel["guild_id"]))
+        return web.Response(status=204)
+
+    # ---------------- Routes : messages ----------------
+    async def get_messages(self, request):
+        channel = self._channel_or_404(request)
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        q = request.query
+        limit = max(1, min(100, int(q.get("limit", 50))))
+        ids = sorted(channel["_messages"])
+        if "after" in q:
+            after = int(q["after"])
+            page = [i for i in ids if i > after][:limit]
+        elif "around" in q:
+            around = int(q["around"])
+            idx = next((n for n, i in enumerate(ids) if i >= around), len(ids))
+            lo = max(0, idx - limit // 2)
+            page = ids[lo:lo + limit]
+        else:
+            before = int(q["before"]) if "before" in q else None
+            page = [i for i in ids if before is None or i < before][-limit:]
+        # Discord renvoie toujours du plus récent au plus ancien
+        return json_response([channel["_messages"][i] for i in reversed(page)])
+
+    async def create_message(self, request):
+        channel = self._channel_or_404(request)
+        if channel is None:
+            return self._error(404, 10003, "Unknown Channel")
+        payload, files = await self._read_payload(request)
+        msg = self._message(channel, self.bot_user, payload, files)
+        await self._store_message(channel, msg)
+        return json_response(msg)
+
+    async def get_message(self, request):
+        channel = self._channel_or_404(request)
+        msg = channel["_messages"].get(int(request.match_info["message_id"])) if channel else None
+        return json_response(msg) if msg else self._error(404, 10008, "Unknown Message")
+
+    async def _edit(self, channel: dict, msg: dict, payload: dict):
+        for k in ("content", "embeds", "components", "flags"):
+            if k in payload and payload[k] is not None:
+                msg[k] = payload[k]
+        msg["edited_timestamp"] = now_iso()
+        self._emit("message_update", msg)
+        if channel is not None and int(msg["id"]) in channel["_messages"]:
+            await self.dispatch("MESSAGE_UPDATE", msg, int(channel["guild_id"]))
+
+    async def edit_message(self, request):
+        channel = self._channel_or_404(request)
+        msg = channel["_messages"].get(int(request.match_info["message_id"])) if channel else None
+        if msg is None:
+            return self._error(404, 10008, "Unknown Message")
+        payload, _ = await self._read_payload(request)
+        await self._edit(channel, msg, payload)
+        return json_response(msg)
+
+    async def delete_message(self, request):
+        channel = self._channel_or_404(request)
+        mid = int(request.match_info["message_id"])
+        if channel is None or mid not in channel["_messages"]:
+            return self._error(404, 10008, "Unknown Message")
+        del channel["_messages"][mid]
+        await self.dispatch("MESSAGE_DELETE", {"id": str(mid), "channel_id": channel["id"], "guild_id": channel["guild_id"]},
+                            int(channel["guild_id"]))
+        return web.Response(status=204)
+
+    async def get_attachment(self, request):
+        size = self.attachments.get((request.match_info["message_id"], request.match_info["filename"]))
+        if size is None:
+            return self._error(404, 0, "404: Not Found")
+        return web.Response(body=bytes(size), content_type="application/octet-stream")
+
+    # ---------------- Routes : interactions / webhooks ----------------
+    async def interaction_callback(self, request):
+        inter = self.interactions.get(request.match_info["token"])
+        if inter is None or str(inter.id) != request.match_info["interaction_id"]:
+            return self._error(404, 10062, "Unknown interaction")
+        if inter.acked_at is not None:
+            return self._error(400, 40060, "Interaction has already been acknowledged.")
+        if time.perf_counter() - inter.sent_at > INTERACTION_ACK_TIMEOUT:
+            inter.expired = True
+            self.stats["expired_interactions"] += 1
+            return self._error(404, 10062, "Unknown interaction")
+        payload, files = await self._read_payload(request)
+        rtype = int(payload.get("type", 4))
+        data = payload.get("data") or {}
+        inter.response_type = rtype
+        inter.acked_at = time.perf_counter()
+        channel = self.channels.get(inter.channel_id)
+        resource = {"type": rtype}
+        ephemeral = bool(int(data.get("flags") or 0) & 64)
+        if rtype in (4, 5) and channel is not None:
+            if rtype == 5:
+                data = dict(data, flags=int(data.get("flags") or 0) | 128)     # LOADING
+            msg = self._message(channel, self.bot_user, data, files, webhook_id=self.application_id)
+            msg["interaction_metadata"] = {"id": str(inter.id), "type": 3, "user": self.users.get(inter.user_id)}
+            inter.original = msg
+            resource["message"] = msg
+            if not ephemeral:
+                await self._store_message(channel, msg)
+        elif rtype == 7 and channel is not None and inter.message_id in channel["_messages"]:
+            msg = channel["_messages"][inter.message_id]
+            await self._edit(channel, msg, data)
+            resource["message"] = msg
+        inter._acked.set()
+        self._emit("interaction_callback", inter)
+        body = {
+            "interaction": {
+                "id": str(inter.id),
+                "type": 3,
+                "response_message_id": inter.original["id"] if inter.original else None,
+                "response_message_loading": rtype == 5,
+                "response_message_ephemeral": ephemeral,
+            },
+            "resource": resource,
+        }
+        return json_response(body)
+
+    async def create_followup(self, request):
+        inter = self.interactions.get(request.match_info["token"])
+        if inter is None or inter.acked_at is None:
+            return self._error(404, 10015, "Unknown Webhook")
+        payload, files = await self._read_payload(request)
+        channel = self.channels.get(inter.channel_id) or {"id": str(inter.channel_id), "guild_id": str(inter.guild.id)}
+        msg = self._message(channel, self.bot_user, payload, files, webhook_id=self.application_id)
+        if not (int(payload.get("flags") or 0) & 64) and "_messages" in channel:
+            await self._store_message(channel, msg)
+        inter.followups.append(msg)
+        inter._followup.set()
+        self._emit("followup", inter)
+        return json_response(msg)
+
+    def _webhook_message(self, request):
+        inter = self.interactions.get(request.match_info["token"])
+        if inter is None:
+            return None, None
+        mid = request.match_info["message_id"]
+        if mid == "@original":
+            return inter, inter.original
+        for msg in inter.followups:
+            if msg["id"] == mid:
+                return inter, msg
+        return inter, None
+
+    async def get_webhook_message(self, request):
+        _, msg = self._webhook_message(request)
+        return json_response(msg) if msg else self._error(404, 10008, "Unknown Message")
+
+    async def edit_webhook_message(self, request):
+        inter, msg = self._webhook_message(request)
+        if msg is None:
+            return self._error(404, 10008, "Unknown Message")
+        payload, _ = await self._read_payload(request)
+        msg["flags"] = int(msg.get("flags") or 0) & ~128
+        await self._edit(self.channels.get(inter.channel_id), msg, payload)
+        if request.match_info["message_id"] == "@original":
+            inter.followups.append(msg)
+            inter._followup.set()
+            self._emit("followup", inter)
+        return json_response(msg)
+
+    async def delete_webhook_message(self, request):
+        inter, msg = self._webhook_message(request)
+        if msg is None:
+            return self._error(404, 10008, "Unknown Message")
+        channel = self.channels.get(inter.channel_id)
+        if channel is not None:
+            channel["_messages"].pop(int(msg["id"]), None)
+        return web.Response(status=204)
+
+
+def point_client_at(base_url: str, gateway_url: str):
+    """Redirige discord.py (REST + gateway) vers le faux Discord. À appeler avant bot.start()."""
+    import yarl
+    from discord.gateway import DiscordWebSocket
+    from discord.http import Route
+
+    Route.BASE = base_url
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(gateway_url)
@@ -0,0 +1,149 @@
+"""
+Faux objets Discord minimalistes pour les benchmarks (aucun accès réseau).
+Ils n'exposent que les attributs lus par support.py sur les chemins mesurés.
+"""
+import itertools
+
+import discord
+
+
+_ids = itertools.count(10 ** 17)
+
+
+def snowflake() -> int:
+    return next(_ids)
+
+
+class FakeRole:
+    __slots__ = ("id", "name", "position")
+
+    def __init__(self, name: str, position: int = 0, role_id: int = None):
+        self.id = role_id if role_id is not None else snowflake()
+        self.name = name
+        self.position = position
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+
+class FakeMessage:
+    __slots__ = ("id", "channel", "embeds", "edits")
+
+    def __init__(self, channel, message_id: int = None, embeds=()):
+        self.id = message_id if message_id is not None else snowflake()
+        self.channel = channel
+        self.embeds = list(embeds)
+        self.edits = 0
+
+    async def edit(self, embed=None, **kwargs):
+        if embed is not None:
+            self.embeds = [embed]
+        self.edits += 1
+        return self
+
+
+class FakeTextChannel:
+    __slots__ = ("id", "guild", "name", "topic", "_messages")
+
+    def __init__(self, guild, name: str, channel_id: int = None, topic: str = None):
+        self.id = channel_id if channel_id is not None else snowflake()
+        self.guild = guild
+        self.name = name
+        self.topic = topic
+        self._messages = {}
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def add_message(self, message_id: int = None, embeds=()) -> FakeMessage:
+        msg = FakeMessage(self, message_id, embeds)
+        self._messages[msg.id] = msg
+        return msg
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        try:
+            return self._messages[message_id]
+        except KeyError:
+            raise LookupError(f"message {message_id} introuvable") from None
+
+
+class FakeCategory:
+    def __init__(self, guild, name: str):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.text_channels = []
+
+
+class FakeGuild:
+    def __init__(self, name: str = "bench", guild_id: int = None, roles: int = 0):
+        self.id = guild_id if guild_id is not None else snowflake()
+        self.name = name
+        self.owner_id = snowflake()
+        self.default_role = FakeRole("@everyone", 0, role_id=self.id)
+        self.roles = [self.default_role] + [FakeRole(f"role-{i}", i + 1) for i in range(roles)]
+        self.text_channels = []
+        self.categories = []
+        self._channels = {}
+        self._roles = {r.id: r for r in self.roles}
+        self._members = {}
+
+    def add_role(self, name: str) -> FakeRole:
+        role = FakeRole(name, len(self.roles))
+        self.roles.append(role)
+        self._roles[role.id] = role
+        return role
+
+    def add_text_channel(self, name: str, category: FakeCategory = None, topic: str = None, channel_id: int = None) -> FakeTextChannel:
+        ch = FakeTextChannel(self, name, channel_id=channel_id, topic=topic)
+        self.text_channels.append(ch)
+        self._channels[ch.id] = ch
+        if category is not None:
+            category.text_channels.append(ch)
+        return ch
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id: int):
+        return self._roles.get(role_id)
+
+    def add_member(self, member):
+        self._members[member.id] = member
+        return member
+
+    def get_member(self, member_id: int):
+        return self._members.get(member_id)
+
+
+class FakeMember:
+    def __init__(self, guild: FakeGuild, name: str = "membre", roles=(), permissions: discord.Permissions = None, member_id: int = None):
+        self.id = member_id if member_id is not None else snowflake()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.roles = [guild.default_role] + list(roles)
+        self.guild_permissions = permissions if permissions is not None else discord.Permissions.none()
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+
+class FakeInteraction:
+    """Interaction réduite : guild / user / channel, sans réponse réseau."""
+
+    def __init__(self, guild: FakeGuild, user: FakeMember, channel: FakeTextChannel = None):
+        self.id = snowflake()
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel
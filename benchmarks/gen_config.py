@@ -0,0 +1,104 @@
+"""
+Génère un guild_config.json synthétique : ancien format (un objet JSON, converti par le bot à la
+première sauvegarde) ou, avec --lines, le format « une ligne par guilde » écrit par save_config.
+
+    python benchmarks/gen_config.py --guilds 10000 --categories 8 --tickets 20 -o /tmp/guild_config.json
+    python benchmarks/gen_config.py --guilds 100000 --lines -o /tmp/guild_config.json
+
+Les IDs sont déterministes (--seed) : deux fichiers de même taille sont identiques.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+CATEGORY_LABELS = ["Gestion Staff", "Partenariat", "Autre", "Support technique", "Signalement",
+                   "Boutique", "Recrutement", "Réclamation", "Événements", "Suggestion"]
+EMOJIS = ["🔰", "🤝", "❓", "🛠️", "🚨", "🛒", "📝", "⚖️", "🎉", "💡"]
+
+GUILD_BASE = 10 ** 18
+CHANNEL_BASE = 11 * 10 ** 17
+MESSAGE_BASE = 12 * 10 ** 17
+USER_BASE = 13 * 10 ** 17
+ROLE_BASE = 14 * 10 ** 17
+
+
+def guild_id(i: int) -> int:
+    return GUILD_BASE + i
+
+
+def ticket_ids(g: int, t: int, tickets: int):
+    """(channel_id, message_id, owner_id) du ticket `t` de la guilde d'indice `g`."""
+    n = g * tickets + t
+    return CHANNEL_BASE + n, MESSAGE_BASE + n, USER_BASE + n
+
+
+def generate_guild(rng: random.Random, g: int, categories: int, tickets: int, claimed_ratio: float) -> dict:
+    cats = []
+    for c in range(categories):
+        label = CATEGORY_LABELS[c % len(CATEGORY_LABELS)] + ("" if c < len(CATEGORY_LABELS) else f" {c}")
+        cats.append({
+            "label": label,
+            "description": f"Demande de type {label.lower()}",
+            "emoji": EMOJIS[c % len(EMOJIS)],
+            "notify_role_id": ROLE_BASE + g * 100 + c if rng.random() < 0.5 else None,
+            "close_role_ids": [ROLE_BASE + g * 100 + 50 + c] if rng.random() < 0.3 else [],
+        })
+    open_tickets = {}
+    for t in range(tickets):
+        channel_id, message_id, owner_id = ticket_ids(g, t, tickets)
+        cat = cats[t % len(cats)]["label"] if cats else "Autre"
+        open_tickets[str(channel_id)] = {
+            "channel_id": channel_id,
+            "channel_name": f"ticket-user{t}",
+            "owner_id": owner_id,
+            "claimed_by": USER_BASE - 1 - g if rng.random() < claimed_ratio else None,
+            "category": cat,
+            "message_id": message_id,
+        }
+    return {
+        "support_channel_id": None,
+        "staff_role_ids": [ROLE_BASE + g * 100 + 99],
+        "allow_owner_close": False,
+        "categories": cats,
+        "open_tickets": open_tickets,
+    }
+
+
+def generate(guilds: int, categories: int = 3, tickets: int = 0, claimed_ratio: float = 0.3, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {str(guild_id(g)): generate_guild(rng, g, categories, tickets, claimed_ratio) for g in range(guilds)}
+
+
+def write(path: str, cfg: dict, lines: bool = False):
+    if not lines:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, ensure_ascii=False, indent=2)
+        return
+    # l'index (<fichier>.idx) est reconstruit par le bot au premier démarrage
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config_model import SCHEMA_KEY, SCHEMA_VERSION
+    from config_store import FORMAT, _line
+    with open(path, "wb") as f:
+        f.write(json.dumps({"format": FORMAT, SCHEMA_KEY: SCHEMA_VERSION}).encode("utf-8") + b"\n")
+        for gid, data in cfg.items():
+            f.write(_line(int(gid), data))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un guild_config.json synthétique")
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--tickets", type=int, default=10, help="tickets ouverts par guilde")
+    parser.add_argument("--claimed", type=float, default=0.3, help="part des tickets déjà pris en charge")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lines", action="store_true", help="format une ligne par guilde (au lieu de l'ancien JSON)")
+    parser.add_argument("-o", "--output", default="guild_config.synthetic.json")
+    args = parser.parse_args(argv)
+    write(args.output, generate(args.guilds, args.categories, args.tickets, args.claimed, args.seed), args.lines)
+    print(f"{args.output}: {args.guilds} guildes, {args.categories} catégories, {args.tickets} tickets/guilde")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Rejeu d'un enregistrement de trafic (traffic_recorder.py, activé par FASTSUPPORT_RECORD_FILE)
+contre le faux Discord local : mêmes guildes, config et interactions (IDs anonymisés), à la
+vitesse d'origine ou accélérée. Aucun accès réseau.
+
+    python benchmarks/replay.py traffic.jsonl                      # vitesse d'origine
+    python benchmarks/replay.py traffic.jsonl --speed 10           # 10x plus vite
+    python benchmarks/replay.py traffic.jsonl --speed 0            # au plus vite
+    python benchmarks/replay.py traffic.jsonl --from 3600 --duration 900 --speed 2
+    python benchmarks/replay.py traffic.jsonl --compare results/replay-20261019-101500.json
+
+Les salons créés par le bot pendant l'enregistrement sont recréés par le bot pendant le rejeu :
+l'ID enregistré est relié au salon créé dans le faux Discord (même guilde, même type, même
+parent, dans l'ordre). À défaut (salon créé à la main, fenêtre --from), le salon est créé
+directement dans le faux Discord. Les messages du bot ne sont pas rejoués (le bot les renvoie
+lui-même) ; ceux des membres le sont, contenu masqué de même longueur et pièces jointes de même
+taille. Avec --from, la config est celle du début de l'enregistrement : les tickets ouverts
+avant la fenêtre n'y figurent pas.
+
+Affiche la latence d'accusé de réception par type d'interaction, le retard de l'ordonnanceur
+(le rejeu a-t-il tenu la cadence ?), les 429 / interactions expirées, puis /perf-stats.
+Code de sortie 1 si des interactions ont expiré (> 3 s sans réponse).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+
+sys.path.insert(0, HERE)
+from e2e_load import Recorder, percentiles, start_bot, stop_bot  # noqa: E402
+from fake_discord import FakeDiscord  # noqa: E402
+
+_SNOWFLAKE_RE = re.compile(r"(?<!\d)\d{15,21}(?!\d)")
+
+
+# ---------------- Lecture de l'enregistrement ----------------
+def load_sessions(path: str) -> list:
+    """
+    Sessions du fichier (une par démarrage du bot : le fichier est ouvert en ajout).
+    Chaque session : {"header", "config", "events"}.
+    """
+    sessions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue    # dernière ligne tronquée (arrêt brutal)
+            event = rec.get("e")
+            if event == "HEADER" or not sessions:
+                sessions.append({"header": rec if event == "HEADER" else {}, "config": None, "events": []})
+                if event == "HEADER":
+                    continue
+            if event == "CONFIG":
+                if sessions[-1]["config"] is None:
+                    sessions[-1]["config"] = rec["d"]
+            else:
+                sessions[-1]["events"].append(rec)
+    return sessions
+
+
+def interaction_kind(itype: int, data: dict) -> str:
+    """Libellé agrégeable : /commande [sous-commande], custom_id sans son ID final, modal:..."""
+    if itype in (2, 4):
+        names = [data.get("name", "?")]
+        options = data.get("options") or []
+        while options and options[0].get("type") in (1, 2):     # sous-commande / groupe
+            names.append(options[0].get("name", "?"))
+            options = options[0].get("options") or []
+        return ("/" if itype == 2 else "autocomplete:/") + " ".join(names)
+    label = re.sub(r"_?\d+$", "", str(data.get("custom_id", "?")))
+    return ("modal:" if itype == 5 else "") + label
+
+
+# ---------------- Rejeu ----------------
+class Replayer:
+    def __init__(self, fake: FakeDiscord, bind_timeout: float, rec: Recorder):
+        self.fake = fake
+        self.bind_timeout = bind_timeout
+        self.rec = rec
+        self.recorded_channels = {}     # id enregistré -> salon créé pendant l'enregistrement
+        self.bound = {}                 # id enregistré -> id dans le faux Discord
+        self._bound_events = {}
+        self.pending = []               # salons enregistrés pas encore recréés par le bot
+        self.unclaimed = []             # salons créés par le bot sans équivalent enregistré (encore)
+        self.interactions = []          # (type, FakeInteraction)
+        self.bot_ids = {fake.application_id}    # + ID (anonymisé) du bot enregistré, cf. READY
+        self.lag = []
+        self.played = 0
+        fake.listeners.append(self.on_fake_event)
+
+    # ---- correspondance des salons ----
+    def translate_id(self, rid: int) -> int:
+        return self.bound.get(rid, rid)
+
+    def translate(self, obj):
+        """Remplace, dans les custom_id / options, les IDs enregistrés par ceux du faux Discord."""
+        if isinstance(obj, dict):
+            return {self.translate(k): self.translate(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.translate(v) for v in obj]
+        if isinstance(obj, str) and self.bound:
+            return _SNOWFLAKE_RE.sub(lambda m: str(self.bound.get(int(m.group(0)), m.group(0))), obj)
+        return obj
+
+    def _parent(self, channel: dict):
+        parent = channel.get("parent_id")
+        return self.translate_id(int(parent)) if parent else None
+
+    def _match_key(self, channel: dict, parent) -> tuple:
+        """
+        Clé de correspondance : un salon de ticket porte une permission propre à son auteur (mêmes
+        IDs de membres à l'enregistrement et au rejeu) ; sinon, on se rabat sur type + parent.
+        """
+        members = frozenset(int(o["id"]) for o in channel.get("permission_overwrites") or []
+                            if int(o.get("type", 0)) == 1 and int(o["id"]) not in self.bot_ids)
+        if members:
+            return int(channel["guild_id"]), int(channel["type"]), members
+        return int(channel["guild_id"]), int(channel["type"]), parent
+
+    def _bind(self, rid: int, fid: int):
+        self.bound[rid] = fid
+        ev = self._bound_events.get(rid)
+        if ev is not None:
+            ev.set()
+
+    def on_fake_event(self, kind: str, obj):
+        if kind != "channel_create":
+            return
+        key = self._match_key(obj, int(obj["parent_id"]) if obj.get("parent_id") else None)
+        for i, ch in enumerate(self.pending):
+            if self._match_key(ch, self._parent(ch)) == key:
+                del self.pending[i]
+                self._bind(int(ch["id"]), int(obj["id"]))
+                return
+        self.unclaimed.append((key, int(obj["id"])))
+
+    def register_channel(self, ch: dict):
+        """CHANNEL_CREATE enregistré : relie au salon déjà créé par le bot, sinon attend sa création."""
+        key = self._match_key(ch, self._parent(ch))
+        for i, (k, fid) in enumerate(self.unclaimed):
+            if k == key:
+                del self.unclaimed[i]
+                self._bind(int(ch["id"]), fid)
+                return
+        self.pending.append(ch)
+
+    def create_channel(self, guild, ch: dict) -> int:
+        """Crée directement le salon enregistré (même ID) dans le faux Discord."""
+        rid = int(ch["id"])
+        self.pending = [p for p in self.pending if int(p["id"]) != rid]
+        data = dict(ch, parent_id=self._parent(ch))
+        self.fake._new_channel(guild, data, channel_id=rid)
+        return rid
+
+    async def resolve_channel(self, guild, channel_id) -> int:
+        rid = int(channel_id)
+        if rid in self.bound:
+            return self.bound[rid]
+        if rid in self.fake.channels:
+            return rid
+        ch = self.recorded_channels.get(rid)
+        if ch is not None:
+            ev = self._bound_events.setdefault(rid, asyncio.Event())
+            try:
+                await asyncio.wait_for(ev.wait(), self.bind_timeout)
+                return self.bound[rid]
+            except asyncio.TimeoutError:
+                pass
+            if rid in self.bound:
+                return self.bound[rid]
+        else:
+            ch = {"id": str(rid), "guild_id": str(guild.id), "type": 0, "name": "salon"}
+        self.rec.error("salon recréé faute de correspondance", LookupError(rid))
+        self.create_channel(guild, ch)
+        await self.fake.dispatch("CHANNEL_CREATE", self.fake.public_channel(self.fake.channels[rid]), guild.id)
+        return rid
+
+    async def component_message(self, channel_id: int, custom_id: str):
+        msg = self.fake.find_component_message(channel_id, custom_id)
+        if msg is not None:
+            return msg
+
+        def has_component(m):
+            return int(m["channel_id"]) == channel_id and any(
+                str(c.get("custom_id")) == custom_id for row in m.get("components") or [] for c in row.get("components") or [])
+        try:
+            return await self.fake.wait_for("message_create", has_component, timeout=self.bind_timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    # ---- événements ----
+    def prepare(self, events: list, start: float):
+        """Guildes et salons existant au début de la fenêtre ; salons à relier ensuite."""
+        for ev in events:
+            e, d = ev["e"], ev.get("d") or {}
+            before = ev["t"] < start
+            if e == "READY" and d.get("user_id"):
+                self.bot_ids.add(int(d["user_id"]))
+            elif e == "GUILD_CREATE" and (d.get("initial") or before):
+                if int(d["id"]) not in self.fake.guilds:
+                    self.fake.add_guild_snapshot(d)
+            elif e == "GUILD_DELETE" and before and not d.get("unavailable"):
+                self.fake.remove_guild(int(d["id"]))
+            elif e == "CHANNEL_CREATE":
+                guild = self.fake.guilds.get(int(d["guild_id"]))
+                if before:
+                    if guild is not None and int(d["id"]) not in self.fake.channels:
+                        self.create_channel(guild, d)
+                else:
+                    self.recorded_channels[int(d["id"])] = d
+            elif e == "CHANNEL_DELETE" and before:
+                guild = self.fake.guilds.get(int(d["guild_id"]))
+                if guild is not None:
+                    guild.channels.pop(int(d["id"]), None)
+                    self.fake.channels.pop(int(d["id"]), None)
+
+    async def play(self, ev: dict):
+        e, d = ev["e"], ev.get("d") or {}
+        try:
+            if e == "INTERACTION_CREATE":
+                await self.play_interaction(d)
+            elif e == "MESSAGE_CREATE":
+                await self.play_message(d)
+            elif e == "CHANNEL_CREATE":
+                self.register_channel(d)
+            elif e == "GUILD_CREATE" and not d.get("initial"):
+                guild = self.fake.add_guild_snapshot(d)
+                await self.fake.dispatch("GUILD_CREATE", guild.payload(), guild.id)
+            elif e == "GUILD_DELETE" and not d.get("unavailable"):
+                if self.fake.remove_guild(int(d["id"])) is not None:
+                    await self.fake.dispatch("GUILD_DELETE", {"id": d["id"]}, int(d["id"]))
+            else:
+                return      # CHANNEL_DELETE (le bot supprime lui-même), READY...
+            self.played += 1
+        except Exception as exc:
+            self.rec.error(e, exc)
+
+    async def play_message(self, d: dict):
+        if d.get("bot"):
+            return
+        guild = self.fake.guilds.get(int(d.get("guild_id") or 0))
+        if guild is None:
+            return
+        author = int(d["author_id"])
+        self.fake.ensure_member(guild, author)
+        cid = await self.resolve_channel(guild, d["channel_id"])
+        await self.fake.user_message(cid, author, "x" * int(d.get("content_len") or 0), d.get("attachments") or ())
+
+    async def play_interaction(self, d: dict):
+        guild = self.fake.guilds.get(int(d.get("guild_id") or 0))
+        if guild is None:
+            self.rec.error("interaction (guilde inconnue)", LookupError(d.get("guild_id")))
+            return
+        uid = int(d["user_id"])
+        self.fake.ensure_member(guild, uid, [int(r) for r in d.get("roles") or []])
+        cid = await self.resolve_channel(guild, d["channel_id"])
+        itype = int(d["type"])
+        data = self.translate(d.get("data") or {})
+        for mid, member in ((data.get("resolved") or {}).get("members") or {}).items():
+            self.fake.ensure_member(guild, int(mid), [int(r) for r in member.get("roles") or []])
+        message = None
+        if itype == 3:
+            message = await self.component_message(cid, str(data.get("custom_id", "")))
+            if message is None:
+                self.rec.error("interaction (message du composant introuvable)", LookupError(data.get("custom_id")))
+                return
+        inter = await self.fake.interaction(guild, uid, cid, itype, data, message)
+        self.interactions.append((interaction_kind(itype, data), inter))
+
+    async def run(self, events: list, speed: float, start: float):
+        t0 = time.perf_counter()
+        tasks = []
+        for ev in events:
+            if speed > 0:
+                due = (ev["t"] - start) / speed
+                delay = due - (time.perf_counter() - t0)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.lag.append(max(0.0, time.perf_counter() - t0 - due))
+            tasks.append(asyncio.ensure_future(self.play(ev)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - t0
+
+
+# ---------------- Harnais ----------------
+async def run(args, session: dict) -> dict:
+    events = [ev for ev in session["events"] if "t" in ev]
+    start = args.start or 0.0
+    end = start + args.duration if args.duration else float("inf")
+    window = [ev for ev in events if start <= ev["t"] < end]
+
+    rec = Recorder()
+    fake = FakeDiscord(latency_ms=args.latency_ms, seed=args.seed)
+    replayer = Replayer(fake, args.bind_timeout, rec)
+    replayer.prepare(events, start)
+    with open(os.path.join(args.workdir, "guild_config.json"), "w", encoding="utf-8") as f:
+        json.dump(session["config"] or {}, f, ensure_ascii=False)
+    await fake.start()
+
+    support, bot_task = await start_bot(fake, args.workdir)
+    try:
+        print(f"Bot prêt ({len(fake.guilds)} guildes) — rejeu de {len(window)} événements "
+              f"({window[-1]['t'] - window[0]['t'] if window else 0:.0f} s enregistrées, vitesse "
+              f"{'max' if args.speed <= 0 else f'x{args.speed:g}'})")
+        elapsed = await replayer.run(window, args.speed, window[0]["t"] if window else start)
+        # dernières réponses
+        await asyncio.gather(*(i.wait_ack(args.bind_timeout) for _, i in replayer.interactions), return_exceptions=True)
+        perf_table = support.stats_table()
+    finally:
+        await stop_bot(support, bot_task)
+        await fake.stop()
+
+    kinds = {}
+    for kind, inter in replayer.interactions:
+        k = kinds.setdefault(kind, {"acks": [], "unacked": 0, "expired": 0})
+        if inter.ack_latency is not None:
+            k["acks"].append(inter.ack_latency)
+        else:
+            k["unacked"] += 1
+        if inter.expired:
+            k["expired"] += 1
+    return {
+        "elapsed_s": elapsed,
+        "events": len(window),
+        "played": replayer.played,
+        "events_per_s": replayer.played / elapsed if elapsed else 0.0,
+        "schedule_lag": percentiles(replayer.lag),
+        "interactions": {kind: dict(percentiles(k["acks"]), unacked=k["unacked"], expired=k["expired"])
+                         for kind, k in sorted(kinds.items())},
+        "errors": rec.errors,
+        "fake_discord": fake.stats,
+        "perf_stats": perf_table,
+    }
+
+
+def print_compare(res: dict, path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\nComparaison avec {os.path.basename(path)} (ack p50 / p95, ms) :")
+    print(f"{'interaction':<40} {'avant':>13} {'après':>13} {'Δ p95':>8}")
+    for kind, p in res["interactions"].items():
+        o = old.get("interactions", {}).get(kind)
+        if not o or not o.get("n") or not p.get("n"):
+            continue
+        delta = (p["p95_ms"] - o["p95_ms"]) / o["p95_ms"] * 100 if o["p95_ms"] else 0.0
+        print(f"{kind[:40]:<40} {o['p50_ms']:>6.0f}/{o['p95_ms']:<6.0f} {p['p50_ms']:>6.0f}/{p['p95_ms']:<6.0f} {delta:>+7.1f}%")
+    print(f"{'événements / s':<40} {old.get('events_per_s', 0):>13.2f} {res['events_per_s']:>13.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rejoue un enregistrement de trafic contre un faux Discord local")
+    parser.add_argument("recording", help="fichier JSONL produit par FASTSUPPORT_RECORD_FILE")
+    parser.add_argument("--speed", type=float, default=1.0, help="facteur de vitesse (0 = au plus vite)")
+    parser.add_argument("--from", dest="start", type=float, default=0.0, help="début de la fenêtre (s depuis le début)")
+    parser.add_argument("--duration", type=float, default=0.0, help="durée de la fenêtre (s enregistrées, 0 = tout)")
+    parser.add_argument("--session", type=int, default=-1, help="session du fichier (une par démarrage, -1 = dernière)")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="latence médiane simulée de l'API")
+    parser.add_argument("--bind-timeout", type=float, default=30.0, help="attente max (s) d'un salon / message à recréer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", metavar="RESULTATS", help="résultats d'un rejeu précédent (results/replay-*.json)")
+    parser.add_argument("--no-save", action="store_true", help="ne pas enregistrer les résultats")
+    args = parser.parse_args(argv)
+
+    recording = os.path.abspath(args.recording)
+    compare = os.path.abspath(args.compare) if args.compare else None
+    sessions = load_sessions(recording)
+    if not sessions:
+        print(f"{recording} : aucun événement")
+        return 1
+    session = sessions[args.session]
+
+    with tempfile.TemporaryDirectory(prefix="fastsupport-replay-") as workdir:
+        args.workdir = workdir
+        res = asyncio.run(run(args, session))
+        os.chdir(HERE)
+    del args.workdir
+
+    print(f"\n{res['played']}/{res['events']} événements rejoués en {res['elapsed_s']:.1f} s ({res['events_per_s']:.1f}/s)")
+    lag = res["schedule_lag"]
+    if lag["n"]:
+        print(f"retard de l'ordonnanceur : p50 {lag['p50_ms']:.0f} ms, p95 {lag['p95_ms']:.0f} ms, max {lag['max_ms']:.0f} ms")
+    print(f"{'interaction':<40} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sans ack':>9} {'expirées':>9}")
+    for kind, p in res["interactions"].items():
+        if p["n"]:
+            print(f"{kind[:40]:<40} {p['n']:>5} {p['p50_ms']:>8.0f} {p['p95_ms']:>8.0f} {p['p99_ms']:>8.0f} "
+                  f"{p['unacked']:>9} {p['expired']:>9}")
+        else:
+            print(f"{kind[:40]:<40} {0:>5} {'-':>8} {'-':>8} {'-':>8} {p['unacked']:>9} {p['expired']:>9}")
+    fd = res["fake_discord"]
+    print(f"\nFaux Discord : {fd['requests']} requêtes, {fd['ratelimited']} réponses 429, "
+          f"{fd['expired_interactions']} interactions expirées")
+    for route, n in fd["unknown_routes"].items():
+        print(f"  route non implémentée : {route} ({n})")
+    for err, n in res["errors"].items():
+        print(f"  {err} ({n})")
+    print("\n/perf-stats du bot :\n" + res["perf_stats"])
+
+    if compare:
+        print_compare(res, compare)
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, "replay-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(timespec="seconds"), "recording": recording,
+                       "args": vars(args), **res}, f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {out}")
+    return 1 if fd["expired_interactions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
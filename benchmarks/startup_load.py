@@ -0,0 +1,200 @@
+"""
+Test de charge du démarrage : pour chaque taille de config synthétique, mesure dans un
+processus neuf le temps import -> fin de on_ready, le pic de RSS et la latence de save_config,
+puis compare aux budgets (benchmarks/startup_budgets.json).
+
+    python benchmarks/startup_load.py                               # tailles par défaut
+    python benchmarks/startup_load.py --sizes 100,1000 --tickets 20
+    python benchmarks/startup_load.py --budgets mes_budgets.json
+    python benchmarks/startup_load.py --sizes 100000 --active 5      # bot présent dans 5 % des guildes
+    python benchmarks/startup_load.py --legacy                       # import de l'ancien format JSON
+
+Sans gateway, on_ready parcourt des guildes factices (benchmarks/fakes.py) reconstruites
+depuis la config : un salon + un message par ticket ouvert. Le RSS inclut ces objets.
+Avec --active, seule une partie des guildes de la config existe encore côté Discord : les
+autres ne sont jamais chargées (chargement à la demande).
+Code de sortie 1 si un budget est dépassé.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+DEFAULT_BUDGETS = os.path.join(HERE, "startup_budgets.json")
+
+METRICS = ("ready_s", "rss_mb", "save_s")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:     # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko, macOS : octets
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ---------------- Processus enfant : une mesure ----------------
+def build_fake_guilds(support, active: float = 100.0):
+    import discord
+    from fakes import FakeGuild
+
+    guilds = []
+    gids = list(support.GCFG.keys())
+    for gid in gids[:max(1, round(len(gids) * active / 100.0))] if gids else ():
+        gcfg = support.GCFG[gid]
+        guild = FakeGuild(guild_id=gid)
+        for key, info in gcfg.open_tickets.items():
+            ch = guild.add_text_channel(info.channel_name or f"ticket-{key}", channel_id=info.channel_id)
+            embeds = ()
+            if info.claimed_by:
+                # seuls les tickets pris en charge voient leur embed réécrit par on_ready
+                embed = discord.Embed(title="🎫 Ticket")
+                embed.add_field(name="\u200b", value=f"• <@{info.owner_id}> a créé un ticket concernant les **{info.category}** !", inline=False)
+                embed.add_field(name="\u200b", value="---------------------------------------------", inline=False)
+                embed.add_field(name="\u200b", value="• Le ticket est en attente de prise en charge.", inline=False)
+                embeds = (embed,)
+            if info.message_id:
+                ch.add_message(info.message_id, embeds)
+        guilds.append(guild)
+    return guilds
+
+
+def child(workdir: str, save_runs: int, active: float = 100.0) -> dict:
+    sys.path.insert(0, HERE)
+    from bench_support import load_support
+
+    t0 = time.perf_counter()
+    support = load_support(workdir)
+    import_s = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    support.load_config()
+    config_load_s = time.perf_counter() - t1
+
+    # guildes factices injectées dans le cache du bot (non chronométré) ; config rouverte ensuite
+    # pour que on_ready paie le chargement à la demande des guildes actives
+    for guild in build_fake_guilds(support, active):
+        support.bot._connection._add_guild(guild)
+    support.GCFG = support.load_config()
+
+    loop = asyncio.new_event_loop()
+    t2 = time.perf_counter()
+    loop.run_until_complete(support.on_ready())
+    on_ready_s = time.perf_counter() - t2
+
+    saves = []
+    for _ in range(save_runs):
+        t3 = time.perf_counter()
+        loop.run_until_complete(support.save_config(support.GCFG))
+        saves.append(time.perf_counter() - t3)
+
+    return {
+        "import_s": import_s,
+        "config_load_s": config_load_s,
+        "on_ready_s": on_ready_s,
+        "ready_s": import_s + on_ready_s,
+        "save_s": statistics.median(saves),
+        "config_bytes": os.path.getsize(support.CONFIG_FILE),
+        "guilds_loaded": support.GCFG.loaded_count(),
+        "rss_mb": peak_rss_mb(),
+    }
+
+
+# ---------------- Harnais ----------------
+def run_size(guilds: int, categories: int, tickets: int, save_runs: int, active: float = 100.0,
+             legacy: bool = False) -> dict:
+    sys.path.insert(0, HERE)
+    import gen_config
+
+    with tempfile.TemporaryDirectory(prefix="fastsupport-startup-") as workdir:
+        gen_config.write(os.path.join(workdir, "guild_config.json"), gen_config.generate(guilds, categories, tickets),
+                         lines=not legacy)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", workdir, "--save-runs", str(save_runs),
+             "--active", str(active)],
+            capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"mesure échouée pour {guilds} guildes:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def load_budgets(path: str) -> dict:
+    if not path or not os.path.isfile(path):
+        return {"default": {}, "sizes": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("default", {})
+    data.setdefault("sizes", {})
+    return data
+
+
+def budget_for(budgets: dict, guilds: int) -> dict:
+    b = dict(budgets["default"])
+    b.update(budgets["sizes"].get(str(guilds), {}))
+    return b
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge du démarrage de support.py")
+    parser.add_argument("--sizes", default="100,1000,10000", help="nombres de guildes, séparés par des virgules")
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--tickets", type=int, default=10, help="tickets ouverts par guilde")
+    parser.add_argument("--save-runs", type=int, default=3)
+    parser.add_argument("--active", type=float, default=100.0, help="%% des guildes de la config où le bot est présent")
+    parser.add_argument("--legacy", action="store_true", help="config générée dans l'ancien format JSON (import complet)")
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS)
+    parser.add_argument("--no-save", action="store_true", help="ne pas enregistrer les résultats")
+    parser.add_argument("--child", metavar="WORKDIR", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child, args.save_runs, args.active)))
+        return 0
+
+    budgets = load_budgets(args.budgets)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results, failures = {}, []
+    print(f"{'guildes':>8} {'fichier Mo':>10} {'import s':>9} {'on_ready s':>10} {'prêt s':>8} {'RSS Mo':>8} {'save s':>8}")
+    for guilds in sizes:
+        res = run_size(guilds, args.categories, args.tickets, args.save_runs, args.active, args.legacy)
+        results[str(guilds)] = res
+        budget = budget_for(budgets, guilds)
+        over = [m for m in METRICS if m in budget and res.get(m) is not None and res[m] > budget[m]]
+        for m in over:
+            failures.append(f"{guilds} guildes: {m}={res[m]:.2f} > budget {budget[m]}")
+        rss = f"{res['rss_mb']:.0f}" if res["rss_mb"] is not None else "-"
+        print(
+            f"{guilds:>8} {res['config_bytes'] / 1e6:>10.1f} {res['import_s']:>9.2f} {res['on_ready_s']:>10.2f} "
+            f"{res['ready_s']:>8.2f} {rss:>8} {res['save_s']:>8.3f}" + ("  ⚠ " + ",".join(over) if over else "")
+        )
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, "startup-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(timespec="seconds"), "args": vars(args), "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats enregistrés dans {out}")
+
+    if failures:
+        print("\nBudgets dépassés :")
+        for f in failures:
+            print("  - " + f)
+        return 1
+    print("\nTous les budgets sont respectés.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Coordinateur de cluster : lance support.py en plusieurs processus, chacun sur une plage de
+shards de la gateway (et donc sur les guildes de ces shards), les relance s'ils s'arrêtent et
+expose /metrics, /healthz et /readyz pour l'ensemble.
+
+    python cluster.py --clusters 4                  # nombre de shards recommandé par Discord
+    python cluster.py --clusters 2 --shards 16 --port 8080
+
+Le processus n°i écoute sur --port + 1 + i ; le coordinateur sur --port. Les métriques des
+processus sont additionnées (compteurs, histogrammes, jauges de volume) ; les jauges de durée
+gardent le maximum et le budget de rate-limit le minimum.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+
+import metrics
+from sharding import format_shard_ids, split_shards
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger("fastsupport.cluster")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUPPORT_SCRIPT = os.path.join(HERE, "support.py")
+DISCORD_API = "https://discord.com/api/v10"
+SCRAPE_TIMEOUT = 2.0
+STOP_TIMEOUT = 30.0
+MAX_RESTART_DELAY = 60.0
+
+# jauges qui ne s'additionnent pas entre processus (défaut : somme)
+GAUGE_AGGREGATION = {
+    "fastsupport_save_config_last_bytes": max,        # même fichier pour tous les processus
+    "fastsupport_discord_ratelimit_remaining": min,   # budget partagé par le token
+}
+
+
+def _gauge_aggregate(family: str):
+    if family in GAUGE_AGGREGATION:
+        return GAUGE_AGGREGATION[family]
+    return max if family.endswith("_seconds") else sum
+
+
+def _family_of(name: str, types: dict) -> str:
+    if name in types:
+        return name
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[:-len(suffix)] in types:
+            return name[:-len(suffix)]
+    return name
+
+
+def merge_metrics(texts) -> str:
+    """Fusionne plusieurs expositions Prometheus (texte) du bot en une seule."""
+    helps, types = {}, {}
+    samples = {}        # famille -> {série: [valeurs]}
+    for text in texts:
+        for line in text.splitlines():
+            if line.startswith("# HELP "):
+                name, _, doc = line[7:].partition(" ")
+                helps.setdefault(name, doc)
+                samples.setdefault(name, {})
+            elif line.startswith("# TYPE "):
+                name, _, kind = line[7:].partition(" ")
+                types.setdefault(name, kind)
+                samples.setdefault(name, {})
+            elif line and not line.startswith("#"):
+                series, _, value = line.rpartition(" ")
+                try:
+                    value = float(value)
+                except ValueError:
+                    continue
+                name = series.split("{", 1)[0]
+                samples.setdefault(_family_of(name, types), {}).setdefault(series, []).append(value)
+    out = []
+    for family, series in samples.items():
+        if family in helps:
+            out.append(f"# HELP {family} {helps[family]}")
+        if family in types:
+            out.append(f"# TYPE {family} {types[family]}")
+        aggregate = _gauge_aggregate(family) if types.get(family) == "gauge" else sum
+        for s, values in series.items():
+            out.append(f"{s} {metrics._fmt(aggregate(values))}")
+    return "\n".join(out) + "\n"
+
+
+async def fetch_recommended_shards(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{DISCORD_API}/gateway/bot", headers={"Authorization": f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            return int((await resp.json())["shards"])
+
+
+class ClusterProcess:
+    """Un processus support.py et ses shards ; relancé avec un délai croissant s'il s'arrête."""
+
+    def __init__(self, cluster_id: int, shard_ids, shard_count: int, port: int):
+        self.cluster_id = cluster_id
+        self.shard_ids = tuple(shard_ids)
+        self.shard_count = shard_count
+        self.port = port
+        self.proc = None
+        self.restarts = 0
+        self.started_at = None
+        self.stopping = False
+
+    def env(self) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "FASTSUPPORT_SHARD_COUNT": str(self.shard_count),
+            "FASTSUPPORT_SHARD_IDS": format_shard_ids(self.shard_ids),
+            "FASTSUPPORT_CLUSTER_ID": str(self.cluster_id),
+            "PORT": str(self.port),
+        })
+        # fichiers écrits en continu : un par processus
+        for key, default in (("FASTSUPPORT_TRACE_FILE", os.path.join("traces", "spans.jsonl")),
+                             ("FASTSUPPORT_RECORD_FILE", "")):
+            path = env.get(key, default)
+            if path:
+                root, ext = os.path.splitext(path)
+                env[key] = f"{root}-cluster{self.cluster_id}{ext}"
+        return env
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(sys.executable, SUPPORT_SCRIPT, env=self.env(), cwd=os.getcwd())
+        self.started_at = time.time()
+        logger.info("Cluster %d démarré (pid %d, shards %s / %d, port %d)", self.cluster_id, self.proc.pid,
+                    format_shard_ids(self.shard_ids), self.shard_count, self.port)
+
+    async def supervise(self):
+        while not self.stopping:
+            await self.start()
+            code = await self.proc.wait()
+            if self.stopping:
+                break
+            # délai remis à zéro après une heure sans incident
+            if time.time() - self.started_at > 3600:
+                self.restarts = 0
+            self.restarts += 1
+            delay = min(MAX_RESTART_DELAY, 2.0 ** min(self.restarts, 6))
+            logger.error("Cluster %d arrêté (code %s) : redémarrage dans %.0f s", self.cluster_id, code, delay)
+            await asyncio.sleep(delay)
+
+    async def stop(self, timeout: float = STOP_TIMEOUT):
+        self.stopping = True
+        if self.proc is None or self.proc.returncode is not None:
+            return
+        self.proc.terminate()
+        try:
+            await asyncio.wait_for(self.proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Cluster %d toujours actif après %.0f s : kill", self.cluster_id, timeout)
+            self.proc.kill()
+            await self.proc.wait()
+
+    def info(self) -> dict:
+        return {
+            "pid": self.proc.pid if self.proc else None,
+            "running": self.proc is not None and self.proc.returncode is None,
+            "restarts": self.restarts,
+            "shards": format_shard_ids(self.shard_ids),
+            "port": self.port,
+        }
+
+
+class Coordinator:
+    def __init__(self, clusters: list, host: str = "0.0.0.0", port: int = 8080):
+        self.clusters = clusters
+        self.host = host
+        self.port = port
+        self._session = None
+        self._runner = None
+
+    # ---------------- HTTP ----------------
+    async def _scrape(self, cluster: ClusterProcess, path: str):
+        """(statut HTTP ou None, corps) d'une route d'un processus."""
+        try:
+            async with self._session.get(f"http://127.0.0.1:{cluster.port}{path}",
+                                         timeout=aiohttp.ClientTimeout(total=SCRAPE_TIMEOUT)) as resp:
+                body = await (resp.json() if resp.content_type == "application/json" else resp.text())
+                return resp.status, body
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    async def metrics(self, request: web.Request):
+        results = await asyncio.gather(*(self._scrape(c, "/metrics") for c in self.clusters))
+        text = merge_metrics(body for status, body in results if status == 200)
+        text += "# HELP fastsupport_cluster_up Processus du cluster joignable (1) ou non (0).\n"
+        text += "# TYPE fastsupport_cluster_up gauge\n"
+        for c, (status, _) in zip(self.clusters, results):
+            text += f'fastsupport_cluster_up{{cluster="{c.cluster_id}"}} {1 if status == 200 else 0}\n'
+        return web.Response(body=text.encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def _health(self, path: str):
+        results = await asyncio.gather(*(self._scrape(c, path) for c in self.clusters))
+        details = {}
+        for c, (status, body) in zip(self.clusters, results):
+            details[str(c.cluster_id)] = dict(c.info(), status=status, details=body)
+        ok = all(status == 200 for status, _ in results)
+        return web.json_response({"ok": ok, "clusters": details}, status=200 if ok else 503)
+
+    async def healthz(self, request: web.Request):
+        return await self._health("/healthz")
+
+    async def readyz(self, request: web.Request):
+        return await self._health("/readyz")
+
+    async def home(self, request: web.Request):
+        return web.Response(text=f"Cluster FastSupport : {len(self.clusters)} processus")
+
+    # ---------------- Cycle de vie ----------------
+    async def run(self):
+        self._session = aiohttp.ClientSession()
+        app = web.Application()
+        app.router.add_get("/", self.home)
+        app.router.add_get("/metrics", self.metrics)
+        app.router.add_get("/healthz", self.healthz)
+        app.router.add_get("/readyz", self.readyz)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Coordinateur sur %s:%d (%d processus)", self.host, self.port, len(self.clusters))
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):     # Windows
+                pass
+        supervisors = [asyncio.create_task(c.supervise()) for c in self.clusters]
+        try:
+            await stop.wait()
+        finally:
+            logger.info("Arrêt du cluster")
+            await asyncio.gather(*(c.stop() for c in self.clusters), return_exceptions=True)
+            for t in supervisors:
+                t.cancel()
+            await asyncio.gather(*supervisors, return_exceptions=True)
+            await self._runner.cleanup()
+            await self._session.close()
+
+
+async def amain(args):
+    env_count = os.getenv("FASTSUPPORT_SHARD_COUNT", "").strip()
+    shard_count = args.shards or (int(env_count) if env_count.isdigit() else 0)
+    if not shard_count:
+        token = os.getenv("DISCORD_TOKEN")
+        if not token:
+            raise ValueError("❌ Token manquant (.env)")
+        shard_count = await fetch_recommended_shards(token)
+        logger.info("Nombre de shards recommandé par Discord : %d", shard_count)
+    ranges = split_shards(shard_count, args.clusters)
+    clusters = [ClusterProcess(i, ids, shard_count, args.port + 1 + i) for i, ids in enumerate(ranges)]
+    await Coordinator(clusters, port=args.port).run()
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Lance le bot en plusieurs processus (plages de shards)")
+    parser.add_argument("--clusters", type=int, default=int(os.getenv("FASTSUPPORT_CLUSTERS", "2")),
+                        help="nombre de processus")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="nombre total de shards (défaut : FASTSUPPORT_SHARD_COUNT, sinon recommandé par Discord)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")),
+                        help="port du coordinateur ; processus sur port+1, port+2...")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(amain(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
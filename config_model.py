@@ -0,0 +1,344 @@
+import logging
+import sys
+from collections import Counter
+
+
+logger = logging.getLogger("fastsupport.config")
+
+# Modèle mémoire de guild_config.json : classes à __slots__ (pas de dict par objet), IDs en int,
+# libellés internés (un seul exemplaire de "Partenariat" pour toutes les guildes et tous les tickets).
+# from_dict / to_dict font la conversion au chargement / à l'écriture.
+#
+# Le fichier porte une version de schéma (clé SCHEMA_KEY à la racine ; absente = version 1).
+# Au chargement, migrate() applique une fois les migrations manquantes, puis from_dict valide :
+# les entrées invalides sont réparées ou rejetées (et comptées) à ce moment-là, pas à chaque lecture.
+SCHEMA_VERSION = 2
+SCHEMA_KEY = "schema_version"
+
+DEFAULT_CATEGORIES = (
+    ("Gestion Staff", "Candidature, rôles ou rank up", "🔰"),
+    ("Partenariat", "Demande de partenariat", "🤝"),
+    ("Autre", "Autre demande", "❓"),
+)
+
+
+def _id(value):
+    """Snowflake en int ; None si absent ou invalide."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ids(values) -> tuple:
+    out = []
+    for v in values or ():
+        v = _id(v)
+        if v is not None:
+            out.append(v)
+    return tuple(out)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Category:
+    __slots__ = ("label", "description", "emoji", "notify_role_id", "close_role_ids")
+
+    def __init__(self, label: str, description: str = "", emoji: str = None, notify_role_id: int = None, close_role_ids=()):
+        self.label = sys.intern(str(label))
+        self.description = sys.intern(str(description or ""))
+        self.emoji = _intern(emoji) or None
+        self.notify_role_id = notify_role_id
+        self.close_role_ids = tuple(close_role_ids)      # remplacé, jamais modifié sur place
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        return cls(d.get("label") or "Autre", d.get("description") or "", d.get("emoji"),
+                   _id(d.get("notify_role_id")), _ids(d.get("close_role_ids")))
+
+    def to_dict(self) -> dict:
+        return {
+            "label": self.label,
+            "description": self.description,
+            "emoji": self.emoji,
+            "notify_role_id": self.notify_role_id,
+            "close_role_ids": list(self.close_role_ids),
+        }
+
+    def copy(self):
+        return Category(self.label, self.description, self.emoji, self.notify_role_id, self.close_role_ids)
+
+    def key(self) -> tuple:
+        return self.label, self.description, self.emoji, self.notify_role_id, self.close_role_ids
+
+
+class SharedCategory(Category):
+    """Catégorie du jeu par défaut commun à toutes les guildes : lecture seule."""
+    __slots__ = ()
+
+    def __init__(self, label: str, description: str = "", emoji: str = None):
+        template = Category(label, description, emoji)
+        for name in Category.__slots__:
+            object.__setattr__(self, name, getattr(template, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("catégorie par défaut partagée : passer par GuildConfig.own_categories()")
+
+
+# Jeu de catégories par défaut, partagé (même tuple, mêmes objets) par toutes les guildes qui ne
+# l'ont jamais personnalisé. Une guilde reçoit sa propre copie au premier ajout / modification /
+# déplacement / changement de rôle (GuildConfig.own_categories) ; tant qu'elle le partage, ses
+# catégories ne sont pas écrites dans guild_config.json.
+SHARED_DEFAULT_CATEGORIES = tuple(SharedCategory(label, description, emoji) for label, description, emoji in DEFAULT_CATEGORIES)
+_SHARED_DEFAULT_KEYS = tuple(c.key() for c in SHARED_DEFAULT_CATEGORIES)
+
+
+class Ticket:
+    """
+    Ticket ouvert, indexé par l'ID de son salon dans GuildConfig.open_tickets.
+    `channel_name` n'est renseigné que pour les anciennes entrées indexées par nom de salon
+    (GuildConfig.legacy_tickets, sans channel_id) : sinon le nom se lit sur le salon.
+    """
+    __slots__ = ("channel_id", "owner_id", "claimed_by", "category", "message_id", "channel_name")
+
+    def __init__(self, channel_id: int, owner_id: int = None, claimed_by: int = None, category: str = None,
+                 message_id: int = None, channel_name: str = None):
+        self.channel_id = channel_id
+        self.owner_id = owner_id
+        self.claimed_by = claimed_by
+        self.category = _intern(category)
+        self.message_id = message_id
+        self.channel_name = channel_name
+
+    @classmethod
+    def from_dict(cls, key: str, d: dict):
+        channel_id = _id(d.get("channel_id")) or _id(key)
+        return cls(
+            channel_id,
+            owner_id=_id(d.get("owner_id")),
+            claimed_by=_id(d.get("claimed_by")),
+            category=d.get("category"),
+            message_id=_id(d.get("message_id")),
+            channel_name=None if channel_id else (d.get("channel_name") or key),
+        )
+
+    def to_dict(self) -> dict:
+        d = {
+            "channel_id": self.channel_id,
+            "owner_id": self.owner_id,
+            "claimed_by": self.claimed_by,
+            "category": self.category,
+            "message_id": self.message_id,
+        }
+        if self.channel_name:
+            d["channel_name"] = self.channel_name
+        return d
+
+
+class GuildConfig:
+    __slots__ = ("support_channel_id", "staff_role_ids", "allow_owner_close", "categories", "open_tickets",
+                 "legacy_tickets", "left_at", "extra")
+
+    def __init__(self, support_channel_id: int = None, staff_role_ids=(), allow_owner_close: bool = False,
+                 categories=None, open_tickets=None, legacy_tickets=None, left_at: str = None, extra=None):
+        self.support_channel_id = support_channel_id
+        self.staff_role_ids = tuple(staff_role_ids)
+        self.allow_owner_close = allow_owner_close
+        # SHARED_DEFAULT_CATEGORIES (partagé, lecture seule) ou liste propre à la guilde
+        self.categories = categories if categories is not None else SHARED_DEFAULT_CATEGORIES
+        # ID du salon (int) -> Ticket
+        self.open_tickets = open_tickets if open_tickets is not None else {}
+        # anciennes entrées indexées par nom de salon, en attente de résolution (None si aucune) :
+        # l'ID du salon ne peut se retrouver qu'une fois la guilde chargée (resolve_legacy_tickets)
+        self.legacy_tickets = legacy_tickets or None
+        # date ISO (UTC) à laquelle le bot a quitté la guilde ; archivée après le délai de grâce
+        self.left_at = left_at
+        self.extra = extra      # clés inconnues du fichier, réécrites telles quelles
+
+    @classmethod
+    def new(cls):
+        return cls(categories=SHARED_DEFAULT_CATEGORIES)
+
+    @classmethod
+    def from_dict(cls, d: dict, report: Counter = None):
+        """Construit et valide la config d'une guilde ; `report` compte les entrées réparées / rejetées."""
+        report = report if report is not None else Counter()
+        open_tickets = {}
+        legacy_tickets = {}
+        raw_tickets = d.get("open_tickets") or {}
+        if not isinstance(raw_tickets, dict):
+            report["open_tickets invalide (rejeté)"] += 1
+            raw_tickets = {}
+        for key, entry in raw_tickets.items():
+            if not isinstance(entry, dict):
+                report["ticket invalide (rejeté)"] += 1
+                continue
+            ticket = Ticket.from_dict(key, entry)
+            if ticket.channel_id:
+                if ticket.channel_id in open_tickets:
+                    report["ticket en double (rejeté)"] += 1
+                    continue
+                open_tickets[ticket.channel_id] = ticket
+            elif ticket.channel_name:
+                legacy_tickets[ticket.channel_name] = ticket
+                report["ticket indexé par nom (résolu au démarrage)"] += 1
+            else:
+                report["ticket sans salon (rejeté)"] += 1
+
+        if "categories" in d:
+            categories = []
+            seen = set()
+            for c in d.get("categories") or []:
+                if not isinstance(c, dict) or not c.get("label"):
+                    report["catégorie invalide (rejetée)"] += 1
+                    continue
+                cat = Category.from_dict(c)
+                if cat.label.lower() in seen:
+                    report["catégorie en double (rejetée)"] += 1
+                    continue
+                seen.add(cat.label.lower())
+                categories.append(cat)
+            # jeu identique aux valeurs par défaut (fichiers antérieurs) -> version partagée
+            if tuple(c.key() for c in categories) == _SHARED_DEFAULT_KEYS:
+                categories = SHARED_DEFAULT_CATEGORIES
+        else:
+            categories = SHARED_DEFAULT_CATEGORIES
+
+        known = ("support_channel_id", "staff_role_ids", "allow_owner_close", "categories", "open_tickets", "left_at")
+        extra = {k: v for k, v in d.items() if k not in known}
+        return cls(
+            support_channel_id=_id(d.get("support_channel_id")),
+            staff_role_ids=tuple(dict.fromkeys(_ids(d.get("staff_role_ids")))),    # sans doublons
+            allow_owner_close=bool(d.get("allow_owner_close", False)),
+            categories=categories,
+            open_tickets=open_tickets,
+            legacy_tickets=legacy_tickets,
+            left_at=d.get("left_at") if isinstance(d.get("left_at"), str) else None,
+            extra=extra or None,
+        )
+
+    def to_dict(self) -> dict:
+        d = {
+            "support_channel_id": self.support_channel_id,
+            "staff_role_ids": list(self.staff_role_ids),
+            "allow_owner_close": self.allow_owner_close,
+        }
+        # catégories par défaut partagées : clé absente du fichier (relue comme le jeu par défaut)
+        if not self.shares_default_categories:
+            d["categories"] = [c.to_dict() for c in self.categories]
+        open_tickets = {str(k): t.to_dict() for k, t in self.open_tickets.items()}
+        if self.legacy_tickets:
+            open_tickets.update((name, t.to_dict()) for name, t in self.legacy_tickets.items())
+        d["open_tickets"] = open_tickets
+        if self.left_at:
+            d["left_at"] = self.left_at
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def update_from(self, other: "GuildConfig"):
+        """Remplace le contenu sur place (les références déjà distribuées restent valides)."""
+        for name in GuildConfig.__slots__:
+            setattr(self, name, getattr(other, name))
+
+    @property
+    def shares_default_categories(self) -> bool:
+        return self.categories is SHARED_DEFAULT_CATEGORIES
+
+    def own_categories(self) -> list:
+        """
+        Liste de catégories modifiable, propre à la guilde : copie le jeu par défaut partagé au
+        premier appel. À appeler avant toute modification (ajout, suppression, déplacement, rôles).
+        """
+        if self.shares_default_categories:
+            self.categories = [c.copy() for c in SHARED_DEFAULT_CATEGORIES]
+        return self.categories
+
+    def edit_category(self, label: str):
+        """Comme find_category, mais catégorie modifiable (copie du jeu par défaut si besoin) ; None si absente."""
+        idx, c = self.find_category(label)
+        if c is None:
+            return None
+        return self.own_categories()[idx]
+
+    def category(self, label: str):
+        """Catégorie de libellé exact `label` (None si absente)."""
+        for c in self.categories:
+            if c.label == label:
+                return c
+        return None
+
+    def find_category(self, label: str):
+        """(index, catégorie) pour `label` sans tenir compte de la casse ; (None, None) si absente."""
+        low = (label or "").lower()
+        for i, c in enumerate(self.categories):
+            if c.label.lower() == low:
+                return i, c
+        return None, None
+
+
+# ---------------- Migrations (format disque, une seule fois au chargement) ----------------
+def _migrate_v1(raw: dict, report: Counter) -> dict:
+    """v1 -> v2 : champ `owner` des anciens tickets renommé en `owner_id`."""
+    for data in raw.values():
+        if not isinstance(data, dict) or not isinstance(data.get("open_tickets"), dict):
+            continue
+        for entry in data["open_tickets"].values():
+            if isinstance(entry, dict) and "owner" in entry:
+                owner = entry.pop("owner")
+                if not entry.get("owner_id"):
+                    entry["owner_id"] = owner
+                    report["owner -> owner_id"] += 1
+    return raw
+
+
+# version n -> fonction qui transforme un fichier de version n en version n + 1
+MIGRATIONS = {
+    1: _migrate_v1,
+}
+
+
+def migrate(raw: dict, report: Counter) -> dict:
+    """Amène le contenu brut de guild_config.json à SCHEMA_VERSION (sans la clé de version)."""
+    raw = dict(raw)
+    version = raw.pop(SCHEMA_KEY, 1)
+    if not isinstance(version, int) or version < 1:
+        logger.warning("Version de schéma invalide (%r) : fichier traité comme version 1", version)
+        version = 1
+    if version > SCHEMA_VERSION:
+        logger.warning("guild_config.json est en version %d (> %d) : chargement au mieux", version, SCHEMA_VERSION)
+    while version < SCHEMA_VERSION:
+        raw = MIGRATIONS[version](raw, report)
+        logger.info("Config migrée du schéma %d vers %d", version, version + 1)
+        version += 1
+    return raw
+
+
+def config_from_dict(raw: dict) -> dict:
+    """
+    {guild_id (int): GuildConfig} depuis le contenu de guild_config.json : migrations puis validation,
+    avec un résumé des entrées réparées / rejetées dans les logs.
+    """
+    report = Counter()
+    cfg = {}
+    for gid, data in migrate(raw or {}, report).items():
+        guild_id = _id(gid)
+        if guild_id is None or not isinstance(data, dict):
+            report["guilde invalide (rejetée)"] += 1
+            continue
+        cfg[guild_id] = GuildConfig.from_dict(data, report)
+    if report:
+        logger.warning("Config normalisée au chargement : %s",
+                       ", ".join(f"{what}: {n}" for what, n in sorted(report.items())))
+    return cfg
+
+
+def config_to_dict(cfg: dict) -> dict:
+    """Format disque : version de schéma puis clés de guilde en chaîne."""
+    data = {SCHEMA_KEY: SCHEMA_VERSION}
+    data.update((str(gid), g.to_dict()) for gid, g in cfg.items())
+    return data
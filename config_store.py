@@ -0,0 +1,616 @@
+import contextlib
+import gzip
+import json
+import logging
+import os
+import tempfile
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+import metrics
+from config_model import SCHEMA_KEY, SCHEMA_VERSION, GuildConfig, config_from_dict
+from file_lock import FileLock
+
+
+logger = logging.getLogger("fastsupport.config")
+
+# Format « une ligne par guilde » de guild_config.json :
+#   {"format": "guild-lines", "schema_version": 2, "generation": 7}      en-tête
+#   1404387333112987768\t{"support_channel_id": ...}    une ligne par guilde (JSON compact)
+# Un index <fichier>.idx donne la position de chaque ligne : au démarrage, seul l'index est lu ;
+# la config d'une guilde n'est parsée qu'au premier accès. Un ancien fichier JSON (un seul objet)
+# est converti à la première sauvegarde.
+#
+# Plusieurs processus peuvent partager le fichier (standby, script de maintenance...) : les écritures
+# (remplacement atomique) se font sous un verrou consultatif (<fichier>.lock) et `generation` augmente
+# à chaque écriture. Les lectures à la demande passent par le fichier déjà ouvert, sans verrou : il
+# reste lisible quand un autre processus le remplace. Avant d'écrire, refresh() reprend les
+# modifications de l'autre processus et les fusionne guilde par guilde avec les nôtres (fusion à
+# trois voies contre la version lue sur disque).
+#
+# Les guildes quittées depuis plus longtemps que le délai de grâce (`left_at`) sont déplacées dans
+# <archive_dir>/<guild_id>.json.gz par compact() et restaurées par rehydrate() si le bot revient.
+FORMAT = "guild-lines"
+ARCHIVE_SUFFIX = ".json.gz"
+
+
+def _line(guild_id: int, data: dict) -> bytes:
+    return f"{guild_id}\t{json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n".encode("utf-8")
+
+
+def _payload(line: bytes) -> dict:
+    return json.loads(line.split(b"\t", 1)[1])
+
+
+def _file_id(st) -> tuple:
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+_MISSING = object()
+
+
+class RawSnapshot:
+    """Lignes sérialisées des guildes, copiées sans les parser ; to_dict() = format de config_to_dict."""
+
+    def __init__(self, lines: dict):
+        self.lines = lines          # guild_id -> ligne
+
+    def to_dict(self) -> dict:
+        data = {SCHEMA_KEY: SCHEMA_VERSION}
+        data.update((str(gid), _payload(line)) for gid, line in self.lines.items())
+        return data
+
+
+def merge3(base: dict, ours: dict, theirs: dict, conflicts: list, prefix: str = "") -> dict:
+    """
+    Fusion à trois voies de deux versions d'une config de guilde (dicts JSON) : une clé modifiée
+    d'un seul côté prend cette valeur ; les dicts (open_tickets...) sont fusionnés clé par clé ;
+    une valeur modifiée des deux côtés garde la nôtre et est ajoutée à `conflicts`.
+    """
+    out = {}
+    for k in dict.fromkeys([*ours, *theirs]):
+        b, o, t = base.get(k, _MISSING), ours.get(k, _MISSING), theirs.get(k, _MISSING)
+        if o == t or t == b:
+            v = o
+        elif o == b:
+            v = t
+        elif isinstance(o, dict) and isinstance(t, dict):
+            v = merge3(b if isinstance(b, dict) else {}, o, t, conflicts, f"{prefix}{k}.")
+        else:
+            v = o
+            conflicts.append(prefix + k)
+        if v is not _MISSING:
+            out[k] = v
+    return out
+
+
+class GuildStore:
+    """
+    Config des guildes chargée à la demande, utilisable comme un dict {guild_id: GuildConfig}
+    (get, [], in, len, items...).
+
+    - `max_loaded` > 0 : au plus `max_loaded` guildes en mémoire ; la moins récemment utilisée est
+      sérialisée (une ligne, quelques centaines d'octets) et rechargée au prochain accès. Un handler
+      qui garde une référence le temps d'un `await` reste sûr tant que `max_loaded` dépasse
+      largement le nombre de guildes actives en même temps.
+    - la sauvegarde réécrit les guildes chargées et recopie telles quelles les lignes des autres.
+    - `lock` : verrou entre processus ; l'appelant tient `lock` en exclusif autour de
+      refresh() + write_to() + saved().
+    - `owns` (déploiement shardé) : keys / len / items ne voient que les guildes de ce processus ;
+      les lignes des autres sont recopiées telles quelles (ou reprises de leur processus par refresh).
+    """
+
+    def __init__(self, path: str, max_loaded: int = 0, archive_dir: str = None, owns=None):
+        self.path = path
+        self.owns = owns
+        self.index_path = path + ".idx"
+        self.max_loaded = max_loaded
+        self.archive_dir = archive_dir
+        self._loaded = OrderedDict()     # guild_id -> GuildConfig, ordre LRU
+        self._evicted = {}               # guild_id -> ligne sérialisée, pas encore sauvegardée
+        self._offsets = {}               # guild_id -> (position, longueur) dans le fichier
+        self._reader = None              # version du fichier décrite par _offsets (reste lisible après un os.replace)
+        self._rehydrated = set()         # guildes restaurées : archive supprimée après la sauvegarde
+        self._removed = set()            # guildes archivées depuis la dernière sauvegarde
+        self._base = {}                  # guild_id -> ligne telle que sur disque (guildes chargées / évincées)
+        self._written_base = {}
+        self._stat = None                # (taille, mtime, inode) du fichier tel que nous le connaissons
+        self.generation = 0              # compteur d'écritures du fichier (en-tête)
+        self.lock = FileLock(path + ".lock")
+        self.needs_save = False          # fichier à réécrire (ancien format, migration)
+
+    # ---------------- Ouverture ----------------
+    def open(self):
+        with self.lock.hold():
+            if not os.path.isfile(self.path):
+                return self
+            header = self._read_header()
+            self._stat = _file_id(os.stat(self.path))
+            if header is None:
+                self._import_json()
+                return self
+            version = header.get(SCHEMA_KEY, 1)
+            self.generation = header.get("generation", 0)
+            self._offsets = self._read_index() or self._scan()
+            self._reader = open(self.path, "rb")
+            if version != SCHEMA_VERSION:
+                self._migrate_lines(version)
+        logger.info("Config : %d guildes indexées dans %s (chargement à la demande)", len(self._offsets), self.path)
+        return self
+
+    def _read_header(self):
+        """En-tête du format lignes ; None pour un ancien fichier JSON."""
+        with open(self.path, "rb") as f:
+            first = f.readline()
+        try:
+            header = json.loads(first)
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            return None
+        return header
+
+    def _import_json(self):
+        """Ancien format (un seul objet JSON) : tout est chargé une fois, puis réécrit en lignes."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            cfg = config_from_dict(json.load(f))
+        for gid, g in cfg.items():
+            self[gid] = g
+        self.needs_save = True
+        logger.info("Config : %d guildes importées depuis l'ancien format de %s", len(cfg), self.path)
+
+    def _migrate_lines(self, version: int):
+        raw = {SCHEMA_KEY: version}
+        with open(self.path, "rb") as f:
+            for gid, (pos, length) in self._offsets.items():
+                f.seek(pos)
+                raw[str(gid)] = json.loads(f.read(length).split(b"\t", 1)[1])
+        self._offsets = {}
+        for gid, g in config_from_dict(raw).items():
+            self[gid] = g
+        self.needs_save = True
+
+    def _read_index(self):
+        """Index à jour (même taille / date que le fichier) ou None."""
+        try:
+            st = os.stat(self.path)
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                idx = json.load(f)
+            if idx.get("size") != st.st_size or idx.get("mtime_ns") != st.st_mtime_ns:
+                return None
+            return {int(gid): (pos, length) for gid, (pos, length) in idx["offsets"].items()}
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Index %s illisible : reconstruction", self.index_path)
+            return None
+
+    def _scan(self, f=None, write_index: bool = True) -> dict:
+        """Reconstruit l'index en lisant le fichier ligne à ligne (sans parser le JSON)."""
+        offsets = {}
+        with (open(self.path, "rb") if f is None else contextlib.nullcontext(f)) as f:
+            f.seek(0)
+            pos = len(f.readline())
+            for line in f:
+                gid, sep, _ = line.partition(b"\t")
+                if sep and gid.isdigit() and line.endswith(b"\n"):
+                    offsets[int(gid)] = (pos, len(line))
+                else:
+                    logger.warning("Ligne de config ignorée à l'octet %d de %s", pos, self.path)
+                pos += len(line)
+        if write_index:
+            self._write_index(offsets)
+        return offsets
+
+    def _write_index(self, offsets: dict):
+        try:
+            st = os.stat(self.path)
+            idx = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                   "offsets": {str(gid): list(v) for gid, v in offsets.items()}}
+            dirpath = os.path.dirname(os.path.abspath(self.index_path)) or "."
+            fd, tmp_path = tempfile.mkstemp(prefix="tmp_config_idx_", dir=dirpath)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(idx, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except Exception:
+            logger.exception("Impossible d'écrire l'index %s (reconstruit au prochain démarrage)", self.index_path)
+
+    # ---------------- Accès (interface dict) ----------------
+    def get(self, guild_id: int, default=None):
+        g = self._loaded.get(guild_id)
+        if g is not None:
+            self._loaded.move_to_end(guild_id)
+            return g
+        line = self._evicted.pop(guild_id, None)
+        if line is None:
+            line = self._stored_line(guild_id)
+            if line is None:
+                return default
+            self._base[guild_id] = line
+        g = self._parse(guild_id, line)
+        metrics.CONFIG_GUILD_LOADS.inc()
+        self[guild_id] = g
+        return g
+
+    def peek(self, guild_id: int):
+        """Config de la guilde sans la garder en mémoire (None si absente) ; à ne pas modifier."""
+        g = self._loaded.get(guild_id)
+        if g is not None:
+            return g
+        line = self._evicted.get(guild_id) or self._stored_line(guild_id)
+        return self._parse(guild_id, line) if line is not None else None
+
+    def _stored_line(self, guild_id: int):
+        if guild_id not in self._offsets:
+            return None
+        if self._reader is None:
+            self._open_reader()
+        loc = self._offsets.get(guild_id)
+        if loc is None:
+            return None
+        self._reader.seek(loc[0])
+        return self._reader.read(loc[1])
+
+    def _open_reader(self):
+        """
+        Rouvre le fichier après close(). Chemin de lecture (handlers) : ni verrou ni fusion. S'il a
+        été remplacé par un autre processus, seules ses positions sont relues (sans écrire l'index) ;
+        `_stat` n'avance pas, la fusion se fait à la prochaine sauvegarde (refresh sous le verrou).
+        """
+        reader = open(self.path, "rb")
+        if self._stat is not None and _file_id(os.fstat(reader.fileno())) != self._stat:
+            offsets = self._read_index()
+            if offsets is None or _file_id(os.fstat(reader.fileno())) != _file_id(os.stat(self.path)):
+                offsets = self._scan(reader, write_index=False)
+            for gid in self._removed:
+                offsets.pop(gid, None)
+            self._offsets = offsets
+        self._reader = reader
+
+    def _raw_line(self, guild_id: int):
+        """Ligne sérialisée de la guilde, où qu'elle soit (mémoire, évincée, fichier) ; None si absente."""
+        g = self._loaded.get(guild_id)
+        if g is not None:
+            return _line(guild_id, g.to_dict())
+        return self._evicted.get(guild_id) or self._stored_line(guild_id)
+
+    @staticmethod
+    def _parse(guild_id: int, line: bytes) -> GuildConfig:
+        report = Counter()
+        g = GuildConfig.from_dict(_payload(line), report)
+        if report:
+            logger.warning("Config de la guilde %s normalisée : %s", guild_id,
+                           ", ".join(f"{what}: {n}" for what, n in sorted(report.items())))
+        return g
+
+    def __getitem__(self, guild_id: int) -> GuildConfig:
+        g = self.get(guild_id)
+        if g is None:
+            raise KeyError(guild_id)
+        return g
+
+    def __setitem__(self, guild_id: int, g: GuildConfig):
+        self._evicted.pop(guild_id, None)
+        self._loaded[guild_id] = g
+        self._loaded.move_to_end(guild_id)
+        while self.max_loaded and len(self._loaded) > self.max_loaded:
+            old_id, old = self._loaded.popitem(last=False)
+            self._evicted[old_id] = _line(old_id, old.to_dict())
+            metrics.CONFIG_GUILD_EVICTIONS.inc()
+        metrics.CONFIG_GUILDS_LOADED.set(len(self._loaded))
+
+    def __contains__(self, guild_id) -> bool:
+        return guild_id in self._loaded or guild_id in self._evicted or guild_id in self._offsets
+
+    def _all_keys(self):
+        order = dict.fromkeys(self._offsets)
+        order.update(dict.fromkeys(self._evicted))
+        order.update(dict.fromkeys(self._loaded))
+        return order.keys()
+
+    def keys(self):
+        """Guildes de ce processus (toutes sans sharding)."""
+        if self.owns is None:
+            return self._all_keys()
+        return [gid for gid in self._all_keys() if self.owns(gid)]
+
+    def __iter__(self):
+        return iter(list(self.keys()))
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def items(self):
+        """Toutes les guildes : charge celles qui ne le sont pas (à réserver aux outils / diagnostics)."""
+        for gid in list(self.keys()):
+            yield gid, self[gid]
+
+    def raw_snapshot(self) -> RawSnapshot:
+        """Copie de la config (guildes de ce processus) sans charger ni parser les guildes non chargées."""
+        return RawSnapshot({gid: self._raw_line(gid) for gid in self.keys()})
+
+    def loaded_count(self) -> int:
+        return len(self._loaded)
+
+    # ---------------- Guildes quittées / archive ----------------
+    def mark_left(self, guild_id: int, when: str = None) -> bool:
+        """
+        Note le départ du bot (`left_at`) sans garder la guilde en mémoire si elle n'y est pas déjà.
+        False si la guilde est absente ou déjà marquée.
+        """
+        g = self._loaded.get(guild_id)
+        if g is None:
+            line = self._evicted.get(guild_id)
+            if line is None:
+                line = self._stored_line(guild_id)
+                if line is None:
+                    return False
+                self._base[guild_id] = line
+            g = self._parse(guild_id, line)
+            if g.left_at:
+                return False
+            g.left_at = when or datetime.now(timezone.utc).isoformat()
+            self._evicted[guild_id] = _line(guild_id, g.to_dict())
+            return True
+        if g.left_at:
+            return False
+        g.left_at = when or datetime.now(timezone.utc).isoformat()
+        return True
+
+    def left_guilds(self) -> dict:
+        """{guild_id: left_at} des guildes quittées (seules leurs lignes sont parsées)."""
+        out = {}
+        for gid in list(self.keys()):
+            g = self._loaded.get(gid)
+            if g is None:
+                line = self._raw_line(gid)
+                if b'"left_at"' not in line:
+                    continue
+                g = self._parse(gid, line)
+            if g.left_at:
+                out[gid] = g.left_at
+        return out
+
+    def _archive_path(self, guild_id: int) -> str:
+        return os.path.join(self.archive_dir, f"{guild_id}{ARCHIVE_SUFFIX}")
+
+    def archived_ids(self) -> set:
+        if not self.archive_dir or not os.path.isdir(self.archive_dir):
+            return set()
+        return {int(name[:-len(ARCHIVE_SUFFIX)]) for name in os.listdir(self.archive_dir)
+                if name.endswith(ARCHIVE_SUFFIX) and name[:-len(ARCHIVE_SUFFIX)].isdigit()}
+
+    def archive(self, guild_id: int) -> int:
+        """
+        Déplace la guilde dans l'archive compressée ; retourne le nombre d'octets retirés de la
+        config (0 si absente). Le fichier de config doit ensuite être sauvegardé.
+        """
+        line = self._raw_line(guild_id)
+        if line is None:
+            return 0
+        record = {
+            SCHEMA_KEY: SCHEMA_VERSION,
+            "guild_id": str(guild_id),
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+            "config": _payload(line),
+        }
+        os.makedirs(self.archive_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix="tmp_archive_", dir=self.archive_dir)
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, self._archive_path(guild_id))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._loaded.pop(guild_id, None)
+        self._evicted.pop(guild_id, None)
+        self._offsets.pop(guild_id, None)
+        self._base.pop(guild_id, None)
+        self._removed.add(guild_id)
+        self._rehydrated.discard(guild_id)
+        self.needs_save = True
+        metrics.CONFIG_GUILDS_LOADED.set(len(self._loaded))
+        return len(line)
+
+    def rehydrate(self, guild_id: int):
+        """Restaure une guilde archivée (départ effacé) ; None si elle n'est pas dans l'archive."""
+        path = self._archive_path(guild_id) if self.archive_dir else None
+        if path is None or not os.path.isfile(path):
+            return None
+        with gzip.open(path, "rb") as f:
+            record = json.load(f)
+        g = config_from_dict({SCHEMA_KEY: record.get(SCHEMA_KEY, 1), str(guild_id): record.get("config") or {}}).get(guild_id)
+        if g is None:
+            return None
+        g.left_at = None
+        self[guild_id] = g
+        self._removed.discard(guild_id)
+        self.needs_save = True
+        # l'archive n'est supprimée qu'une fois la config sauvegardée (cf. saved())
+        self._rehydrated.add(guild_id)
+        logger.info("Config de la guilde %s restaurée depuis l'archive", guild_id)
+        return g
+
+    def compact(self, cutoff: datetime) -> dict:
+        """
+        Archive les guildes quittées avant `cutoff` (datetime UTC) ; retourne
+        {"guilds": n, "bytes": octets retirés de la config}.
+        """
+        guilds = 0
+        removed = 0
+        for gid, left_at in self.left_guilds().items():
+            try:
+                left = datetime.fromisoformat(left_at)
+            except ValueError:
+                logger.warning("left_at invalide pour la guilde %s : %r", gid, left_at)
+                continue
+            if left.tzinfo is None:
+                left = left.replace(tzinfo=timezone.utc)
+            if left > cutoff:
+                continue
+            removed += self.archive(gid)
+            guilds += 1
+        return {"guilds": guilds, "bytes": removed}
+
+    def archive_size(self) -> int:
+        if not self.archive_dir or not os.path.isdir(self.archive_dir):
+            return 0
+        return sum(e.stat().st_size for e in os.scandir(self.archive_dir)
+                   if e.is_file() and e.name.endswith(ARCHIVE_SUFFIX))
+
+    # ---------------- Écritures d'autres processus ----------------
+    def refresh(self) -> int:
+        """
+        Reprend le fichier s'il a été réécrit par un autre processus depuis notre dernière lecture /
+        écriture : nouvelles positions, guildes ajoutées ou archivées ailleurs, et fusion à trois
+        voies pour les guildes que nous avons en mémoire. Retourne le nombre de guildes mises à jour.
+        """
+        with self.lock.hold():
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+            if _file_id(st) == self._stat:
+                return 0
+            header = self._read_header()
+            if header is not None and header.get("generation", 0) == self.generation and self._stat is not None:
+                # même contenu (copie, touch...) : seules les positions sont à relire
+                self.close()
+                self._offsets = self._read_index() or self._scan()
+                self._reader = open(self.path, "rb")
+                self._stat = _file_id(st)
+                return 0
+            self.close()
+            if header is None:
+                # ancien format écrit par une ancienne version du bot : tout est chargé
+                with open(self.path, "r", encoding="utf-8") as f:
+                    foreign = {gid: _line(gid, g.to_dict()) for gid, g in config_from_dict(json.load(f)).items()}
+                offsets = {}
+            else:
+                foreign = None
+                offsets = self._read_index() or self._scan()
+            f = open(self.path, "rb")
+            try:
+                def theirs_line(gid):
+                    if foreign is not None:
+                        return foreign.get(gid)
+                    loc = offsets.get(gid)
+                    if loc is None:
+                        return None
+                    f.seek(loc[0])
+                    return f.read(loc[1])
+
+                updated = self._merge_external(theirs_line)
+                if foreign is not None:
+                    for gid, line in foreign.items():
+                        if gid not in self._loaded and gid not in self._evicted:
+                            self._evicted[gid] = line
+            except BaseException:
+                f.close()
+                raise
+            self._reader = f
+            for gid in self._removed:
+                offsets.pop(gid, None)
+            self._offsets = offsets
+            self.generation = header.get("generation", 0) if header is not None else 0
+            self._stat = _file_id(st)
+        metrics.CONFIG_GUILDS_LOADED.set(len(self._loaded))
+        if updated:
+            logger.info("Config modifiée par un autre processus : %d guildes reprises (génération %d)",
+                        updated, self.generation)
+        return updated
+
+    def _merge_external(self, theirs_line) -> int:
+        updated = 0
+        for gid in list(dict.fromkeys([*self._loaded, *self._evicted])):
+            if gid in self._removed:
+                continue
+            base = self._base.get(gid)
+            theirs = theirs_line(gid)
+            base_d = _payload(base) if base is not None else None
+            theirs_d = _payload(theirs) if theirs is not None else None
+            if theirs_d == base_d:
+                continue        # pas modifiée par l'autre processus
+            g = self._loaded.get(gid)
+            ours_d = g.to_dict() if g is not None else _payload(self._evicted[gid])
+            if theirs_d is None:
+                # archivée par l'autre processus : abandonnée si nous ne l'avons pas modifiée
+                if ours_d == base_d:
+                    self._loaded.pop(gid, None)
+                    self._evicted.pop(gid, None)
+                    self._base.pop(gid, None)
+                    updated += 1
+                continue
+            if ours_d == base_d:
+                merged = theirs_d
+            else:
+                conflicts = []
+                merged = merge3(base_d or {}, ours_d, theirs_d, conflicts)
+                if conflicts:
+                    metrics.CONFIG_MERGE_CONFLICTS.inc(len(conflicts))
+                    logger.warning("Guilde %s modifiée par deux processus : notre version gardée pour %s",
+                                   gid, ", ".join(conflicts))
+            if g is not None:
+                g.update_from(self._parse(gid, _line(gid, merged)))
+            else:
+                self._evicted[gid] = _line(gid, merged)
+            self._base[gid] = theirs
+            metrics.CONFIG_EXTERNAL_MERGES.inc()
+            updated += 1
+        return updated
+
+    # ---------------- Sauvegarde ----------------
+    def write_to(self, f) -> dict:
+        """
+        Écrit le fichier complet dans `f` (binaire) et retourne les nouvelles positions, à passer à
+        `saved()` une fois `f` mis en place à `self.path`.
+        """
+        header = {"format": FORMAT, SCHEMA_KEY: SCHEMA_VERSION, "generation": self.generation + 1}
+        header = json.dumps(header).encode("utf-8") + b"\n"
+        f.write(header)
+        pos = len(header)
+        offsets = {}
+        self._written_base = {}
+        for gid in self._all_keys():
+            line = self._raw_line(gid)
+            if gid in self._loaded:
+                self._written_base[gid] = line
+            f.write(line)
+            offsets[gid] = (pos, len(line))
+            pos += len(line)
+        # fermé avant le remplacement du fichier sous Windows (impossible tant qu'il est ouvert) ;
+        # ailleurs il reste lisible si l'écriture échoue
+        if os.name == "nt":
+            self.close()
+        return offsets
+
+    def saved(self, offsets: dict):
+        """Le fichier écrit par write_to est en place : les lignes sérialisées pointent vers lui."""
+        self._offsets = offsets
+        self._evicted.clear()
+        self._base = self._written_base
+        self._written_base = {}
+        self._removed.clear()
+        self.generation += 1
+        self.needs_save = False
+        self.close()
+        self._reader = open(self.path, "rb")
+        self._stat = _file_id(os.fstat(self._reader.fileno()))
+        self._write_index(offsets)
+        for gid in self._rehydrated:
+            try:
+                os.remove(self._archive_path(gid))
+            except FileNotFoundError:
+                pass
+            except Exception:
+                logger.exception("Impossible de supprimer l'archive de la guilde %s", gid)
+        self._rehydrated.clear()
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
@@ -0,0 +1,116 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+
+logger = logging.getLogger("fastsupport.lock")
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+class FileLock:
+    """
+    Verrou consultatif entre processus sur un fichier dédié (`<config>.lock`, jamais supprimé) :
+    fcntl.flock sous Linux / macOS, msvcrt.locking sous Windows (pas de verrou partagé : les
+    lectures y prennent aussi le verrou exclusif).
+
+    Réentrant dans le processus : un acquire imbriqué (lecture pendant une écriture...) ne fait
+    rien, le verrou est rendu à la sortie du plus externe. Pas prévu pour plusieurs threads.
+    """
+
+    def __init__(self, path: str, poll: float = 0.02):
+        self.path = path
+        self.poll = poll
+        self._fd = None
+        self._depth = 0
+        self.exclusive = False
+
+    def _try_lock(self, exclusive: bool) -> bool:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def _enter(self, exclusive: bool) -> bool:
+        """True si le verrou est déjà tenu par ce processus (acquire imbriqué)."""
+        if self._depth:
+            if exclusive and not self.exclusive:
+                raise RuntimeError(f"verrou {self.path} tenu en lecture : impossible de passer en exclusif")
+            self._depth += 1
+            return True
+        return False
+
+    def _give_up(self, timeout: float):
+        os.close(self._fd)
+        self._fd = None
+        raise LockTimeout(f"verrou {self.path} non obtenu en {timeout:g} s")
+
+    def _acquired(self, exclusive: bool, waited: float):
+        self._depth = 1
+        self.exclusive = exclusive
+        if waited > 1.0:
+            logger.info("Verrou %s obtenu après %.1f s d'attente", self.path, waited)
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock()
+            self.exclusive = False
+
+    @contextlib.contextmanager
+    def hold(self, exclusive: bool = False, timeout: float = 10.0):
+        """Verrou bloquant (attente active courte) ; LockTimeout après `timeout` secondes."""
+        if not self._enter(exclusive):
+            t0 = time.monotonic()
+            while not self._try_lock(exclusive):
+                if time.monotonic() - t0 > timeout:
+                    self._give_up(timeout)
+                time.sleep(self.poll)
+            self._acquired(exclusive, time.monotonic() - t0)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def hold_async(self, exclusive: bool = False, timeout: float = 10.0):
+        """Comme hold(), sans bloquer la boucle asyncio pendant l'attente."""
+        if not self._enter(exclusive):
+            t0 = time.monotonic()
+            while not self._try_lock(exclusive):
+                if time.monotonic() - t0 > timeout:
+                    self._give_up(timeout)
+                await asyncio.sleep(self.poll)
+            self._acquired(exclusive, time.monotonic() - t0)
+        try:
+            yield self
+        finally:
+            self.release()
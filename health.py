@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import math
+import time
+
+import metrics
+
+
+logger = logging.getLogger("fastsupport.health")
+
+# au-delà : /healthz échoue (boucle bloquée ou gateway perdue depuis trop longtemps)
+LIVENESS_MAX_LOOP_LAG = 5.0
+LIVENESS_DISCONNECT_GRACE = 120.0
+# au-delà : /readyz échoue (le bot répond trop lentement pour servir des interactions)
+READINESS_MAX_LOOP_LAG = 1.0
+
+
+class LoopLagSampler:
+    """
+    Mesure le retard de la boucle asyncio : une tâche dort `interval` secondes et
+    compare l'heure de réveil réelle à l'heure attendue.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        self.window = window        # nombre d'échantillons conservés pour le max glissant
+        self.lag = 0.0
+        self._samples = []
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="fastsupport-loop-lag")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def record(self, lag: float):
+        self.lag = lag
+        self._samples.append(lag)
+        if len(self._samples) > self.window:
+            del self._samples[0]
+
+    @property
+    def max_lag(self) -> float:
+        return max(self._samples) if self._samples else 0.0
+
+
+class BotHealth:
+    """État du bot lu par /healthz, /readyz et /metrics (tout dans la boucle du bot)."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.gateway_connected = False
+        self.disconnected_since = self.started_at
+        self.restoring = False
+        self.restore_total = 0
+        self.restore_done = 0
+        self.restored_once = False
+        self.last_save_ok = None
+        self.last_save_error = None
+        self.pending_saves = 0
+        self.queue_depths = {}      # nom -> fonction retournant la profondeur d'une file
+        self.lag = LoopLagSampler()
+        self.shards = None          # sharding.ShardConfig du processus (posé par support.py)
+        self.role = None            # "leader" / "standby" avec un bail de leader, None sinon
+        self.shutting_down = False  # arrêt propre en cours (SIGTERM) : plus de nouveaux tickets
+
+    # --- gateway ---
+    def set_connected(self, connected: bool):
+        if connected and not self.gateway_connected:
+            self.disconnected_since = None
+        elif not connected and self.gateway_connected:
+            self.disconnected_since = time.time()
+        self.gateway_connected = connected
+
+    # --- bail de leader (standby) ---
+    def set_role(self, role: str):
+        if role == "leader" and self.role == "standby":
+            # délai de grâce de la gateway compté depuis la prise de relais
+            self.disconnected_since = time.time()
+        self.role = role
+
+    # --- restauration au démarrage (on_ready) ---
+    def begin_restore(self, total: int):
+        self.restoring = True
+        self.restore_total = total
+        self.restore_done = 0
+
+    def restore_step(self):
+        self.restore_done += 1
+
+    def end_restore(self):
+        self.restoring = False
+        self.restored_once = True
+
+    # --- persistance ---
+    def save_succeeded(self):
+        self.last_save_ok = time.time()
+
+    def save_failed(self):
+        self.last_save_error = time.time()
+
+    def register_queue(self, name: str, depth_fn):
+        self.queue_depths[name] = depth_fn
+
+    def queue_snapshot(self) -> dict:
+        depths = {"save_config": self.pending_saves}
+        for name, fn in self.queue_depths.items():
+            try:
+                depths[name] = int(fn())
+            except Exception:
+                depths[name] = None
+        return depths
+
+    def snapshot(self, bot=None) -> dict:
+        now = time.time()
+        latency = None
+        if bot is not None:
+            try:
+                latency = bot.latency if math.isfinite(bot.latency) else None
+            except Exception:
+                latency = None
+        return {
+            "uptime_seconds": round(now - self.started_at, 1),
+            "role": self.role,
+            "shutting_down": self.shutting_down,
+            "gateway": {
+                "connected": self.gateway_connected,
+                "ready": bool(bot.is_ready()) if bot is not None else None,
+                "disconnected_for_seconds": round(now - self.disconnected_since, 1) if self.disconnected_since else 0.0,
+                "latency_seconds": latency,
+            },
+            "restore": {
+                "in_progress": self.restoring,
+                "done": self.restore_done,
+                "total": self.restore_total,
+                "completed_once": self.restored_once,
+            },
+            "config_save": {
+                "last_success_age_seconds": round(now - self.last_save_ok, 1) if self.last_save_ok else None,
+                "last_error_age_seconds": round(now - self.last_save_error, 1) if self.last_save_error else None,
+            },
+            "pending_writes": self.queue_snapshot(),
+            "event_loop_lag_seconds": {"last": round(self.lag.lag, 4), "max": round(self.lag.max_lag, 4)},
+            "shards": self._shards_snapshot(bot),
+        }
+
+    def _shards_snapshot(self, bot=None):
+        if self.shards is None or not self.shards.sharded:
+            return None
+        shards = getattr(bot, "shards", None) or {}
+        return {
+            "cluster_id": self.shards.cluster_id,
+            "shard_count": getattr(bot, "shard_count", None) or self.shards.shard_count,
+            "shard_ids": list(shards) or (list(self.shards.shard_ids) if self.shards.shard_ids else None),
+            "closed": [sid for sid, info in shards.items() if info.is_closed()],
+            "guilds": len(bot.guilds) if bot is not None else None,
+        }
+
+    def liveness(self, bot=None):
+        """(ok, détails) : le processus est-il encore utile ? Sinon l'orchestrateur doit le redémarrer."""
+        snap = self.snapshot(bot)
+        problems = []
+        if self.lag.lag > LIVENESS_MAX_LOOP_LAG:
+            problems.append("event_loop_blocked")
+        # un standby n'est pas connecté à la gateway, c'est normal
+        if (self.role != "standby" and self.disconnected_since
+                and time.time() - self.disconnected_since > LIVENESS_DISCONNECT_GRACE):
+            problems.append("gateway_disconnected")
+        snap["problems"] = problems
+        return not problems, snap
+
+    def readiness(self, bot=None):
+        """(ok, détails) : le bot peut-il servir des interactions maintenant ?"""
+        snap = self.snapshot(bot)
+        problems = []
+        if self.shutting_down:
+            problems.append("shutting_down")
+        if self.role == "standby":
+            problems.append("standby")
+        if not self.gateway_connected or (bot is not None and not bot.is_ready()):
+            problems.append("gateway_not_ready")
+        if self.restoring or not self.restored_once:
+            problems.append("restoring")
+        if self.last_save_error and (not self.last_save_ok or self.last_save_error > self.last_save_ok):
+            problems.append("config_save_failing")
+        if self.lag.lag > READINESS_MAX_LOOP_LAG:
+            problems.append("event_loop_lagging")
+        snap["problems"] = problems
+        return not problems, snap
+
+
+HEALTH = BotHealth()
+
+LOOP_LAG = metrics.Gauge("fastsupport_event_loop_lag_seconds", "Dernier retard mesuré de la boucle asyncio.")
+LOOP_LAG.set_function(lambda: HEALTH.lag.lag)
+PENDING_WRITES = metrics.Gauge("fastsupport_pending_writes", "Écritures en attente par file.", ("queue",))
+PENDING_WRITES.set_function(lambda: {(k,): v for k, v in HEALTH.queue_snapshot().items()})
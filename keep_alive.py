@@ -1,15 +1,70 @@
-from flask import Flask
-from threading import Thread
+import logging
 
-app = Flask('')
+from aiohttp import web
 
-@app.route('/')
-def home():
-  return "Le bot est en ligne !"
+import metrics
+from health import HEALTH
 
-def run():
-  app.run(host='0.0.0.0', port=8080)
 
-def keep_alive():
-  t = Thread(target=run)
-  t.start()
\ No newline at end of file
+logger = logging.getLogger("fastsupport.http")
+
+
+async def home(request: web.Request):
+    return web.Response(text="Le bot est en ligne !")
+
+
+async def metrics_endpoint(request: web.Request):
+    return web.Response(body=metrics.REGISTRY.render().encode("utf-8"), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
+async def healthz(request: web.Request):
+    ok, details = HEALTH.liveness(request.app["bot"])
+    return web.json_response(details, status=200 if ok else 503)
+
+
+async def readyz(request: web.Request):
+    ok, details = HEALTH.readiness(request.app["bot"])
+    return web.json_response(details, status=200 if ok else 503)
+
+
+def create_app(bot) -> web.Application:
+    """
+    Application HTTP du bot. Elle tourne dans la boucle asyncio du bot :
+    les routes peuvent lire `request.app["bot"]` sans problème de thread.
+    """
+    app = web.Application()
+    app["bot"] = bot
+    app.router.add_get("/", home)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    return app
+
+
+class KeepAliveServer:
+    def __init__(self, bot, host: str = "0.0.0.0", port: int = 8080, shutdown_timeout: float = 5.0):
+        self.app = create_app(bot)
+        self.host = host
+        self.port = port
+        self.shutdown_timeout = shutdown_timeout
+        self._runner = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None, shutdown_timeout=self.shutdown_timeout)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info("Serveur HTTP démarré sur %s:%s", self.host, self.port)
+
+    async def stop(self):
+        """Arrêt propre : on cesse d'accepter des connexions puis on termine les requêtes en cours."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Serveur HTTP arrêté")
+
+
+async def keep_alive(bot, host: str = "0.0.0.0", port: int = 8080) -> KeepAliveServer:
+    server = KeepAliveServer(bot, host, port)
+    await server.start()
+    return server
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+import uuid
+
+from file_lock import FileLock
+
+
+logger = logging.getLogger("fastsupport.lease")
+
+
+class LeaderLease:
+    """
+    Bail de leader partagé par fichier entre un processus actif et ses standbys :
+    {"holder": ..., "expires_at": epoch, "term": n}. Le leader le renouvelle toutes les `ttl / 3`
+    secondes ; un standby le prend dès qu'il a expiré (leader arrêté, planté ou bloqué) ou qu'il a
+    été rendu (arrêt propre). `term` augmente à chaque changement de leader. Sur la même machine
+    (POSIX), un bail dont le processus n'existe plus est repris sans attendre l'expiration.
+
+    Les horloges des machines doivent être synchronisées si le fichier est sur un disque partagé.
+    """
+
+    def __init__(self, path: str, ttl: float = 15.0, holder: str = None):
+        self.path = path
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.term = None            # term du bail tenu par ce processus, None si standby
+        self._lock = FileLock(path + ".lock")
+
+    def _holder_dead(self, holder) -> bool:
+        """Le leader est-il un processus de cette machine qui n'existe plus ?"""
+        if os.name != "posix" or not isinstance(holder, str):
+            return False
+        host, _, rest = holder.partition(":")
+        pid = rest.partition(":")[0]
+        if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        return False
+
+    def read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Bail %s illisible : considéré comme libre", self.path)
+            return None
+
+    def _write(self, data: dict):
+        dirpath = os.path.dirname(os.path.abspath(self.path)) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix="tmp_lease_", dir=dirpath)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _try_acquire_locked(self) -> bool:
+        cur = self.read() or {}
+        now = time.time()
+        mine = cur.get("holder") == self.holder
+        if not mine and cur.get("expires_at", 0) > now and not self._holder_dead(cur.get("holder")):
+            return False
+        term = cur.get("term", 0) if mine else cur.get("term", 0) + 1
+        self._write({"holder": self.holder, "expires_at": now + self.ttl, "term": term,
+                     "acquired_at": cur.get("acquired_at", now) if mine else now})
+        if not mine:
+            previous = cur.get("holder")
+            logger.info("Bail de leader obtenu (term %d%s)", term, f", précédent : {previous}" if previous else "")
+        self.term = term
+        return True
+
+    def _renew_locked(self) -> bool:
+        cur = self.read() or {}
+        if cur.get("holder") != self.holder or cur.get("term") != self.term:
+            self.term = None
+            return False
+        cur["expires_at"] = time.time() + self.ttl
+        self._write(cur)
+        return True
+
+    def _release_locked(self):
+        cur = self.read() or {}
+        if cur.get("holder") == self.holder:
+            cur["expires_at"] = 0
+            self._write(cur)
+            logger.info("Bail de leader rendu (term %s)", self.term)
+        self.term = None
+
+    def try_acquire(self) -> bool:
+        """Prend le bail s'il est libre, expiré ou déjà à nous ; True si ce processus est leader."""
+        with self._lock.hold(exclusive=True):
+            return self._try_acquire_locked()
+
+    def renew(self) -> bool:
+        """Prolonge le bail ; False s'il a été pris par un autre processus (ce processus doit s'arrêter)."""
+        with self._lock.hold(exclusive=True):
+            return self._renew_locked()
+
+    def release(self):
+        """Rend le bail (arrêt propre) : un standby le prend sans attendre l'expiration."""
+        if self.term is None:
+            return
+        with self._lock.hold(exclusive=True):
+            self._release_locked()
+
+    # variantes pour la boucle asyncio : l'attente du verrou (autre processus en pleine écriture)
+    # ne bloque pas le bot
+
+    async def try_acquire_async(self) -> bool:
+        async with self._lock.hold_async(exclusive=True):
+            return self._try_acquire_locked()
+
+    async def renew_async(self) -> bool:
+        async with self._lock.hold_async(exclusive=True):
+            return self._renew_locked()
+
+    async def release_async(self):
+        if self.term is None:
+            return
+        async with self._lock.hold_async(exclusive=True):
+            self._release_locked()
+
+    @property
+    def is_leader(self) -> bool:
+        return self.term is not None
+
+    def describe(self) -> dict:
+        cur = self.read() or {}
+        return {
+            "holder": cur.get("holder"),
+            "term": cur.get("term"),
+            "expires_in_seconds": round(cur.get("expires_at", 0) - time.time(), 1) if cur else None,
+        }
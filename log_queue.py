@@ -0,0 +1,163 @@
+import asyncio
+import contextvars
+import logging
+from collections import deque
+
+import discord
+
+
+logger = logging.getLogger("fastsupport.logs")
+
+# Discord accepte au plus 10 embeds par message
+MAX_EMBEDS_PER_MESSAGE = 10
+# envois ratés (5xx, réseau, 400...) d'un même lot avant de l'abandonner
+MAX_SEND_ATTEMPTS = 3
+
+
+class _GuildLogState:
+    __slots__ = ("guild", "pending", "full", "space", "task", "available", "dropped", "failures")
+
+    def __init__(self, guild, max_pending):
+        self.guild = guild
+        self.pending = deque(maxlen=max_pending)
+        self.full = asyncio.Event()     # batch complet -> flush immédiat
+        self.space = asyncio.Event()    # de la place est revenue dans la file
+        self.space.set()
+        self.task = None
+        self.available = True           # False tant que le salon de log est introuvable
+        self.dropped = 0
+        self.failures = 0               # échecs d'envoi consécutifs du lot en tête de file
+
+
+class GuildLogQueue:
+    """
+    File de logs par guilde : regroupe jusqu'à 10 embeds par message et les envoie
+    après `flush_delay` secondes ou dès que le lot est plein.
+
+    - backpressure : si la file d'une guilde est pleine, `put` attend (au plus
+      `put_timeout` secondes) que le writer libère de la place ;
+    - drop-oldest : si le salon de log est indisponible (ou le délai dépassé),
+      les embeds les plus anciens sont abandonnés ;
+    - un lot dont l'envoi échoue est remis en tête de file et retenté après
+      `retry_delay` secondes, abandonné après MAX_SEND_ATTEMPTS échecs.
+
+    `resolver(guild)` est une coroutine qui retourne le salon de log (ou None).
+    """
+
+    def __init__(self, resolver, *, batch_size=MAX_EMBEDS_PER_MESSAGE, flush_delay=2.0,
+                 max_pending=100, put_timeout=5.0, retry_delay=30.0):
+        self.resolver = resolver
+        self.batch_size = max(1, min(batch_size, MAX_EMBEDS_PER_MESSAGE))
+        self.flush_delay = flush_delay
+        self.max_pending = max(max_pending, self.batch_size)
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+        self._states = {}
+
+    def _state(self, guild):
+        st = self._states.get(guild.id)
+        if st is None:
+            st = self._states[guild.id] = _GuildLogState(guild, self.max_pending)
+        else:
+            st.guild = guild
+        return st
+
+    def depth(self) -> int:
+        """Nombre total d'embeds en attente (toutes guildes)."""
+        return sum(len(st.pending) for st in self._states.values())
+
+    def dropped(self) -> int:
+        return sum(st.dropped for st in self._states.values())
+
+    async def put(self, guild: discord.Guild, embed: discord.Embed):
+        st = self._state(guild)
+
+        if len(st.pending) >= self.max_pending and st.available:
+            # backpressure : on laisse le writer vider la file avant d'empiler
+            st.space.clear()
+            self._ensure_worker(st)
+            try:
+                await asyncio.wait_for(st.space.wait(), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if len(st.pending) >= self.max_pending:
+            st.dropped += 1
+            logger.debug("File de logs pleine pour la guilde %s — embed le plus ancien abandonné", guild.id)
+        st.pending.append(embed)  # deque(maxlen) -> drop-oldest
+
+        if len(st.pending) >= self.batch_size:
+            st.full.set()
+        self._ensure_worker(st)
+
+    def _ensure_worker(self, st):
+        if st.task is None or st.task.done():
+            # contexte vierge : le worker survit au handler qui l'a créé, ses appels REST
+            # ne doivent pas être comptés dans ce handler (perf) ni dans sa trace (tracing)
+            st.task = asyncio.create_task(self._worker(st), context=contextvars.Context())
+
+    async def _worker(self, st):
+        while st.pending:
+            if len(st.pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(st.full.wait(), timeout=self.flush_delay)
+                except asyncio.TimeoutError:
+                    pass
+            st.full.clear()
+            if not await self._flush_once(st):
+                await asyncio.sleep(self.retry_delay)
+
+    async def _flush_once(self, st) -> bool:
+        """Envoie un lot. Retourne False si le salon est indisponible (les embeds restent en file)."""
+        if not st.pending:
+            return True
+        try:
+            channel = await self.resolver(st.guild)
+        except Exception:
+            logger.exception("Erreur en résolvant le salon de log de la guilde %s", st.guild.id)
+            channel = None
+        if channel is None:
+            if st.available:
+                logger.warning("Salon de log introuvable dans la guilde %s — passage en drop-oldest", st.guild.id)
+            st.available = False
+            st.space.set()  # plus de backpressure : on passe en drop-oldest
+            return False
+
+        batch = [st.pending.popleft() for _ in range(min(self.batch_size, len(st.pending)))]
+        try:
+            await channel.send(embeds=batch)
+        except (discord.Forbidden, discord.NotFound):
+            logger.warning("Salon de log indisponible dans la guilde %s — lot remis en file", st.guild.id)
+            self._requeue(st, batch)
+            st.available = False
+            st.space.set()
+            return False
+        except Exception:
+            st.failures += 1
+            if st.failures < MAX_SEND_ATTEMPTS:
+                logger.exception("Impossible d'envoyer un lot de %d logs dans la guilde %s — nouvel essai dans %.0f s",
+                                 len(batch), st.guild.id, self.retry_delay)
+                self._requeue(st, batch)
+                return False
+            logger.exception("Lot de %d logs abandonné dans la guilde %s après %d essais",
+                             len(batch), st.guild.id, st.failures)
+            st.dropped += len(batch)
+        st.failures = 0
+        st.available = True
+        if len(st.pending) < self.max_pending:
+            st.space.set()
+        return True
+
+    def _requeue(self, st, batch):
+        """Remet le lot en tête de file ; ce qui ne tient plus (file remplie entre-temps) est compté perdu."""
+        room = self.max_pending - len(st.pending)
+        st.pending.extendleft(reversed(batch[:room]))
+        if len(batch) > room:
+            st.dropped += len(batch) - room
+
+    async def flush(self):
+        """Vide immédiatement toutes les files (ex: à l'arrêt du bot)."""
+        for st in list(self._states.values()):
+            while st.pending:
+                if not await self._flush_once(st):
+                    break
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+import perf
+
+
+logger = logging.getLogger("fastsupport.loop")
+
+STALLS = metrics.Counter(
+    "fastsupport_event_loop_stalls_total",
+    "Blocages de la boucle asyncio au-delà du seuil, par handler.",
+    ("handler",),
+)
+STALL_DURATION = metrics.Histogram(
+    "fastsupport_event_loop_stall_seconds",
+    "Durée des blocages de la boucle asyncio.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+def describe_task(task) -> str:
+    """Nom lisible de la tâche : handler instrumenté, sinon coroutine / nom de tâche."""
+    if task is None:
+        return "hors tâche (callback)"
+    name = perf.ACTIVE_HANDLERS.get(task)
+    if name:
+        return name
+    try:
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", None) or task.get_name()
+    except Exception:
+        return repr(task)
+
+
+class StallWatchdog:
+    """
+    Détecte les blocages de la boucle asyncio (code synchrone qui ne rend pas la main).
+
+    Une tâche « battement » met à jour un horodatage toutes les `interval` secondes ;
+    un thread de surveillance vérifie cet horodatage. Si la boucle ne bat plus depuis
+    `threshold` secondes, le thread capture la pile du thread de la boucle (le code
+    en train de bloquer) et le handler en cours, puis les journalise.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self._beat = time.monotonic()
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._stall = None          # (début, handler) du blocage en cours
+        self.last_stall = None      # dernier blocage détecté (pour le diagnostic)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="fastsupport-stall-heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="fastsupport-stall-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            now = time.monotonic()
+            stall = self._stall
+            if stall is not None:
+                # la boucle a repris la main : on clôt le blocage détecté par le thread
+                self._stall = None
+                duration = now - stall[0]
+                STALL_DURATION.observe(duration)
+                logger.warning("Boucle asyncio débloquée après %.0f ms (handler: %s)", duration * 1000, stall[1])
+            self._beat = now
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(pile indisponible)"
+            try:
+                task = asyncio.current_task(self._loop)
+            except Exception:
+                task = None
+            handler = describe_task(task)
+            # re-vérifie : la boucle a pu reprendre pendant la capture
+            if self._beat != beat:
+                continue
+            self._stall = (beat, handler)
+            self.last_stall = {"handler": handler, "detected_at": time.time(), "stack": stack}
+            STALLS.inc(handler=handler)
+            logger.warning(
+                "Boucle asyncio bloquée depuis %.0f ms (handler: %s) — pile du code bloquant:\n%s",
+                blocked * 1000, handler, stack,
+            )
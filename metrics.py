@@ -0,0 +1,437 @@
+import bisect
+import contextvars
+import math
+import time
+
+import aiohttp
+
+
+# Exposition au format texte Prometheus (0.0.4), sans dépendance externe.
+# Tout est mis à jour depuis la boucle asyncio du bot : pas de verrou nécessaire.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _labels(self, key: tuple, extra=()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def collect(self):
+        return []
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.collect())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def items(self):
+        return [(dict(zip(self.labelnames, k)), v) for k, v in self._values.items()]
+
+    def collect(self):
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Jauge : valeur fixée avec `set` ou lue à chaque scrape via `set_function`."""
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+        self._fn = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = float(value)
+
+    def set_function(self, fn):
+        """`fn()` retourne un nombre (jauge sans label) ou un dict {tuple de labels: valeur}."""
+        self._fn = fn
+
+    def collect(self):
+        values = dict(self._values)
+        if self._fn is not None:
+            try:
+                res = self._fn()
+            except Exception:
+                res = None
+            if isinstance(res, dict):
+                values.update(res)
+            elif res is not None:
+                values[()] = float(res)
+        return [
+            f"{self.name}{self._labels(k)} {_fmt(v)}"
+            for k, v in values.items() if v is not None and not math.isnan(v)
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # key -> [counts par bucket..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        s = self._series.get(key)
+        if s is None:
+            s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            s[i] += 1
+        s[-2] += value
+        s[-1] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def collect(self):
+        lines = []
+        for key, s in self._series.items():
+            acc = 0
+            for b, c in zip(self.buckets, s):
+                acc += c
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _fmt(b))])} {acc}")
+            lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {s[-1]}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(s[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {s[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self._t0, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------- Métriques du bot ----------------
+TICKET_EVENTS = Counter(
+    "fastsupport_ticket_events_total",
+    "Tickets ouverts / pris en charge / résolus / fermés.",
+    ("guild", "category", "event"),
+)
+HANDLER_LATENCY = Histogram(
+    "fastsupport_handler_duration_seconds",
+    "Durée des handlers d'interaction et des commandes.",
+    ("handler",),
+)
+STAGE_LATENCY = Histogram(
+    "fastsupport_handler_stage_duration_seconds",
+    "Durée de chaque étape d'un handler (StageTimer).",
+    ("handler", "stage"),
+)
+SAVE_CONFIG_DURATION = Histogram(
+    "fastsupport_save_config_duration_seconds",
+    "Durée de save_config (attente du verrou comprise).",
+)
+SAVE_CONFIG_BYTES = Counter(
+    "fastsupport_save_config_bytes_total",
+    "Octets écrits par save_config.",
+)
+SAVE_CONFIG_LAST_BYTES = Gauge(
+    "fastsupport_save_config_last_bytes",
+    "Taille du dernier fichier de config écrit.",
+)
+CONFIG_GUILDS_LOADED = Gauge(
+    "fastsupport_config_guilds_loaded",
+    "Guildes dont la config est chargée en mémoire (les autres restent sur disque).",
+)
+CONFIG_GUILD_LOADS = Counter(
+    "fastsupport_config_guild_loads_total",
+    "Chargements à la demande d'une config de guilde depuis le disque.",
+)
+CONFIG_GUILD_EVICTIONS = Counter(
+    "fastsupport_config_guild_evictions_total",
+    "Configs de guilde retirées de la mémoire (LRU).",
+)
+CONFIG_EXTERNAL_MERGES = Counter(
+    "fastsupport_config_external_merges_total",
+    "Configs de guilde modifiées par un autre processus et fusionnées avant sauvegarde.",
+)
+CONFIG_MERGE_CONFLICTS = Counter(
+    "fastsupport_config_merge_conflicts_total",
+    "Champs modifiés des deux côtés lors d'une fusion (la version de ce processus l'emporte).",
+)
+REST_REQUESTS = Counter(
+    "fastsupport_discord_rest_requests_total",
+    "Requêtes REST Discord par route et code HTTP.",
+    ("route", "status"),
+)
+REST_RATELIMITED = Counter(
+    "fastsupport_discord_rest_ratelimited_total",
+    "Réponses 429 de l'API Discord par route et portée (user / global / shared).",
+    ("route", "scope"),
+)
+REST_LATENCY = Histogram(
+    "fastsupport_discord_rest_duration_seconds",
+    "Durée de chaque requête HTTP vers l'API Discord (par tentative), par route.",
+    ("route",),
+)
+REST_RESPONSE_BYTES = Counter(
+    "fastsupport_discord_rest_response_bytes_total",
+    "Octets reçus de l'API Discord (Content-Length), par route.",
+    ("route",),
+)
+REST_BUDGET_REMAINING = Gauge(
+    "fastsupport_discord_ratelimit_remaining",
+    "Dernière valeur de X-RateLimit-Remaining connue, par route.",
+    ("route",),
+)
+GATEWAY_LATENCY = Gauge(
+    "fastsupport_gateway_latency_seconds",
+    "Latence du heartbeat gateway.",
+)
+LOG_EMBEDS_DROPPED = Gauge(
+    "fastsupport_log_embeds_dropped",
+    "Embeds de log abandonnés depuis le démarrage (file pleine, envoi impossible).",
+)
+
+
+# ---------------- Comptage des appels REST ----------------
+# route discord.py en cours (positionnée autour de HTTPClient.request, lue par les hooks aiohttp)
+CURRENT_ROUTE = contextvars.ContextVar("fastsupport_current_route", default=None)
+
+
+def route_label(route) -> str:
+    return route.key if route is not None else "inconnue"
+
+
+class RestUsage:
+    __slots__ = ("calls", "bytes", "seconds", "ratelimited", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.ratelimited = 0
+        self.errors = 0
+
+
+class RestAccounting:
+    """
+    Consommation de l'API REST par (guilde, route) depuis le démarrage, et dernier état
+    connu du budget de rate-limit par route (en-têtes X-RateLimit-*).
+    Le détail par guilde reste en mémoire (affiché par /rest-stats) : en label Prometheus
+    il ferait exploser la cardinalité.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.usage = {}         # (guild_id ou None, route) -> RestUsage
+        self.budgets = {}       # route -> (remaining, limit, reset_after, bucket)
+        # channel_id -> guild_id pour les routes /channels/{id}/... (fourni par le bot)
+        self.guild_resolver = None
+
+    def guild_for(self, route):
+        if route is None:
+            return None
+        if route.guild_id is not None:
+            return int(route.guild_id)
+        if route.channel_id is not None and self.guild_resolver is not None:
+            try:
+                return self.guild_resolver(int(route.channel_id))
+            except Exception:
+                return None
+        return None
+
+    def record(self, route, status, nbytes: int, seconds: float, headers=None):
+        label = route_label(route)
+        key = (self.guild_for(route), label)
+        u = self.usage.get(key)
+        if u is None:
+            u = self.usage[key] = RestUsage()
+        u.calls += 1
+        u.bytes += nbytes
+        u.seconds += seconds
+        if status == 429:
+            u.ratelimited += 1
+        elif status == "error" or (isinstance(status, int) and status >= 500):
+            u.errors += 1
+        if headers is not None and "X-RateLimit-Remaining" in headers:
+            try:
+                self.budgets[label] = (
+                    int(headers["X-RateLimit-Remaining"]),
+                    int(headers.get("X-RateLimit-Limit", 0)),
+                    float(headers.get("X-RateLimit-Reset-After", 0.0)),
+                    headers.get("X-RateLimit-Bucket"),
+                )
+            except ValueError:
+                pass
+
+    def by_route(self, guild_id=None) -> dict:
+        """route -> RestUsage cumulé (toutes guildes, ou une seule si `guild_id`)."""
+        out = {}
+        for (gid, route), u in self.usage.items():
+            if guild_id is not None and gid != guild_id:
+                continue
+            acc = out.get(route)
+            if acc is None:
+                acc = out[route] = RestUsage()
+            acc.calls += u.calls
+            acc.bytes += u.bytes
+            acc.seconds += u.seconds
+            acc.ratelimited += u.ratelimited
+            acc.errors += u.errors
+        return out
+
+    def by_guild(self) -> dict:
+        out = {}
+        for (gid, _), u in self.usage.items():
+            out[gid] = out.get(gid, 0) + u.calls
+        return out
+
+    def table(self, guild_id=None, limit: int = 15) -> str:
+        """Tableau texte des routes les plus consommatrices (par nombre d'appels)."""
+        rows = sorted(self.by_route(guild_id).items(), key=lambda kv: kv[1].calls, reverse=True)
+        lines = [f"{'route':<40} {'appels':>6} {'Ko':>7} {'moy ms':>6} {'429':>4} {'budget':>7}"]
+        for route, u in rows[:limit]:
+            budget = self.budgets.get(route)
+            lines.append(
+                f"{route[:40]:<40} {u.calls:>6} {u.bytes / 1024:>7.1f} {u.seconds / u.calls * 1000:>6.0f} "
+                f"{u.ratelimited:>4} {(f'{budget[0]}/{budget[1]}' if budget else '-'):>7}"
+            )
+        return "\n".join(lines)
+
+
+REST_ACCOUNTING = RestAccounting()
+REST_BUDGET_REMAINING.set_function(lambda: {(route,): b[0] for route, b in REST_ACCOUNTING.budgets.items()})
+
+
+async def _on_request_start(session, ctx, params):
+    ctx.fastsupport_t0 = time.perf_counter()
+
+
+async def _on_request_end(session, ctx, params):
+    route_obj = CURRENT_ROUTE.get()
+    route = route_label(route_obj)
+    response = params.response
+    status = response.status
+    elapsed = time.perf_counter() - getattr(ctx, "fastsupport_t0", time.perf_counter())
+    nbytes = response.content_length or 0
+    REST_REQUESTS.inc(route=route, status=status)
+    REST_LATENCY.observe(elapsed, route=route)
+    if nbytes:
+        REST_RESPONSE_BYTES.inc(nbytes, route=route)
+    if status == 429:
+        REST_RATELIMITED.inc(route=route, scope=response.headers.get("X-RateLimit-Scope", "user"))
+    REST_ACCOUNTING.record(route_obj, status, nbytes, elapsed, response.headers)
+
+
+async def _on_request_exception(session, ctx, params):
+    route_obj = CURRENT_ROUTE.get()
+    elapsed = time.perf_counter() - getattr(ctx, "fastsupport_t0", time.perf_counter())
+    REST_REQUESTS.inc(route=route_label(route_obj), status="error")
+    REST_ACCOUNTING.record(route_obj, "error", 0, elapsed)
+
+
+def create_http_trace():
+    """TraceConfig aiohttp à passer à `commands.Bot(http_trace=...)`."""
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(_on_request_start)
+    trace.on_request_end.append(_on_request_end)
+    trace.on_request_exception.append(_on_request_exception)
+    return trace
+
+
+# fonctions appelées avec la durée (s) de chaque requête REST terminée (HTTPClient ou webhook, ex: perf.add_rest_time)
+REQUEST_OBSERVERS = []
+
+
+def _observe_requests(original):
+    async def request(route, *args, **kwargs):
+        token = CURRENT_ROUTE.set(route)
+        t0 = time.perf_counter()
+        try:
+            return await original(route, *args, **kwargs)
+        finally:
+            CURRENT_ROUTE.reset(token)
+            elapsed = time.perf_counter() - t0
+            for observer in REQUEST_OBSERVERS:
+                observer(elapsed)
+    return request
+
+
+def instrument_http(http):
+    """Enveloppe `HTTPClient.request` pour exposer la route courante aux hooks aiohttp."""
+    http.request = _observe_requests(http.request)
+    return http
+
+
+def instrument_webhooks(adapter=None):
+    """
+    Même chose pour l'adaptateur webhook de discord.py (par défaut celui de toutes les
+    interactions) : réponses, followups et edit_original_response ne passent pas par HTTPClient.
+    """
+    if adapter is None:
+        from discord.webhook.async_ import async_context
+        adapter = async_context.get()
+    adapter.request = _observe_requests(adapter.request)
+    return adapter
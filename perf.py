@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import math
+import time
+
+import metrics
+import tracing
+from metrics import HANDLER_LATENCY
+
+
+# ---------------- Sketch de quantiles sur fenêtre glissante ----------------
+class QuantileSketch:
+    """
+    Histogramme logarithmique (précision relative `accuracy`, façon DDSketch) :
+    la mémoire dépend de l'étendue des valeurs, pas du nombre d'observations.
+    """
+    __slots__ = ("gamma_log", "counts", "zeros", "count")
+
+    def __init__(self, accuracy: float = 0.02):
+        self.gamma_log = math.log((1 + accuracy) / (1 - accuracy))
+        self.counts = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 1e-9:
+            self.zeros += 1
+            return
+        idx = math.ceil(math.log(value) / self.gamma_log)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.zeros += other.zeros
+        for k, v in other.counts.items():
+            self.counts[k] = self.counts.get(k, 0) + v
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen > rank:
+                # milieu (géométrique) du bucket
+                return 2 * math.exp(idx * self.gamma_log) / (1 + math.exp(self.gamma_log))
+        return 2 * math.exp(max(self.counts) * self.gamma_log) / (1 + math.exp(self.gamma_log))
+
+
+class RollingQuantiles:
+    """Fenêtre glissante de `slots` sketches de `slot_seconds` chacun (10 x 60 s par défaut)."""
+    __slots__ = ("slot_seconds", "slots", "_ring")
+
+    def __init__(self, slot_seconds: int = 60, slots: int = 10):
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        self._ring = {}     # numéro de créneau -> QuantileSketch
+
+    def add(self, value: float, now: float = None):
+        slot = int((now if now is not None else time.time()) // self.slot_seconds)
+        sk = self._ring.get(slot)
+        if sk is None:
+            sk = self._ring[slot] = QuantileSketch()
+            for old in [s for s in self._ring if s <= slot - self.slots]:
+                del self._ring[old]
+        sk.add(value)
+
+    def snapshot(self, now: float = None) -> QuantileSketch:
+        current = int((now if now is not None else time.time()) // self.slot_seconds)
+        merged = QuantileSketch()
+        for slot, sk in self._ring.items():
+            if slot > current - self.slots:
+                merged.merge(sk)
+        return merged
+
+
+class HandlerStats:
+    __slots__ = ("wall", "rest", "persistence", "errors")
+
+    def __init__(self):
+        self.wall = RollingQuantiles()
+        self.rest = RollingQuantiles()
+        self.persistence = RollingQuantiles()
+        self.errors = 0
+
+
+STATS = {}          # nom du handler -> HandlerStats
+
+
+# ---------------- Suivi de l'appel en cours ----------------
+# tâche asyncio -> handler instrumenté en cours (lu par le watchdog de loop_monitor)
+ACTIVE_HANDLERS = {}
+
+
+class _Sample:
+    __slots__ = ("name", "rest", "persistence")
+
+    def __init__(self, name):
+        self.name = name
+        self.rest = 0.0
+        self.persistence = 0.0
+
+
+# handler en cours dans la tâche courante (copié dans les sous-tâches créées par gather/create_task :
+# les temps REST / persistance concurrents s'y cumulent)
+_CURRENT = contextvars.ContextVar("fastsupport_handler_sample", default=None)
+
+
+def add_rest_time(seconds: float):
+    sample = _CURRENT.get()
+    if sample is not None:
+        sample.rest += seconds
+
+
+@contextlib.contextmanager
+def track_persistence():
+    """Compte le temps passé dans le bloc comme temps de persistance du handler courant."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample = _CURRENT.get()
+        if sample is not None:
+            sample.persistence += time.perf_counter() - t0
+
+
+metrics.REQUEST_OBSERVERS.append(add_rest_time)
+
+
+def _interaction_attributes(args) -> dict:
+    """Identifiants de l'interaction / du message déclencheur, pour le span racine."""
+    for a in args:
+        if hasattr(a, "guild_id") and hasattr(a, "user"):        # discord.Interaction
+            return {"discord.interaction_id": a.id, "discord.guild_id": a.guild_id, "discord.user_id": a.user.id}
+        if hasattr(a, "message") and hasattr(a, "author"):      # commands.Context
+            return {"discord.message_id": a.message.id, "discord.guild_id": getattr(a.guild, "id", None), "discord.user_id": a.author.id}
+    return {}
+
+
+def instrument(name: str):
+    """
+    Décorateur pour les handlers d'interaction / commandes : mesure la durée totale,
+    le temps passé à attendre l'API REST Discord et le temps passé en persistance.
+    Alimente fastsupport_handler_duration_seconds et les sketches affichés par /perf-stats,
+    et ouvre une nouvelle trace (un trace ID par interaction) si le traçage est actif.
+    À placer juste au-dessus du `async def` (sous les décorateurs discord.py).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            sample = _Sample(name)
+            token = _CURRENT.set(sample)
+            task = asyncio.current_task()
+            ACTIVE_HANDLERS[task] = name
+            t0 = time.perf_counter()
+            failed = False
+            try:
+                with tracing.span(name, kind="SERVER", new_trace=True, **_interaction_attributes(args)):
+                    return await func(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                wall = time.perf_counter() - t0
+                _CURRENT.reset(token)
+                ACTIVE_HANDLERS.pop(task, None)
+                HANDLER_LATENCY.observe(wall, handler=name)
+                st = STATS.get(name)
+                if st is None:
+                    st = STATS[name] = HandlerStats()
+                now = time.time()
+                st.wall.add(wall, now)
+                st.rest.add(sample.rest, now)
+                st.persistence.add(sample.persistence, now)
+                if failed:
+                    st.errors += 1
+        return wrapper
+    return decorator
+
+
+def quantiles(rq: RollingQuantiles, qs=(0.5, 0.95, 0.99)):
+    sk = rq.snapshot()
+    return sk.count, [sk.quantile(q) for q in qs]
+
+
+def stats_table(limit: int = 20, name_filter: str = None) -> str:
+    """Tableau texte p50/p95/p99 (ms) par handler, trié par p99 décroissant."""
+    rows = []
+    for name, st in STATS.items():
+        if name_filter and name_filter.lower() not in name.lower():
+            continue
+        n, wall = quantiles(st.wall)
+        if not n:
+            continue
+        _, rest = quantiles(st.rest)
+        _, pers = quantiles(st.persistence)
+        rows.append((wall[2] or 0.0, name, n, wall, rest, pers, st.errors))
+    rows.sort(reverse=True)
+
+    def ms(v):
+        return "-" if v is None else f"{v * 1000:.0f}"
+
+    lines = [f"{'handler':<28} {'n':>5}  {'total p50/p95/p99':>17}  {'REST p50/p95/p99':>16}  {'persist p95':>11}"]
+    for _, name, n, wall, rest, pers, errors in rows[:limit]:
+        lines.append(
+            f"{name[:28]:<28} {n:>5}  {'/'.join(ms(v) for v in wall):>17}  {'/'.join(ms(v) for v in rest):>16}  {ms(pers[1]):>11}"
+            + (f"  ⚠{errors}" if errors else "")
+        )
+    return "\n".join(lines)
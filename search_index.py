@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger("fastsupport.search")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    channel_name TEXT,
+    owner_id INTEGER,
+    category TEXT,
+    closed_by INTEGER,
+    closed_at TEXT,
+    action TEXT,
+    path TEXT,
+    message_count INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tickets_guild_closed ON tickets (guild_id, closed_at DESC);
+CREATE INDEX IF NOT EXISTS tickets_guild_owner ON tickets (guild_id, owner_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    content,
+    author,
+    ticket_id UNINDEXED,
+    author_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def fts_query(text: str) -> str:
+    """Transforme une saisie libre en requête FTS5 (chaque mot entre guillemets, ET implicite)."""
+    words = [w for w in (text or "").split() if w]
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+class TranscriptIndex:
+    """
+    Index plein texte (SQLite FTS5) des transcripts de tickets.
+
+    Toutes les opérations SQLite passent par un unique thread dédié (connexion
+    non partagée entre threads), la boucle asyncio n'est jamais bloquée.
+    Le transcript est indexé au fil de l'export : `begin` -> `add_messages` par page -> `finish`
+    (ou `discard` si l'export échoue). Seuls les tickets finalisés sont visibles dans la recherche.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fastsupport-search")
+        self._conn = None
+
+    # --- exécuté dans le thread dédié ---
+    def _connect(self):
+        if self._conn is None:
+            dirpath = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(dirpath, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _begin(self, head: dict) -> int:
+        conn = self._connect()
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO tickets (guild_id, channel_id, channel_name, owner_id, category, closed_by, closed_at, action) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (head.get("guild_id"), head.get("channel_id"), head.get("channel_name"), _int_or_none(head.get("owner_id")),
+                 head.get("category"), _int_or_none(head.get("closed_by")), head.get("closed_at"), head.get("action")),
+            )
+        return cur.lastrowid
+
+    def _add_messages(self, ticket_id: int, records: list):
+        conn = self._connect()
+        rows = [
+            (r.get("content") or "", r.get("author") or "", ticket_id, r.get("author_id"))
+            for r in records if r.get("content")
+        ]
+        if not rows:
+            return
+        with conn:
+            conn.executemany("INSERT INTO messages_fts (content, author, ticket_id, author_id) VALUES (?, ?, ?, ?)", rows)
+
+    def _finish(self, ticket_id: int, path: str, count: int):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE tickets SET path = ?, message_count = ? WHERE id = ?", (path, count, ticket_id))
+
+    def _discard(self, ticket_id: int):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM messages_fts WHERE ticket_id = ?", (ticket_id,))
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+
+    def _search(self, guild_id: int, text: str, owner_id: int, category: str, limit: int, offset: int):
+        conn = self._connect()
+        # path NULL : export interrompu (arrêt brutal pendant l'export)
+        where = ["t.guild_id = ?", "t.path IS NOT NULL"]
+        params = [guild_id]
+        if owner_id:
+            where.append("t.owner_id = ?")
+            params.append(owner_id)
+        if category:
+            where.append("t.category = ? COLLATE NOCASE")
+            params.append(category)
+        match = fts_query(text)
+        if match:
+            where.append("t.id IN (SELECT ticket_id FROM messages_fts WHERE messages_fts MATCH ?)")
+            params.append(match)
+        clause = " AND ".join(where)
+
+        total = conn.execute(f"SELECT COUNT(*) FROM tickets t WHERE {clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT t.id, t.channel_id, t.channel_name, t.owner_id, t.category, t.closed_by, t.closed_at, t.action, t.path "
+            f"FROM tickets t WHERE {clause} ORDER BY t.closed_at DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        keys = ("id", "channel_id", "channel_name", "owner_id", "category", "closed_by", "closed_at", "action", "path")
+        results = [dict(zip(keys, r)) for r in rows]
+
+        if match:
+            for res in results:
+                snip = conn.execute(
+                    "SELECT snippet(messages_fts, 0, '**', '**', '…', 12) FROM messages_fts "
+                    "WHERE messages_fts MATCH ? AND ticket_id = ? LIMIT 1",
+                    (match, res["id"]),
+                ).fetchone()
+                res["snippet"] = snip[0] if snip else None
+        return total, results
+
+    # --- API asynchrone ---
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def begin(self, head: dict) -> int:
+        return await self._run(self._begin, head)
+
+    async def add_messages(self, ticket_id: int, records: list):
+        await self._run(self._add_messages, ticket_id, records)
+
+    async def finish(self, ticket_id: int, path: str, count: int):
+        await self._run(self._finish, ticket_id, path, count)
+
+    async def discard(self, ticket_id: int):
+        """Retire un ticket dont l'export a échoué (ligne et messages indexés)."""
+        await self._run(self._discard, ticket_id)
+
+    async def search(self, guild_id: int, text: str = None, owner_id: int = None, category: str = None,
+                     limit: int = 5, offset: int = 0):
+        """Retourne (total, résultats) pour une page de recherche, sans lire les fichiers de transcript."""
+        return await self._run(self._search, guild_id, text, owner_id, category, limit, offset)
+
+    def close(self):
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(_close).result()
+        self._executor.shutdown(wait=True)
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,108 @@
+import os
+
+
+# Déploiement en plusieurs processus (« clusters ») : chaque processus ouvre une partie des shards
+# de la gateway et ne s'occupe que des guildes de ses shards (shard = (guild_id >> 22) % shard_count,
+# la règle de Discord). La config reste un seul fichier partagé (verrou + fusion, cf. config_store) ;
+# chaque processus n'y charge, ne parcourt et ne modifie que ses guildes.
+#
+#   FASTSUPPORT_SHARD_COUNT   vide / 0 : pas de sharding ; "auto" : nombre recommandé par Discord
+#                             (un seul processus) ; N : N shards au total
+#   FASTSUPPORT_SHARD_IDS     shards de ce processus ("0-3", "4,5,6"...) ; vide = tous
+#   FASTSUPPORT_CLUSTER_ID    numéro du processus (logs, métriques), posé par cluster.py
+
+
+def parse_shard_ids(value: str):
+    """ "0-3,8" -> (0, 1, 2, 3, 8) ; vide -> None (tous les shards)."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            ids.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            ids.append(int(part))
+    return tuple(sorted(set(ids)))
+
+
+def format_shard_ids(ids) -> str:
+    """(0, 1, 2, 3, 8) -> "0-3,8"."""
+    parts = []
+    ids = sorted(ids)
+    i = 0
+    while i < len(ids):
+        j = i
+        while j + 1 < len(ids) and ids[j + 1] == ids[j] + 1:
+            j += 1
+        parts.append(str(ids[i]) if i == j else f"{ids[i]}-{ids[j]}")
+        i = j + 1
+    return ",".join(parts)
+
+
+def shard_id_for(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+def split_shards(shard_count: int, clusters: int) -> list:
+    """Plages de shards contiguës et équilibrées : split_shards(10, 3) -> [(0..3), (4..6), (7..9)]."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    out = []
+    start = 0
+    for i in range(clusters):
+        n = size + (1 if i < extra else 0)
+        out.append(tuple(range(start, start + n)))
+        start += n
+    return out
+
+
+class ShardConfig:
+    """Shards de ce processus, lus depuis l'environnement."""
+
+    def __init__(self, shard_count=None, shard_ids=None, cluster_id=None):
+        self.shard_count = shard_count      # None = pas de sharding, 0 = automatique
+        self.shard_ids = shard_ids          # None = tous les shards
+        self.cluster_id = cluster_id
+
+    @classmethod
+    def from_env(cls):
+        raw = os.getenv("FASTSUPPORT_SHARD_COUNT", "").strip().lower()
+        if raw in ("", "0"):
+            shard_count = None
+        elif raw == "auto":
+            shard_count = 0
+        else:
+            shard_count = int(raw)
+        shard_ids = parse_shard_ids(os.getenv("FASTSUPPORT_SHARD_IDS", ""))
+        if shard_ids is not None:
+            if not shard_count:
+                raise ValueError("FASTSUPPORT_SHARD_IDS demande un FASTSUPPORT_SHARD_COUNT explicite")
+            if shard_ids[-1] >= shard_count:
+                raise ValueError(f"shard {shard_ids[-1]} hors de 0..{shard_count - 1}")
+        cluster = os.getenv("FASTSUPPORT_CLUSTER_ID", "").strip()
+        return cls(shard_count, shard_ids, int(cluster) if cluster else None)
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count is not None
+
+    def bot_kwargs(self) -> dict:
+        """Arguments de commands.AutoShardedBot (shard_count=None : valeur recommandée par Discord)."""
+        return {"shard_count": self.shard_count or None, "shard_ids": list(self.shard_ids) if self.shard_ids else None}
+
+    def owns(self, guild_id: int) -> bool:
+        """La guilde est-elle servie par ce processus ?"""
+        if self.shard_ids is None:
+            return True
+        return shard_id_for(guild_id, self.shard_count) in self.shard_ids
+
+    def describe(self) -> str:
+        if not self.sharded:
+            return "sans sharding"
+        count = self.shard_count or "auto"
+        shards = format_shard_ids(self.shard_ids) if self.shard_ids else "tous"
+        cluster = f", cluster {self.cluster_id}" if self.cluster_id is not None else ""
+        return f"shards {shards} / {count}{cluster}"
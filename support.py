@@ -1,28 +1,48 @@
 import discord
 import os
-import json
 import shutil
 import asyncio
 import tempfile
+import io
 import re
 import unicodedata
 import logging
+import time
+import signal
+import contextlib
 from keep_alive import keep_alive
+from log_queue import GuildLogQueue
+from transcripts import export_transcript, upload_transcript
+from search_index import TranscriptIndex
+from attachments import AttachmentStore
+from perf import instrument, track_persistence, stats_table, ACTIVE_HANDLERS
+import metrics
+from health import HEALTH
+from loop_monitor import StallWatchdog
+import tracing
+from traffic_recorder import TrafficRecorder
+from config_model import GuildConfig, Category, Ticket
+from config_store import GuildStore
+from file_lock import LockTimeout
+from sharding import ShardConfig, format_shard_ids
+from leader_lease import LeaderLease
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 
 # ---------------- Logging ----------------
+# en cluster (cluster.py), chaque ligne indique le processus
+_CLUSTER_TAG = f"[cluster {os.environ['FASTSUPPORT_CLUSTER_ID']}] " if os.getenv("FASTSUPPORT_CLUSTER_ID") else ""
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+    format="%(asctime)s [%(levelname)s] " + _CLUSTER_TAG + "%(name)s: %(message)s"
 )
 logger = logging.getLogger("fastsupport")
 
 # ---------------- CONFIG ----------------
-CONFIG_FILE = "guild_config.json"
+CONFIG_FILE = os.getenv("FASTSUPPORT_CONFIG", "guild_config.json")
 
 # valeurs par défaut (compatibilité)
 STAFF_ROLE = "Staff"
@@ -30,6 +50,56 @@ TICKET_CATEGORY_NAME = "Tickets"
 LOG_CHANNEL_NAME = "📂・ticket-logs"
 DEFAULT_SUPPORT_CHANNEL_NAME = "support"
 
+# port du serveur HTTP keep-alive
+HTTP_PORT = int(os.getenv("PORT", "8080"))
+
+# spans de traçage (format OTLP/JSON, une ligne par span) ; vide pour désactiver
+TRACE_FILE = os.getenv("FASTSUPPORT_TRACE_FILE", os.path.join("traces", "spans.jsonl"))
+TRACE_MAX_BYTES = 10 * 1024 * 1024
+TRACE_BACKUPS = 5
+
+# seuil (ms) au-delà duquel un blocage de la boucle asyncio est journalisé avec sa pile
+STALL_THRESHOLD_MS = int(os.getenv("FASTSUPPORT_STALL_THRESHOLD_MS", "250"))
+
+# enregistrement anonymisé du trafic gateway (rejouable avec benchmarks/replay.py) ; vide = désactivé
+RECORD_FILE = os.getenv("FASTSUPPORT_RECORD_FILE", "")
+RECORD_MAX_BYTES = int(os.getenv("FASTSUPPORT_RECORD_MAX_MB", "200")) * 1024 * 1024
+
+# nombre max de configs de guilde gardées en mémoire (LRU, les autres restent sur disque) ; 0 = pas de limite
+CONFIG_CACHE_GUILDS = int(os.getenv("FASTSUPPORT_CONFIG_CACHE_GUILDS", "0"))
+# guildes quittées par le bot : archivées (gzip, une par fichier) après ce délai, restaurées s'il revient ;
+# 0 = pas d'archivage automatique (/compact-config reste disponible)
+GUILD_ARCHIVE_DIR = os.getenv("FASTSUPPORT_GUILD_ARCHIVE_DIR", "guild_archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("FASTSUPPORT_ARCHIVE_AFTER_DAYS", "30"))
+# attente max (s) du verrou de guild_config.json quand un autre processus l'écrit
+CONFIG_LOCK_TIMEOUT = float(os.getenv("FASTSUPPORT_CONFIG_LOCK_TIMEOUT", "10"))
+
+# standby : fichier de bail de leader partagé par le processus actif et ses standbys ; vide = désactivé
+LEADER_LEASE_FILE = os.getenv("FASTSUPPORT_LEADER_LEASE", "")
+LEASE_TTL = float(os.getenv("FASTSUPPORT_LEASE_TTL", "15"))
+LEASE_POLL = 0.5
+# le standby relit la config (sauvegardes du leader) toutes les STANDBY_REFRESH secondes
+STANDBY_REFRESH = 10.0
+# arrêt propre (SIGTERM / SIGINT) : délai max (s) pour finir les interactions en cours et vider les files
+SHUTDOWN_TIMEOUT = float(os.getenv("FASTSUPPORT_SHUTDOWN_TIMEOUT", "20"))
+
+# logs groupés : taille max d'un lot, délai avant envoi (s), embeds en attente max par guilde
+LOG_BATCH_SIZE = 10
+LOG_FLUSH_DELAY = 2.0
+LOG_QUEUE_MAX = 100
+
+# transcripts exportés à la fermeture/résolution (gzip JSONL), upload optionnel dans le salon de log
+TRANSCRIPT_DIR = "transcripts"
+TRANSCRIPTS_ENABLED = True
+TRANSCRIPT_UPLOAD = os.getenv("FASTSUPPORT_TRANSCRIPT_UPLOAD", "0") == "1"
+# index plein texte des transcripts (SQLite FTS5) utilisé par /ticket-search
+SEARCH_INDEX_FILE = os.path.join(TRANSCRIPT_DIR, "index.sqlite3")
+SEARCH_PAGE_SIZE = 5
+# pièces jointes archivées à la fermeture (store adressé par SHA-256, taille plafonnée)
+ATTACHMENT_DIR = "attachments"
+ATTACHMENT_MAX_BYTES = int(os.getenv("FASTSUPPORT_ATTACHMENT_MAX_BYTES", str(5 * 1024 ** 3)))
+ATTACHMENT_CONCURRENCY = 4
+
 # --- status search phrase (utilisé pour retrouver le champ d'état) ---
 STATUS_SEARCH = "prise en charge"
 
@@ -42,104 +112,178 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix=commands.when_mentioned_or('!'), intents=intents)
+# sharding / déploiement en plusieurs processus (cf. sharding.py et cluster.py)
+SHARDS = ShardConfig.from_env()
+BOT_KWARGS = dict(command_prefix=commands.when_mentioned_or('!'), intents=intents, http_trace=metrics.create_http_trace())
+if SHARDS.sharded:
+    bot = commands.AutoShardedBot(**BOT_KWARGS, **SHARDS.bot_kwargs())
+else:
+    bot = commands.Bot(**BOT_KWARGS)
+HEALTH.shards = SHARDS
+# route courante visible des hooks aiohttp (comptage REST / 429 par route)
+metrics.instrument_http(bot.http)
+tracing.instrument_http(bot.http)
+# réponses d'interaction et followups : webhook de l'interaction, hors HTTPClient
+metrics.instrument_webhooks()
+tracing.instrument_webhooks()
+metrics.GATEWAY_LATENCY.set_function(lambda: bot.latency if bot.is_ready() else None)
+# routes /channels/{id}/... : on retrouve la guilde via le cache du bot
+metrics.REST_ACCOUNTING.guild_resolver = lambda channel_id: getattr(getattr(bot.get_channel(channel_id), "guild", None), "id", None)
 
 # global asyncio lock for file writes
 SAVE_LOCK = asyncio.Lock()
 
 
 # ---------------- Storage util ----------------
-def load_config():
-    if not os.path.isfile(CONFIG_FILE):
-        return {}
+def load_config() -> GuildStore:
+    """Ouvre la config : seul l'index est lu, chaque guilde est chargée à son premier accès."""
+    # en cluster, seules les guildes des shards de ce processus sont parcourues et modifiées
+    owns = SHARDS.owns if SHARDS.shard_ids is not None else None
+    store = GuildStore(CONFIG_FILE, max_loaded=CONFIG_CACHE_GUILDS, archive_dir=GUILD_ARCHIVE_DIR, owns=owns)
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return store.open()
     except Exception:
         logger.exception("Erreur en lisant %s — utilisation d'une config vide", CONFIG_FILE)
-        return {}
+        return GuildStore(CONFIG_FILE, max_loaded=CONFIG_CACHE_GUILDS, archive_dir=GUILD_ARCHIVE_DIR, owns=owns)
 
 
-async def save_config(cfg):
+async def save_config(cfg: GuildStore):
     """
     Écriture atomique + backup horodaté + lock asyncio.
     - crée une copie de sauvegarde guild_config.json.bak-YYYYmmddHHMMSS si le fichier existe
-    - écrit atomiquement dans un tmp puis remplace
+    - écrit atomiquement dans un tmp puis remplace (les guildes non chargées sont recopiées telles quelles)
     """
+    with track_persistence(), tracing.span("save_config"):
+        await _save_config_locked(cfg)
+
+
+async def _save_config_locked(cfg: GuildStore):
+    t0 = time.perf_counter()
+    HEALTH.pending_saves += 1
     async with SAVE_LOCK:
+        HEALTH.pending_saves -= 1
         try:
-            # backup existing file
-            if os.path.isfile(CONFIG_FILE):
-                bname = f"{CONFIG_FILE}.bak-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+            # verrou entre processus (standby, scripts...) : la sauvegarde échouée sera retentée à la suivante
+            async with cfg.lock.hold_async(exclusive=True, timeout=CONFIG_LOCK_TIMEOUT):
                 try:
-                    shutil.copy2(CONFIG_FILE, bname)
-                    logger.debug("Backup config créé: %s", bname)
+                    cfg.refresh()
                 except Exception:
-                    logger.exception("Impossible de créer la sauvegarde %s", bname)
-
-            # write to temp file then replace
-            dirpath = os.path.dirname(os.path.abspath(CONFIG_FILE)) or "."
-            fd, tmp_path = tempfile.mkstemp(prefix="tmp_config_", suffix=".json", dir=dirpath)
-            try:
-                with os.fdopen(fd, "w", encoding="utf-8") as tmpf:
-                    json.dump(cfg, tmpf, ensure_ascii=False, indent=2)
-                os.replace(tmp_path, CONFIG_FILE)
-                logger.debug("Config sauvegardée atomiquement dans %s", CONFIG_FILE)
-            finally:
-                if os.path.exists(tmp_path):
-                    try:
-                        os.remove(tmp_path)
-                    except Exception:
-                        pass
-        except Exception:
-            logger.exception("Échec de la sauvegarde de la config (atomique + backup). Tentative d'écriture simple.")
+                    logger.exception("Impossible de relire %s avant sauvegarde (modifications externes écrasées)", cfg.path)
+                _write_config_file(cfg)
+        except LockTimeout:
+            logger.error("Config non sauvegardée : %s tenu par un autre processus depuis %.0f s",
+                         cfg.lock.path, CONFIG_LOCK_TIMEOUT)
+            HEALTH.save_failed()
+    metrics.SAVE_CONFIG_DURATION.observe(time.perf_counter() - t0)
+
+
+def _write_config_file(cfg: GuildStore):
+    """Écriture atomique (tmp + replace) avec backup ; à appeler sous SAVE_LOCK et le verrou du fichier."""
+    path = cfg.path
+    try:
+        # backup existing file
+        if os.path.isfile(path):
+            bname = f"{path}.bak-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
             try:
-                with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                    json.dump(cfg, f, ensure_ascii=False, indent=2)
+                shutil.copy2(path, bname)
+                logger.debug("Backup config créé: %s", bname)
             except Exception:
-                logger.exception("Échec d'écriture simple du fichier de config.")
-
-
-def get_gcfg(cfg, guild_id):
-    gid = str(guild_id)
-    if gid not in cfg:
-        cfg[gid] = {
-            "support_channel_id": None,
-            "staff_role_ids": [],   # <-- nouvelle clé: liste d'IDs de rôles "staff"
-            "allow_owner_close": False,
-            "categories": [
-                {
-                    "label": "Gestion Staff",
-                    "description": "Candidature, rôles ou rank up",
-                    "emoji": "🔰",
-                    "notify_role_id": None,
-                    "close_role_ids": []
-                },
-                {
-                    "label": "Partenariat",
-                    "description": "Demande de partenariat",
-                    "emoji": "🤝",
-                    "notify_role_id": None,
-                    "close_role_ids": []
-                },
-                {
-                    "label": "Autre",
-                    "description": "Autre demande",
-                    "emoji": "❓",
-                    "notify_role_id": None,
-                    "close_role_ids": []
-                },
-            ],
-            # mapping str(channel.id) -> { channel_id, channel_name, owner_id, claimed_by, category, message_id }
-            "open_tickets": {}
-        }
-    # ensure keys exist even after upgrade
-    g = cfg[gid]
-    g.setdefault("staff_role_ids", [])
-    g.setdefault("allow_owner_close", False)
-    g.setdefault("categories", [])
-    g.setdefault("open_tickets", {})
-    return cfg[gid]
+                logger.exception("Impossible de créer la sauvegarde %s", bname)
+
+        # write to temp file then replace
+        dirpath = os.path.dirname(os.path.abspath(path)) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix="tmp_config_", suffix=".json", dir=dirpath)
+        try:
+            with os.fdopen(fd, "wb") as tmpf:
+                offsets = cfg.write_to(tmpf)
+                written = tmpf.tell()
+            os.replace(tmp_path, path)
+            cfg.saved(offsets)
+            metrics.SAVE_CONFIG_BYTES.inc(written)
+            metrics.SAVE_CONFIG_LAST_BYTES.set(written)
+            HEALTH.save_succeeded()
+            logger.debug("Config sauvegardée atomiquement dans %s", path)
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+    except Exception:
+        logger.exception("Échec de la sauvegarde de la config (atomique + backup). Tentative d'écriture simple.")
+        try:
+            # en mémoire d'abord : write_to relit les guildes non chargées dans le fichier à remplacer
+            buf = io.BytesIO()
+            offsets = cfg.write_to(buf)
+            with open(path, "wb") as f:
+                f.write(buf.getvalue())
+            cfg.saved(offsets)
+            HEALTH.save_succeeded()
+        except Exception:
+            logger.exception("Échec d'écriture simple du fichier de config.")
+            HEALTH.save_failed()
+
+
+def get_gcfg(cfg, guild_id: int) -> GuildConfig:
+    """
+    Config de la guilde. La config est migrée et validée une fois au chargement (config_model) :
+    l'accès ne modifie rien, sauf pour créer celle d'une guilde inconnue (catégories par défaut partagées).
+    """
+    g = cfg.get(guild_id)
+    if g is None:
+        g = cfg[guild_id] = GuildConfig.new()
+    return g
+
+
+def rejoin_gcfg(cfg: GuildStore, guild_id: int, archived=None) -> GuildConfig:
+    """
+    Config d'une guilde où le bot est présent : restaurée depuis l'archive si elle y est,
+    départ éventuel (left_at) effacé. `archived` : IDs archivés, pour éviter de relister le dossier.
+    """
+    if guild_id not in cfg and (archived is None or guild_id in archived):
+        try:
+            cfg.rehydrate(guild_id)
+        except Exception:
+            logger.exception("Impossible de restaurer la config archivée de la guilde %s", guild_id)
+    g = get_gcfg(cfg, guild_id)
+    if g.left_at:
+        logger.info("Le bot est de retour dans la guilde %s (partie le %s)", guild_id, g.left_at)
+        g.left_at = None
+    return g
+
+
+async def compact_config(cfg: GuildStore, days: int) -> dict:
+    """Archive les guildes quittées depuis plus de `days` jours, puis sauvegarde la config."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    result = cfg.compact(cutoff)
+    if result["guilds"]:
+        await save_config(cfg)
+        logger.info("Config compactée : %d guildes archivées, %d octets retirés", result["guilds"], result["bytes"])
+    return result
+
+
+async def sweep_departed_guilds():
+    """
+    Après on_ready : les guildes de la config où le bot n'est plus (retiré pendant qu'il était
+    hors ligne) sont marquées comme quittées, puis l'archivage tourne une fois par jour.
+    """
+    present = {g.id for g in bot.guilds}
+    now = datetime.now(timezone.utc).isoformat()
+    marked = 0
+    for i, gid in enumerate(list(GCFG.keys())):
+        if gid not in present and GCFG.mark_left(gid, now):
+            marked += 1
+        if i % 500 == 499:
+            await asyncio.sleep(0)
+    if marked:
+        logger.info("%d guildes quittées pendant que le bot était hors ligne", marked)
+        await save_config(GCFG)
+    while True:
+        try:
+            await compact_config(GCFG, ARCHIVE_AFTER_DAYS)
+        except Exception:
+            logger.exception("Erreur lors de l'archivage des guildes quittées")
+        await asyncio.sleep(24 * 3600)
 
 
 # load once at startup (synchronous)
@@ -158,6 +302,29 @@ async def get_or_create_log_channel(guild: discord.Guild):
         return None
 
 
+# file de logs groupés par guilde (jusqu'à 10 embeds par message)
+LOG_QUEUE = GuildLogQueue(
+    get_or_create_log_channel,
+    batch_size=LOG_BATCH_SIZE,
+    flush_delay=LOG_FLUSH_DELAY,
+    max_pending=LOG_QUEUE_MAX,
+)
+
+
+HEALTH.register_queue("ticket_logs", LOG_QUEUE.depth)
+metrics.LOG_EMBEDS_DROPPED.set_function(LOG_QUEUE.dropped)
+
+
+async def send_log_embed(guild: discord.Guild, embed: discord.Embed):
+    """Met l'embed en file pour le salon de log de la guilde (envoi groupé)."""
+    await LOG_QUEUE.put(guild, embed)
+
+
+def record_ticket_event(guild: discord.Guild, category: str, event: str):
+    """Compteur Prometheus: event = opened / claimed / resolved / closed."""
+    metrics.TICKET_EVENTS.inc(guild=guild.id, category=category or "inconnue", event=event)
+
+
 def build_support_embed():
     embed = discord.Embed(
         title="📩 Ouvrez un ticket !",
@@ -234,6 +401,36 @@ def set_status_in_embed(embed: discord.Embed, new_status: str):
         embed.add_field(name="\u200b", value=new_status, inline=False)
 
 
+# helper: mesure des étapes d'un handler (latence par étape, en ms)
+class StageTimer:
+    """
+    Chronomètre les étapes d'un handler. Les étapes peuvent se chevaucher
+    (asyncio.gather) : chacune a son propre départ.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.stages = {}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(stage, **{"fastsupport.handler": self.name}):
+                yield
+        finally:
+            self.stages[stage] = (time.perf_counter() - t0) * 1000.0
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000.0
+
+    def report(self):
+        for k, v in self.stages.items():
+            metrics.STAGE_LATENCY.observe(v / 1000.0, handler=self.name, stage=k)
+        details = ", ".join(f"{k}={v:.0f}ms" for k, v in self.stages.items())
+        logger.info("%s terminé en %.0f ms (%s)", self.name, self.total_ms(), details)
+
+
 # helper: suppression différée d'un message (utilisé pour supprimer les notifications après X secondes)
 async def _delete_message_later(msg: discord.Message, delay: float = 3.0):
 
@@ -246,18 +443,126 @@ async def _delete_message_later(msg: discord.Message, delay: float = 3.0):
         pass
 
 
+# ---------------- Transcripts (export avant suppression du salon) ----------------
+TRANSCRIPT_INDEX = TranscriptIndex(SEARCH_INDEX_FILE)
+ATTACHMENT_STORE = AttachmentStore(ATTACHMENT_DIR, ATTACHMENT_MAX_BYTES, concurrency=ATTACHMENT_CONCURRENCY)
+
+# tâches de fond (uploads de transcripts...) : on garde une référence jusqu'à leur fin
+BACKGROUND_TASKS = set()
+
+
+def spawn_background(coro):
+    task = asyncio.create_task(coro)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
+
+
+def ticket_header(entry: Ticket, action: str, closed_by, category_label: str = None) -> dict:
+    """Métadonnées écrites en tête du transcript."""
+    return {
+        "action": action,
+        "owner_id": entry.owner_id if entry else None,
+        "claimed_by": entry.claimed_by if entry else None,
+        "category": (entry.category if entry else None) or category_label,
+        "closed_by": closed_by.id if closed_by else None,
+        "closed_at": datetime.utcnow().isoformat(),
+    }
+
+
+async def _upload_transcript_later(guild: discord.Guild, path: str, label: str):
+    try:
+        log_channel = await get_or_create_log_channel(guild)
+        if log_channel:
+            await upload_transcript(log_channel, path, label=label)
+    except Exception:
+        logger.exception("Impossible d'envoyer le transcript %s dans le salon de log", path)
+
+
+async def keep_ticket_after_failed_export(channel: discord.TextChannel, entry: Ticket = None):
+    """Export raté : le salon est conservé (et le ticket remis dans la config) pour réessayer la fermeture."""
+    if entry is not None:
+        get_gcfg(GCFG, channel.guild.id).open_tickets.setdefault(channel.id, entry)
+        try:
+            await save_config(GCFG)
+        except Exception:
+            logger.exception("Impossible de remettre le ticket %s dans la config", channel.id)
+    try:
+        await channel.send("⚠️ Le transcript n'a pas pu être exporté : le salon est conservé. "
+                           "Réessaie de fermer le ticket dans quelques instants.")
+    except Exception:
+        logger.exception("Impossible de prévenir le salon %s de l'échec de l'export", channel.id)
+    try:
+        embed = discord.Embed(
+            title="⚠️ Export du transcript impossible",
+            description=f"**Salon :** {channel.mention}\nLe salon n'a pas été supprimé : la fermeture peut être relancée.",
+            color=discord.Color.orange()
+        )
+        await send_log_embed(channel.guild, embed)
+    except Exception:
+        logger.exception("Impossible d'envoyer l'embed d'échec d'export")
+
+
+async def archive_and_delete_ticket(channel: discord.TextChannel, header: dict, entry: Ticket = None):
+    """
+    Exporte le transcript du salon (avant sa suppression), supprime le salon, puis
+    envoie éventuellement le transcript dans le salon de log en tâche de fond.
+    Si l'export échoue, le salon n'est pas supprimé (cf. keep_ticket_after_failed_export).
+    Appelé après l'accusé de réception à l'utilisateur.
+    """
+    path = None
+    if TRANSCRIPTS_ENABLED:
+        try:
+            with tracing.span("transcript_export", **{"discord.channel_id": channel.id}):
+                path = await export_transcript(channel, TRANSCRIPT_DIR, header, index=TRANSCRIPT_INDEX, attachments=ATTACHMENT_STORE)
+        except Exception:
+            logger.exception("Impossible d'exporter le transcript du salon %s : salon conservé", channel.id)
+        if path is None:
+            await keep_ticket_after_failed_export(channel, entry)
+            return
+    record_ticket_event(channel.guild, header.get("category"), "resolved" if header.get("action") == "resolve" else "closed")
+    try:
+        with tracing.span("channel_delete"):
+            await channel.delete()
+    except Exception:
+        logger.exception("Impossible de supprimer le channel %s", channel.name)
+    if path and TRANSCRIPT_UPLOAD:
+        spawn_background(_upload_transcript_later(channel.guild, path, channel.name))
+
+
+# ---------------- Ticket déjà ouvert ? ----------------
+def find_user_open_ticket(guild: discord.Guild, open_tickets: dict, member_id: int):
+    """
+    Cherche un ticket ouvert par `member_id` dans `open_tickets` (quelle que soit la catégorie).
+    Retourne (salon existant ou None, dirty). Les entrées orphelines (salon supprimé)
+    rencontrées sont retirées de `open_tickets` : dirty indique qu'il faut sauvegarder.
+    """
+    dirty = False
+    # iterate over a static list to allow deletion while iterating
+    for k, v in list(open_tickets.items()):
+        if v.owner_id == member_id:
+            # retrouver le channel pour mention
+            existing_channel = guild.get_channel(v.channel_id)
+
+            # si le salon existe -> bloquer la création
+            if existing_channel:
+                return existing_channel, dirty
+
+            # si le salon n'existe plus -> nettoyage automatique (sauvegardé avec le nouveau ticket)
+            del open_tickets[k]
+            dirty = True
+            logger.info("Nettoyage auto: ticket orphelin supprimé pour user %s (clé %s)", member_id, k)
+    return None, dirty
+
+
 # ---------------- Permission helpers (nouveau) ----------------
 def _member_has_any_role_id(member: discord.Member, role_ids):
     if not role_ids:
         return False
-    try:
-        ids = {int(x) for x in role_ids}
-    except Exception:
-        ids = set()
-    return any((r.id in ids) for r in member.roles)
+    return any((r.id in role_ids) for r in member.roles)
 
 
-def user_can_manage_tickets(member: discord.Member, guild: discord.Guild, guild_cfg: dict, category_label: str = None, ticket_entry: dict = None) -> bool:
+def user_can_manage_tickets(member: discord.Member, guild: discord.Guild, guild_cfg: GuildConfig, category_label: str = None, ticket_entry: Ticket = None) -> bool:
     """
     Résout si `member` est considéré comme staff / autorisé pour les actions sur tickets.
     Ordre des checks :
@@ -283,23 +588,15 @@ def user_can_manage_tickets(member: discord.Member, guild: discord.Guild, guild_
     except Exception:
         pass
 
-    # 3) staff_role_ids configurés
-    try:
-        if _member_has_any_role_id(member, guild_cfg.get("staff_role_ids", [])):
-            return True
-    except Exception:
-        pass
+    # 3) staff_role_ids configurés (config validée au chargement : pas de try/except)
+    if _member_has_any_role_id(member, guild_cfg.staff_role_ids):
+        return True
 
     # 4) close_role_ids pour la catégorie
     if category_label:
-        try:
-            for c in guild_cfg.get("categories", []):
-                if c.get("label") == category_label:
-                    if _member_has_any_role_id(member, c.get("close_role_ids", []) or []):
-                        return True
-                    break
-        except Exception:
-            pass
+        c = guild_cfg.category(category_label)
+        if c is not None and _member_has_any_role_id(member, c.close_role_ids):
+            return True
 
     # 5) fallback permissions
     try:
@@ -310,13 +607,8 @@ def user_can_manage_tickets(member: discord.Member, guild: discord.Guild, guild_
         pass
 
     # 6) owner du ticket (optionnel)
-    try:
-        if ticket_entry and guild_cfg.get("allow_owner_close", False):
-            owner_id = int(ticket_entry.get("owner_id") or ticket_entry.get("owner") or -1)
-            if member.id == owner_id:
-                return True
-    except Exception:
-        pass
+    if ticket_entry and guild_cfg.allow_owner_close and member.id == ticket_entry.owner_id:
+        return True
 
     # 7) legacy fallback: role named STAFF_ROLE
     try:
@@ -335,6 +627,7 @@ class CloseTicketView(discord.ui.View):
         super().__init__(timeout=None)
 
     @discord.ui.button(label="Fermer le ticket", emoji="🔒", style=discord.ButtonStyle.danger, custom_id="fastsupport_close_ticket")
+    @instrument("button:fastsupport_close_ticket")
     async def close(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild = interaction.guild
         channel = interaction.channel
@@ -345,55 +638,57 @@ class CloseTicketView(discord.ui.View):
             await interaction.response.send_message("⛔ Tu n'as pas la permission de fermer ce ticket.", ephemeral=True)
             return
 
-        log_channel = await get_or_create_log_channel(guild)
-        if log_channel:
-            try:
-                embed = discord.Embed(
-                    title="📁 Ticket fermé",
-                    description=f"**Salon :** {channel.name}\n**Fermé par :** {interaction.user.mention}\n**Heure :** {datetime.utcnow().isoformat()} UTC",
-                    color=discord.Color.red()
-                )
-                await log_channel.send(embed=embed)
-            except Exception:
-                logger.exception("Impossible d'envoyer l'embed de log de fermeture")
-
-        # cleanup persisted open_tickets (maintenant clé = str(channel.id))
+        # cleanup persisted open_tickets (clé = channel.id)
         gcfg = get_gcfg(GCFG, guild.id)
-        key = str(channel.id)
-        if key in gcfg.get("open_tickets", {}):
+        entry = gcfg.open_tickets.pop(channel.id, None)
+        if entry is not None:
             try:
-                del gcfg["open_tickets"][key]
                 await save_config(GCFG)
             except Exception:
-                logger.exception("Erreur lors du cleanup open_tickets pour %s", key)
+                logger.exception("Erreur lors du cleanup open_tickets pour %s", channel.id)
 
         await interaction.response.send_message("🔒 Ticket fermé.", ephemeral=True)
+        # log après l'accusé de réception : put() peut attendre (backpressure) jusqu'à put_timeout
         try:
-            await channel.delete()
+            embed = discord.Embed(
+                title="📁 Ticket fermé",
+                description=f"**Salon :** {channel.name}\n**Fermé par :** {interaction.user.mention}\n**Heure :** {datetime.utcnow().isoformat()} UTC",
+                color=discord.Color.red()
+            )
+            await send_log_embed(guild, embed)
         except Exception:
-            logger.exception("Impossible de supprimer le channel %s", channel.name)
+            logger.exception("Impossible d'envoyer l'embed de log de fermeture")
+        topic_category = channel.topic.split("ticket_category:", 1)[1] if (isinstance(channel.topic, str) and channel.topic.startswith("ticket_category:")) else None
+        await archive_and_delete_ticket(channel, ticket_header(entry, "close", interaction.user, topic_category), entry)
 
 
 # ---------------- Ticket actions view (per-message) ----------------
 class TicketActionsView(discord.ui.View):
-    def __init__(self, guild_cfg, category_label, ticket_owner_member, channel_id):
+    def __init__(self, guild_cfg, category_label, ticket_owner_member, channel_id, owner_id: int = None):
         super().__init__(timeout=None)
-        self.guild_cfg = guild_cfg                # dict for that guild (from GCFG)
+        self.guild_cfg = guild_cfg                # GuildConfig (from GCFG)
         self.category_label = category_label
         self.ticket_owner = ticket_owner_member   # discord.Member (can be None if left)
         self.channel_id = channel_id              # int channel id used as key in open_tickets
+        # vue enregistrée avant la connexion : membres pas encore en cache, propriétaire résolu à l'usage
+        self.owner_id = owner_id or (ticket_owner_member.id if ticket_owner_member else None)
+
+    def owner_for(self, guild):
+        if self.ticket_owner is None and self.owner_id:
+            self.ticket_owner = guild.get_member(self.owner_id)
+        return self.ticket_owner
 
     @discord.ui.button(label="Prendre en charge", style=discord.ButtonStyle.secondary, custom_id="fastsupport_claim")
+    @instrument("button:fastsupport_claim")
     async def claim(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild = interaction.guild
         gcfg = get_gcfg(GCFG, guild.id)
-        ot = gcfg.setdefault("open_tickets", {})
-        entry = ot.get(str(self.channel_id))
+        entry = gcfg.open_tickets.get(self.channel_id)
         if not entry:
             await interaction.response.send_message("ℹ️ Impossible de retrouver l'état du ticket (peut-être redémarré).", ephemeral=True)
             return
-        if entry.get("claimed_by"):
-            claimed_member = guild.get_member(int(entry["claimed_by"]))
+        if entry.claimed_by:
+            claimed_member = guild.get_member(entry.claimed_by)
             await interaction.response.send_message(f"🛑 Ce ticket est déjà pris en charge par {claimed_member.mention if claimed_member else 'quelqu’un'}.", ephemeral=True)
             return
 
@@ -402,7 +697,8 @@ class TicketActionsView(discord.ui.View):
             await interaction.response.send_message("⛔ Tu n'as pas la permission de prendre en charge ce ticket.", ephemeral=True)
             return
 
-        entry["claimed_by"] = interaction.user.id
+        entry.claimed_by = interaction.user.id
+        record_ticket_event(guild, self.category_label, "claimed")
         try:
             await save_config(GCFG)
         except Exception:
@@ -415,14 +711,11 @@ class TicketActionsView(discord.ui.View):
 
                 # récupérer la mention du rôle notify si configuré (on conserve la description d'ouverture intacte)
                 notify_mention = ""
-                for c in self.guild_cfg.get("categories", []):
-                    if c.get("label") == self.category_label:
-                        nid = c.get("notify_role_id")
-                        if nid:
-                            role = guild.get_role(int(nid))
-                            if role:
-                                notify_mention = role.mention + "\n"
-                        break
+                c = self.guild_cfg.category(self.category_label)
+                if c is not None and c.notify_role_id:
+                    role = guild.get_role(c.notify_role_id)
+                    if role:
+                        notify_mention = role.mention + "\n"
 
                 new_status = f"• Le ticket a été pris en charge par {interaction.user.mention} !"
                 set_status_in_embed(embed, new_status)
@@ -435,7 +728,8 @@ class TicketActionsView(discord.ui.View):
 
             # notifier le propriétaire dans le channel
             try:
-                owner_mention = self.ticket_owner.mention if self.ticket_owner else 'Utilisateur'
+                owner = self.owner_for(guild)
+                owner_mention = owner.mention if owner else 'Utilisateur'
                 notify_embed = discord.Embed(description=f"{owner_mention}, Votre ticket a été pris en charge par {interaction.user.mention} !", color=discord.Color.green())
                 await interaction.channel.send(embed=notify_embed)
             except Exception:
@@ -447,96 +741,82 @@ class TicketActionsView(discord.ui.View):
             await interaction.response.send_message("❌ Impossible de mettre à jour le message.", ephemeral=True)
 
     @discord.ui.button(label="Résoudre", style=discord.ButtonStyle.primary, custom_id="fastsupport_resolve")
+    @instrument("button:fastsupport_resolve")
     async def resolve(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild = interaction.guild
         channel = interaction.channel
         gcfg = get_gcfg(GCFG, guild.id)
 
-        ot = gcfg.get("open_tickets", {})
-        entry = ot.get(str(self.channel_id))
+        entry = gcfg.open_tickets.get(self.channel_id)
 
         # centralize permission check
         if not user_can_manage_tickets(interaction.user, guild, gcfg, category_label=self.category_label, ticket_entry=entry):
             await interaction.response.send_message("⛔ Tu n'as pas l'autorisation pour résoudre ce ticket.", ephemeral=True)
             return
 
-        # log
-        log_channel = await get_or_create_log_channel(guild)
-        if log_channel:
-            try:
-                embed = discord.Embed(
-                    title="📁 Ticket résolu",
-                    description=(
-                        f"**Salon :** {channel.name}\n**Résolu par :** {interaction.user.mention}\n"
-                        f"**Utilisateur :** {self.ticket_owner.mention if self.ticket_owner else 'inconnu'}\n"
-                        f"**Catégorie :** {self.category_label}\n**Heure :** {datetime.utcnow().isoformat()} UTC"
-                    ),
-                    color=discord.Color.blue()
-                )
-                await log_channel.send(embed=embed)
-            except Exception:
-                logger.exception("Impossible d'envoyer l'embed de log de résolution")
-
-        # cleanup persisted open_tickets (clé = str(channel.id))
+        # cleanup persisted open_tickets (clé = channel.id)
         try:
-            key = str(channel.id)
-            if key in gcfg.get("open_tickets", {}):
-                del gcfg["open_tickets"][key]
+            if gcfg.open_tickets.pop(channel.id, None) is not None:
                 await save_config(GCFG)
         except Exception:
             logger.exception("Erreur lors du cleanup open_tickets pour resolve")
 
         await interaction.response.send_message("✅ Ticket résolu — fermeture du salon.", ephemeral=True)
+        # log après l'accusé de réception : put() peut attendre (backpressure) jusqu'à put_timeout
         try:
-            await channel.delete()
+            owner = self.owner_for(guild)
+            embed = discord.Embed(
+                title="📁 Ticket résolu",
+                description=(
+                    f"**Salon :** {channel.name}\n**Résolu par :** {interaction.user.mention}\n"
+                    f"**Utilisateur :** {owner.mention if owner else 'inconnu'}\n"
+                    f"**Catégorie :** {self.category_label}\n**Heure :** {datetime.utcnow().isoformat()} UTC"
+                ),
+                color=discord.Color.blue()
+            )
+            await send_log_embed(guild, embed)
         except Exception:
-            logger.exception("Impossible de supprimer le channel lors d'une résolution")
+            logger.exception("Impossible d'envoyer l'embed de log de résolution")
+        await archive_and_delete_ticket(channel, ticket_header(entry, "resolve", interaction.user, self.category_label), entry)
 
     @discord.ui.button(label="Fermer le ticket", style=discord.ButtonStyle.danger, custom_id="fastsupport_close_actions")
+    @instrument("button:fastsupport_close_actions")
     async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild = interaction.guild
         channel = interaction.channel
         gcfg = get_gcfg(GCFG, guild.id)
 
-        ot = gcfg.get("open_tickets", {})
-        entry = ot.get(str(self.channel_id))
+        entry = gcfg.open_tickets.get(self.channel_id)
 
         # centralize permission check
         if not user_can_manage_tickets(interaction.user, guild, gcfg, category_label=self.category_label, ticket_entry=entry):
             await interaction.response.send_message("⛔ Tu n'as pas la permission pour fermer ce ticket.", ephemeral=True)
             return
 
-        # log fermeture
-        log_channel = await get_or_create_log_channel(guild)
-        if log_channel:
-            try:
-                embed = discord.Embed(
-                    title="📁 Ticket fermé",
-                    description=(
-                        f"**Salon :** {channel.name}\n**Fermé par :** {interaction.user.mention}\n"
-                        f"**Utilisateur :** {self.ticket_owner.mention if self.ticket_owner else 'inconnu'}\n"
-                        f"**Catégorie :** {self.category_label}\n**Heure :** {datetime.utcnow().isoformat()} UTC"
-                    ),
-                    color=discord.Color.red()
-                )
-                await log_channel.send(embed=embed)
-            except Exception:
-                logger.exception("Impossible d'envoyer l'embed de log de fermeture (action)")
-
         # cleanup persisted open_tickets
         try:
-            key = str(channel.id)
-            if key in gcfg.get("open_tickets", {}):
-                del gcfg["open_tickets"][key]
+            if gcfg.open_tickets.pop(channel.id, None) is not None:
                 await save_config(GCFG)
         except Exception:
             logger.exception("Erreur lors du cleanup open_tickets pour close action")
 
         await interaction.response.send_message("🔒 Ticket fermé — fermeture du salon.", ephemeral=True)
+        # log après l'accusé de réception : put() peut attendre (backpressure) jusqu'à put_timeout
         try:
-            await channel.delete()
+            owner = self.owner_for(guild)
+            embed = discord.Embed(
+                title="📁 Ticket fermé",
+                description=(
+                    f"**Salon :** {channel.name}\n**Fermé par :** {interaction.user.mention}\n"
+                    f"**Utilisateur :** {owner.mention if owner else 'inconnu'}\n"
+                    f"**Catégorie :** {self.category_label}\n**Heure :** {datetime.utcnow().isoformat()} UTC"
+                ),
+                color=discord.Color.red()
+            )
+            await send_log_embed(guild, embed)
         except Exception:
-            logger.exception("Impossible de supprimer le channel lors d'une fermeture (action)")
+            logger.exception("Impossible d'envoyer l'embed de log de fermeture (action)")
+        await archive_and_delete_ticket(channel, ticket_header(entry, "close", interaction.user, self.category_label), entry)
 
 
 # ---------------- Dynamic TicketSelect & View (per guild) ----------------
@@ -544,22 +824,29 @@ class TicketSelect(discord.ui.Select):
     def __init__(self, guild_id: int, categories: list):
         opts = []
         for c in categories:
-            emoji_val = c.get("emoji")
+            emoji_val = c.emoji
             emoji_param = emoji_val if emoji_val and emoji_val.strip() and emoji_val != " " else None
             opts.append(discord.SelectOption(
-                label=c.get("label", "Autre")[:100],
-                description=c.get("description", "")[:100],
+                label=c.label[:100],
+                description=c.description[:100],
                 emoji=emoji_param
             ))
         super().__init__(placeholder="🎫 Choisis le type de ticket",
                          min_values=1, max_values=1, options=opts,
                          custom_id=f"fastsupport_ticket_select_{guild_id}")
 
+    @instrument("select:ticket_open")
     async def callback(self, interaction: discord.Interaction):
         guild = interaction.guild
         member = interaction.user
         choice = self.values[0]
 
+        # arrêt en cours : un ticket ouvert maintenant risquerait d'être coupé en plein milieu
+        if SHUTTING_DOWN:
+            await interaction.response.send_message(
+                "⏳ Le bot redémarre : réessaie d'ouvrir ton ticket dans quelques secondes.", ephemeral=True)
+            return
+
         cfg = get_gcfg(GCFG, guild.id)
 
         # require bot admin (you chose administrator earlier)
@@ -571,55 +858,31 @@ class TicketSelect(discord.ui.Select):
             )
             return
 
+        # accusé de réception immédiat : tout le reste passe par interaction.followup
+        timer = StageTimer("ticket_open")
+        with timer.stage("defer"):
+            await interaction.response.defer(ephemeral=True, thinking=True)
+
         # retrouver la configuration de la catégorie choisie
-        cat_cfg = None
-        for c in cfg.get("categories", []):
-            if c.get("label") == choice:
-                cat_cfg = c
-                break
+        cat_cfg = cfg.category(choice)
+
+        # --- sécurité: empêcher la création de 2 tickets par utilisateur (quelles que soient les catégories) ---
+        existing_channel, dirty = find_user_open_ticket(guild, cfg.open_tickets, member.id)
+        if existing_channel:
+            await interaction.followup.send(f"⚠️ Tu as déjà un ticket ouvert : {existing_channel.mention}", ephemeral=True)
+            if dirty:
+                await save_config(GCFG)
+            return
 
         category = discord.utils.get(guild.categories, name=TICKET_CATEGORY_NAME)
         if not category:
             try:
-                category = await guild.create_category(TICKET_CATEGORY_NAME)
+                with timer.stage("category_create"):
+                    category = await guild.create_category(TICKET_CATEGORY_NAME)
             except Exception:
                 logger.exception("Impossible de créer la catégorie %s", TICKET_CATEGORY_NAME)
                 category = None
 
-        # --- sécurité: empêcher la création de 2 tickets par utilisateur (quelles que soient les catégories) ---
-        ot = cfg.get("open_tickets", {}) or {}
-
-        # iterate over a static list to allow deletion while iterating
-        for k, v in list(ot.items()):
-            try:
-                if int(v.get("owner_id", -1)) == int(member.id):
-                    # retrouver le channel pour mention
-                    existing_channel = None
-                    cid = v.get("channel_id")
-                    if cid:
-                        existing_channel = guild.get_channel(int(cid))
-                    # fallback: essayer par channel_name si présent
-                    if not existing_channel and v.get("channel_name"):
-                        existing_channel = discord.utils.get(guild.text_channels, name=v.get("channel_name"))
-
-                    # si le salon existe -> bloquer la création
-                    if existing_channel:
-                        await interaction.response.send_message(f"⚠️ Tu as déjà un ticket ouvert : {existing_channel.mention}", ephemeral=True)
-                        return
-
-                    # si le salon n'existe plus -> nettoyage automatique (on supprime l'entrée et on continue)
-                    else:
-                        try:
-                            del ot[k]
-                            await save_config(GCFG)
-                            logger.info("Nettoyage auto: ticket orphelin supprimé pour user %s (clé %s)", member.id, k)
-                        except Exception:
-                            logger.exception("Erreur lors du nettoyage auto d'un ticket orphelin (clé %s)", k)
-                        # continue loop to check if other entries exist
-            except Exception:
-                logger.exception("Erreur lors de la vérification des tickets ouverts pour l'utilisateur %s", member.id)
-                continue
-
         # --- construction du nom voulu : "categorie-username" ---
         category_slug = slugify(choice)        # ex: 'partenariat'
         user_slug = slugify(member.name)      # utiliser le username (member.name)
@@ -628,7 +891,9 @@ class TicketSelect(discord.ui.Select):
         if category:
             for ch in category.text_channels:
                 if ch.name == base_channel_name:
-                    await interaction.response.send_message(f"⚠️ Tu as déjà un ticket ouvert : {ch.mention}", ephemeral=True)
+                    await interaction.followup.send(f"⚠️ Tu as déjà un ticket ouvert : {ch.mention}", ephemeral=True)
+                    if dirty:
+                        await save_config(GCFG)
                     return
 
         # overwrites
@@ -640,18 +905,15 @@ class TicketSelect(discord.ui.Select):
 
         # if category has close roles, give those roles access
         if cat_cfg:
-            for rid in cat_cfg.get("close_role_ids", []) or []:
-                try:
-                    role = guild.get_role(int(rid))
-                except Exception:
-                    role = None
+            for rid in cat_cfg.close_role_ids:
+                role = guild.get_role(rid)
                 if role:
                     overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
 
         # staff roles from config
         try:
-            for rid in cfg.get("staff_role_ids", []) or []:
-                role = guild.get_role(int(rid))
+            for rid in cfg.staff_role_ids:
+                role = guild.get_role(rid)
                 if role:
                     overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
         except Exception:
@@ -672,15 +934,31 @@ class TicketSelect(discord.ui.Select):
             kwargs["category"] = category
 
         try:
-            channel = await guild.create_text_channel(**kwargs)
+            with timer.stage("channel_create"):
+                channel = await guild.create_text_channel(**kwargs)
         except discord.Forbidden:
-            await interaction.response.send_message("❌ Je n'ai pas la permission de créer le salon. Vérifiez mes permissions.", ephemeral=True)
+            await interaction.followup.send("❌ Je n'ai pas la permission de créer le salon. Vérifiez mes permissions.", ephemeral=True)
             return
         except Exception:
             logger.exception("Erreur lors de la création du channel de ticket")
-            await interaction.response.send_message("❌ Erreur lors de la création du ticket.", ephemeral=True)
+            await interaction.followup.send("❌ Erreur lors de la création du ticket.", ephemeral=True)
             return
 
+        # le log ne dépend que du salon : on le lance en parallèle du message initial
+        async def post_open_log():
+            with timer.stage("log"):
+                try:
+                    log_embed = discord.Embed(
+                        title="📂 Ticket ouvert",
+                        description=f"**Utilisateur :** {member.mention}\n**Salon :** {channel.mention}\n**Catégorie :** {choice}\n**Heure :** {datetime.utcnow().isoformat()} UTC",
+                        color=discord.Color.green()
+                    )
+                    await send_log_embed(guild, log_embed)
+                except Exception:
+                    logger.exception("Impossible d'envoyer l'embed de log d'ouverture")
+
+        log_task = asyncio.create_task(post_open_log())
+
         # --- Build embed with separator between open line and status (no footer) ---
         embed = discord.Embed(
             title=choice,  # Always the category name (no mention inside embed)
@@ -705,44 +983,41 @@ class TicketSelect(discord.ui.Select):
         try:
             # content: ping user and optionally notify role mention before embed (keeps same behavior)
             notify_role = None
-            if cat_cfg and cat_cfg.get("notify_role_id"):
-                notify_role = guild.get_role(int(cat_cfg["notify_role_id"]))
+            if cat_cfg and cat_cfg.notify_role_id:
+                notify_role = guild.get_role(cat_cfg.notify_role_id)
             content = member.mention if not notify_role else f"{notify_role.mention} {member.mention}"
-            msg = await channel.send(content=content, embed=embed, view=view)
+            with timer.stage("initial_send"):
+                msg = await channel.send(content=content, embed=embed, view=view)
         except Exception:
             logger.exception("Impossible d'envoyer le message initial dans le salon du ticket")
-            await interaction.response.send_message("❌ Impossible d'envoyer le message initial dans le salon du ticket.", ephemeral=True)
+            await interaction.followup.send("❌ Impossible d'envoyer le message initial dans le salon du ticket.", ephemeral=True)
+            await log_task
+            if dirty:
+                await save_config(GCFG)
             return
 
-        # persist ticket state (owner, claimed_by, category, message_id) -- clé = str(channel.id)
+        # persist ticket state (owner, claimed_by, category, message_id) -- clé = channel.id
         gcfg = get_gcfg(GCFG, guild.id)
-        ot = gcfg.setdefault("open_tickets", {})
-        ot[str(channel.id)] = {
-            "channel_id": int(channel.id),
-            "channel_name": channel.name,
-            "owner_id": int(member.id),
-            "claimed_by": None,
-            "category": choice,
-            "message_id": int(msg.id)
-        }
-        try:
-            await save_config(GCFG)
-        except Exception:
-            logger.exception("Erreur lors de la sauvegarde open_tickets après création de ticket")
+        gcfg.open_tickets[channel.id] = Ticket(channel.id, owner_id=member.id, category=choice, message_id=msg.id)
+        record_ticket_event(guild, choice, "opened")
 
-        log_channel = await get_or_create_log_channel(guild)
-        if log_channel:
+        async def persist():
             try:
-                log_embed = discord.Embed(
-                    title="📂 Ticket ouvert",
-                    description=f"**Utilisateur :** {member.mention}\n**Salon :** {channel.mention}\n**Catégorie :** {choice}\n**Heure :** {datetime.utcnow().isoformat()} UTC",
-                    color=discord.Color.green()
-                )
-                await log_channel.send(embed=log_embed)
+                with timer.stage("save_config"):
+                    await save_config(GCFG)
             except Exception:
-                logger.exception("Impossible d'envoyer l'embed de log d'ouverture")
+                logger.exception("Erreur lors de la sauvegarde open_tickets après création de ticket")
+
+        async def reply():
+            with timer.stage("followup"):
+                await interaction.followup.send(f"✅ Ticket créé : {channel.mention}", ephemeral=True)
 
-        await interaction.response.send_message(f"✅ Ticket créé : {channel.mention}", ephemeral=True)
+        # persistance, log et réponse sont indépendants une fois le salon créé
+        results = await asyncio.gather(persist(), reply(), log_task, return_exceptions=True)
+        for r in results:
+            if isinstance(r, BaseException):
+                logger.error("Étape en échec lors de l'ouverture du ticket %s", channel.id, exc_info=r)
+        timer.report()
 
 
 class TicketView(discord.ui.View):
@@ -755,11 +1030,8 @@ class TicketView(discord.ui.View):
 async def ensure_support_message(guild: discord.Guild):
     cfg = get_gcfg(GCFG, guild.id)
     ch = None
-    if cfg.get("support_channel_id"):
-        try:
-            ch = guild.get_channel(int(cfg["support_channel_id"]))
-        except Exception:
-            ch = None
+    if cfg.support_channel_id:
+        ch = guild.get_channel(cfg.support_channel_id)
     if not ch:
         ch = discord.utils.get(guild.text_channels, name=DEFAULT_SUPPORT_CHANNEL_NAME)
     if not ch:
@@ -773,9 +1045,8 @@ async def ensure_support_message(guild: discord.Guild):
     except Exception:
         logger.exception("Erreur en parcourant l'historique pour ensure_support_message")
 
-    categories = cfg.get("categories", [])
     try:
-        await ch.send(embed=build_support_embed(), view=TicketView(guild.id, categories))
+        await ch.send(embed=build_support_embed(), view=TicketView(guild.id, cfg.categories))
     except Exception:
         logger.exception("Impossible d'envoyer le message de support automatiquement")
 
@@ -787,52 +1058,50 @@ def is_admin(interaction: discord.Interaction):
 
 @bot.tree.command(name="set-channel", description="Définir le salon où poster le message support")
 @app_commands.describe(channel="Salon où le message support sera envoyé automatiquement")
+@instrument("/set-channel")
 async def set_channel(interaction: discord.Interaction, channel: discord.TextChannel):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    cfg["support_channel_id"] = int(channel.id)
+    cfg.support_channel_id = channel.id
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
     await interaction.response.send_message(f"✅ Salon support défini sur {channel.mention}", ephemeral=True)
 
 
 @bot.tree.command(name="add-category", description="Ajouter une catégorie de ticket")
 @app_commands.describe(label="Titre de la catégorie", description="Courte description", emoji="Emoji optionnel (ex: 🔔)")
+@instrument("/add-category")
 async def add_category(interaction: discord.Interaction, label: str, description: str, emoji: str = None):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    if any(c["label"].lower() == label.lower() for c in cfg.get("categories", [])):
+    if cfg.find_category(label)[1] is not None:
         await interaction.response.send_message("⚠️ Une catégorie avec ce nom existe déjà.", ephemeral=True)
         return
     stored_emoji = emoji if (emoji and emoji.strip()) else " "
-    cfg.setdefault("categories", []).append({
-        "label": label,
-        "description": description,
-        "emoji": stored_emoji,
-        "notify_role_id": None,
-        "close_role_ids": []
-    })
+    cfg.own_categories().append(Category(label, description, stored_emoji))
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
     await interaction.response.send_message(f"✅ Catégorie ajoutée : **{label}**", ephemeral=True)
 
 
 @bot.tree.command(name="remove-category", description="Supprimer une catégorie (par son titre)")
 @app_commands.describe(label="Titre de la catégorie à supprimer")
+@instrument("/remove-category")
 async def remove_category(interaction: discord.Interaction, label: str):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    before = len(cfg.get("categories", []))
-    cfg["categories"] = [c for c in cfg.get("categories", []) if c["label"].lower() != label.lower()]
-    after = len(cfg["categories"])
+    before = len(cfg.categories)
+    if cfg.find_category(label)[1] is not None:
+        cfg.categories = [c for c in cfg.own_categories() if c.label.lower() != label.lower()]
+    after = len(cfg.categories)
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
     if before == after:
         await interaction.response.send_message("⚠️ Aucune catégorie trouvée avec ce titre.", ephemeral=True)
     else:
@@ -840,42 +1109,44 @@ async def remove_category(interaction: discord.Interaction, label: str):
 
 
 @bot.tree.command(name="list-categories", description="Afficher les catégories configurées")
+@instrument("/list-categories")
 async def list_categories(interaction: discord.Interaction):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    categories = cfg.get("categories", [])
+    categories = cfg.categories
     if not categories:
         await interaction.response.send_message("Aucune catégorie configurée.", ephemeral=True)
         return
     def display_emoji(c):
-        e = c.get("emoji")
+        e = c.emoji
         return e if (e and e.strip() and e != " ") else ""
     text = "\n".join(
-        f"- {display_emoji(c)} **{c.get('label','???')}** — {c.get('description',' ')}"
-        f"{' (notify: '+str(c.get('notify_role_id'))+')' if c.get('notify_role_id') else ''}"
+        f"- {display_emoji(c)} **{c.label}** — {c.description or ' '}"
+        f"{' (notify: '+str(c.notify_role_id)+')' if c.notify_role_id else ''}"
         for c in categories
     )
     await interaction.response.send_message(f"**Catégories :**\n{text}", ephemeral=True)
 
 
 @bot.tree.command(name="send-embed", description="Envoyer le message support dans le salon configuré maintenant")
+@instrument("/send-embed")
 async def send_embed(interaction: discord.Interaction):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
     ch = None
-    if cfg.get("support_channel_id"):
-        ch = interaction.guild.get_channel(int(cfg["support_channel_id"]))
+    if cfg.support_channel_id:
+        ch = interaction.guild.get_channel(cfg.support_channel_id)
     if not ch:
         ch = discord.utils.get(interaction.guild.text_channels, name=DEFAULT_SUPPORT_CHANNEL_NAME)
     if not ch:
         await interaction.response.send_message("❌ Aucun salon configuré et aucun salon `support` trouvé.", ephemeral=True)
         return
     try:
-        await ch.send(embed=build_support_embed(), view=TicketView(interaction.guild.id, cfg.get("categories", [])))
+        await ch.send(embed=build_support_embed(), view=TicketView(interaction.guild.id, cfg.categories))
         await interaction.response.send_message(f"✅ Message support envoyé dans {ch.mention}", ephemeral=True)
     except Exception:
         logger.exception("Impossible d'envoyer le message (permissions?).")
@@ -885,144 +1156,141 @@ async def send_embed(interaction: discord.Interaction):
 # ---------------- New commands to manage notify/close roles ----------------
 @bot.tree.command(name="set-category-notify", description="Configurer le rôle à mentionner quand un ticket de cette catégorie est ouvert")
 @app_commands.describe(label="Titre de la catégorie", role="Rôle à mentionner (ou ne rien choisir pour enlever)")
+@instrument("/set-category-notify")
 async def set_category_notify(interaction: discord.Interaction, label: str, role: discord.Role = None):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    found = False
-    for c in cfg.get("categories", []):
-        if c.get("label").lower() == label.lower():
-            found = True
-            if role is None:
-                c["notify_role_id"] = None
-                await interaction.response.send_message(f"✅ Notification désactivée pour la catégorie **{c['label']}**.", ephemeral=True)
-            else:
-                c["notify_role_id"] = int(role.id)
-                await interaction.response.send_message(f"✅ Le rôle {role.mention} sera pingé pour la catégorie **{c['label']}**.", ephemeral=True)
-            break
-    if not found:
+    c = cfg.edit_category(label)
+    if c is not None:
+        if role is None:
+            c.notify_role_id = None
+            await interaction.response.send_message(f"✅ Notification désactivée pour la catégorie **{c.label}**.", ephemeral=True)
+        else:
+            c.notify_role_id = role.id
+            await interaction.response.send_message(f"✅ Le rôle {role.mention} sera pingé pour la catégorie **{c.label}**.", ephemeral=True)
+    else:
         await interaction.response.send_message("⚠️ Catégorie non trouvée.", ephemeral=True)
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
 
 
 @bot.tree.command(name="add-category-close-role", description="Ajouter un rôle pouvant fermer les tickets d'une catégorie")
 @app_commands.describe(label="Titre de la catégorie", role="Rôle à ajouter")
+@instrument("/add-category-close-role")
 async def add_category_close_role(interaction: discord.Interaction, label: str, role: discord.Role):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    for c in cfg.get("categories", []):
-        if c.get("label").lower() == label.lower():
-            lst = c.get("close_role_ids", []) or []
-            if int(role.id) in lst:
-                await interaction.response.send_message("⚠️ Ce rôle est déjà autorisé.", ephemeral=True)
-                return
-            lst.append(int(role.id))
-            c["close_role_ids"] = lst
-            await save_config(GCFG)
-            bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
-            await interaction.response.send_message(f"✅ {role.mention} peut maintenant fermer les tickets de **{c['label']}**.", ephemeral=True)
+    _, c = cfg.find_category(label)
+    if c is not None:
+        if role.id in c.close_role_ids:
+            await interaction.response.send_message("⚠️ Ce rôle est déjà autorisé.", ephemeral=True)
             return
+        c = cfg.edit_category(label)
+        c.close_role_ids = c.close_role_ids + (role.id,)
+        await save_config(GCFG)
+        bot.add_view(TicketView(interaction.guild.id, cfg.categories))
+        await interaction.response.send_message(f"✅ {role.mention} peut maintenant fermer les tickets de **{c.label}**.", ephemeral=True)
+        return
     await interaction.response.send_message("⚠️ Catégorie non trouvée.", ephemeral=True)
 
 
 @bot.tree.command(name="remove-category-close-role", description="Retirer un rôle autorisé à fermer les tickets d'une catégorie")
 @app_commands.describe(label="Titre de la catégorie", role="Rôle à retirer")
+@instrument("/remove-category-close-role")
 async def remove_category_close_role(interaction: discord.Interaction, label: str, role: discord.Role):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    for c in cfg.get("categories", []):
-        if c.get("label").lower() == label.lower():
-            lst = c.get("close_role_ids", []) or []
-            if int(role.id) not in lst:
-                await interaction.response.send_message("⚠️ Ce rôle n'était pas autorisé.", ephemeral=True)
-                return
-            lst = [rid for rid in lst if rid != int(role.id)]
-            c["close_role_ids"] = lst
-            await save_config(GCFG)
-            bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
-            await interaction.response.send_message(f"✅ {role.mention} ne peut plus fermer les tickets de **{c['label']}**.", ephemeral=True)
+    _, c = cfg.find_category(label)
+    if c is not None:
+        if role.id not in c.close_role_ids:
+            await interaction.response.send_message("⚠️ Ce rôle n'était pas autorisé.", ephemeral=True)
             return
+        c = cfg.edit_category(label)
+        c.close_role_ids = tuple(rid for rid in c.close_role_ids if rid != role.id)
+        await save_config(GCFG)
+        bot.add_view(TicketView(interaction.guild.id, cfg.categories))
+        await interaction.response.send_message(f"✅ {role.mention} ne peut plus fermer les tickets de **{c.label}**.", ephemeral=True)
+        return
     await interaction.response.send_message("⚠️ Catégorie non trouvée.", ephemeral=True)
 
 
 @bot.tree.command(name="show-category-roles", description="Afficher les rôles configurés pour une catégorie")
 @app_commands.describe(label="Titre de la catégorie")
+@instrument("/show-category-roles")
 async def show_category_roles(interaction: discord.Interaction, label: str):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    for c in cfg.get("categories", []):
-        if c.get("label").lower() == label.lower():
-            notify = None
-            if c.get("notify_role_id"):
-                notify = interaction.guild.get_role(int(c["notify_role_id"]))
-            close_roles = []
-            for rid in c.get("close_role_ids", []) or []:
-                r = interaction.guild.get_role(int(rid))
-                if r:
-                    close_roles.append(r.mention)
-            await interaction.response.send_message(
-                f"**{c['label']}**\nNotify: {notify.mention if notify else 'aucun'}\nClose roles: {', '.join(close_roles) if close_roles else 'aucun'}",
-                ephemeral=True
-            )
-            return
+    _, c = cfg.find_category(label)
+    if c is not None:
+        notify = None
+        if c.notify_role_id:
+            notify = interaction.guild.get_role(c.notify_role_id)
+        close_roles = []
+        for rid in c.close_role_ids:
+            r = interaction.guild.get_role(rid)
+            if r:
+                close_roles.append(r.mention)
+        await interaction.response.send_message(
+            f"**{c.label}**\nNotify: {notify.mention if notify else 'aucun'}\nClose roles: {', '.join(close_roles) if close_roles else 'aucun'}",
+            ephemeral=True
+        )
+        return
     await interaction.response.send_message("⚠️ Catégorie non trouvée.", ephemeral=True)
 
 
 # ---------------- New commands to manage staff roles (requested) ----------------
 @bot.tree.command(name="add-staff-role", description="Ajouter un rôle global 'staff' autorisé pour les actions tickets (admin only)")
 @app_commands.describe(role="Rôle à ajouter comme staff")
+@instrument("/add-staff-role")
 async def add_staff_role(interaction: discord.Interaction, role: discord.Role):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    lst = cfg.get("staff_role_ids", []) or []
-    if int(role.id) in lst:
+    if role.id in cfg.staff_role_ids:
         await interaction.response.send_message("⚠️ Ce rôle est déjà configuré comme staff.", ephemeral=True)
         return
-    lst.append(int(role.id))
-    cfg["staff_role_ids"] = lst
+    cfg.staff_role_ids = cfg.staff_role_ids + (role.id,)
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
     await interaction.response.send_message(f"✅ {role.mention} ajouté comme rôle staff pour ce bot.", ephemeral=True)
 
 
 @bot.tree.command(name="remove-staff-role", description="Retirer un rôle global 'staff' (admin only)")
 @app_commands.describe(role="Rôle à retirer des staff")
+@instrument("/remove-staff-role")
 async def remove_staff_role(interaction: discord.Interaction, role: discord.Role):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    lst = cfg.get("staff_role_ids", []) or []
-    if int(role.id) not in lst:
+    if role.id not in cfg.staff_role_ids:
         await interaction.response.send_message("⚠️ Ce rôle n'était pas configuré comme staff.", ephemeral=True)
         return
-    lst = [rid for rid in lst if rid != int(role.id)]
-    cfg["staff_role_ids"] = lst
+    cfg.staff_role_ids = tuple(rid for rid in cfg.staff_role_ids if rid != role.id)
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
     await interaction.response.send_message(f"✅ {role.mention} retiré des rôles staff pour ce bot.", ephemeral=True)
 
 
 @bot.tree.command(name="list-staff-roles", description="Lister les rôles staff configurés pour ce serveur")
+@instrument("/list-staff-roles")
 async def list_staff_roles(interaction: discord.Interaction):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    lst = cfg.get("staff_role_ids", []) or []
     mentions = []
-    for rid in lst:
-        r = interaction.guild.get_role(int(rid))
+    for rid in cfg.staff_role_ids:
+        r = interaction.guild.get_role(rid)
         if r:
             mentions.append(r.mention)
         else:
@@ -1034,82 +1302,37 @@ async def list_staff_roles(interaction: discord.Interaction):
 
 
 # ---------------- Events ----------------
-async def migrate_open_tickets_for_guild(gcfg, guild: discord.Guild):
+def resolve_legacy_tickets_for_guild(gcfg: GuildConfig, guild: discord.Guild) -> bool:
     """
-    Si des clés open_tickets sont encore des noms (ancien format), essayer de migrer
-    vers la clé str(channel.id).
+    Dernière étape de la migration de schéma, qui a besoin de la guilde chargée : les anciennes
+    entrées indexées par nom de salon passent dans open_tickets sous l'ID du salon ; celles dont
+    le salon n'existe plus sont abandonnées. Retourne True si la config a changé.
     """
-    old = gcfg.get("open_tickets", {}) or {}
-    new = {}
-    migrated = False
-    for key, data in old.items():
-        # si clé déjà numérique (id) -> garder
-        if key.isdigit():
-            new[key] = data
-            if "channel_id" not in new[key]:
-                try:
-                    new[key]["channel_id"] = int(key)
-                except Exception:
-                    pass
-            continue
-
-        # ancien format: key = channel.name
-        try:
-            channel = discord.utils.get(guild.text_channels, name=key)
-        except Exception:
-            channel = None
-
-        if channel:
-            new_key = str(channel.id)
-            new[new_key] = dict(data)
-            new[new_key]["channel_id"] = channel.id
-            new[new_key]["channel_name"] = channel.name
-            migrated = True
+    if not gcfg.legacy_tickets:
+        return False
+    for name, entry in gcfg.legacy_tickets.items():
+        channel = discord.utils.get(guild.text_channels, name=name)
+        if channel and channel.id not in gcfg.open_tickets:
+            entry.channel_id = channel.id
+            entry.channel_name = None
+            gcfg.open_tickets[channel.id] = entry
         else:
-            # on ignore les entrées orphelines (on ne peut pas retrouver le channel)
-            continue
-
-    if migrated:
-        gcfg["open_tickets"] = new
-        try:
-            await save_config(GCFG)
-        except Exception:
-            logger.exception("Erreur lors de la sauvegarde après migration open_tickets")
-    else:
-        gcfg.setdefault("open_tickets", new if new else old)
+            logger.info("Ancien ticket %s abandonné pour la guilde %s (salon introuvable)", name, guild.id)
+    gcfg.legacy_tickets = None
+    return True
 
 
-async def cleanup_orphan_tickets_for_guild(gcfg, guild: discord.Guild):
+async def cleanup_orphan_tickets_for_guild(gcfg: GuildConfig, guild: discord.Guild):
     """
     Supprime les entrées open_tickets dont le salon n'existe plus.
     Utilisé au démarrage et lors de la jointure de la guilde.
     """
-    ot = gcfg.get("open_tickets", {}) or {}
-    removed = False
-    for key in list(ot.keys()):
-        try:
-            entry = ot.get(key, {})
-            cid = entry.get("channel_id")
-            exists = False
-            if cid:
-                if guild.get_channel(int(cid)):
-                    exists = True
-            if not exists:
-                # fallback: try by channel_name
-                cname = entry.get("channel_name")
-                if cname and discord.utils.get(guild.text_channels, name=cname):
-                    exists = True
-            if not exists:
-                # remove orphan
-                try:
-                    del ot[key]
-                    removed = True
-                    logger.info("Nettoyage auto au démarrage: suppression ticket orphelin %s pour guilde %s", key, guild.id)
-                except Exception:
-                    logger.exception("Impossible de supprimer l'entrée orpheline %s", key)
-        except Exception:
-            logger.exception("Erreur pendant le nettoyage orphelin pour la clé %s", key)
-    if removed:
+    ot = gcfg.open_tickets
+    orphans = [cid for cid in ot if guild.get_channel(cid) is None]
+    for cid in orphans:
+        del ot[cid]
+        logger.info("Nettoyage auto au démarrage: suppression ticket orphelin %s pour guilde %s", cid, guild.id)
+    if orphans:
         try:
             await save_config(GCFG)
         except Exception:
@@ -1118,9 +1341,10 @@ async def cleanup_orphan_tickets_for_guild(gcfg, guild: discord.Guild):
 
 @bot.event
 async def on_guild_join(guild):
-    cfg = get_gcfg(GCFG, guild.id)
+    cfg = rejoin_gcfg(GCFG, guild.id)
+    resolve_legacy_tickets_for_guild(cfg, guild)
     await save_config(GCFG)
-    bot.add_view(TicketView(guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(guild.id, cfg.categories))
     # nettoie les tickets orphelins si besoin
     try:
         await cleanup_orphan_tickets_for_guild(cfg, guild)
@@ -1129,60 +1353,76 @@ async def on_guild_join(guild):
     await ensure_support_message(guild)
 
 
+@bot.event
+async def on_guild_remove(guild):
+    # archivée après ARCHIVE_AFTER_DAYS si le bot n'est pas réinvité d'ici là
+    if GCFG.mark_left(guild.id):
+        logger.info("Le bot a quitté la guilde %s", guild.id)
+        await save_config(GCFG)
+
+
+@bot.event
+async def on_connect():
+    HEALTH.set_connected(True)
+
+
+@bot.event
+async def on_resumed():
+    HEALTH.set_connected(True)
+
+
+@bot.event
+async def on_disconnect():
+    HEALTH.set_connected(False)
+
+
 @bot.event
 async def on_ready():
-    bot.add_view(CloseTicketView())
+    HEALTH.set_connected(True)
+    HEALTH.begin_restore(len(bot.guilds))
+    archived = GCFG.archived_ids()
     for guild in bot.guilds:
-        cfg = get_gcfg(GCFG, guild.id)
-        # register ticket selector view
-        bot.add_view(TicketView(guild.id, cfg.get("categories", [])))
+        cfg = rejoin_gcfg(GCFG, guild.id, archived)
+        # vues déjà enregistrées avant la connexion (register_startup_views) ? sinon : restauration complète
+        registered = STARTUP_VIEWS.pop(guild.id, None)
+        if registered is None:
+            # register ticket selector view
+            bot.add_view(ticket_view_for(guild.id, cfg))
+
+        # anciennes entrées indexées par nom (channel.name -> channel.id), sauvegardé en fin de on_ready
+        resolve_legacy_tickets_for_guild(cfg, guild)
 
-        # cleanup orphelins avant migration/restauration
+        # cleanup orphelins avant restauration
         try:
             await cleanup_orphan_tickets_for_guild(cfg, guild)
         except Exception:
             logger.exception("Erreur lors du nettoyage orphelin pour la guilde %s", guild.id)
 
-        # MIGRATE old open_tickets (channel.name -> channel.id) if needed
-        try:
-            await migrate_open_tickets_for_guild(cfg, guild)
-        except Exception:
-            logger.exception("Erreur lors de la migration open_tickets pour la guilde %s", guild.id)
-
         # restore TicketActionsView for open tickets (if possible)
-        ot = cfg.get("open_tickets", {}) or {}
-        for ch_key, info in ot.items():
+        for ch_key, info in cfg.open_tickets.items():
             try:
-                try:
-                    channel = guild.get_channel(int(ch_key))
-                except Exception:
-                    channel = None
+                channel = guild.get_channel(info.channel_id)
                 if not channel:
                     continue
-                msg_id = info.get("message_id")
+                msg_id = info.message_id
                 if not msg_id:
                     continue
+                view = registered.get(msg_id) if registered is not None else None
+                if view is not None and not info.claimed_by:
+                    continue    # rien à mettre à jour dans l'embed
                 try:
-                    msg = await channel.fetch_message(int(msg_id))
+                    msg = await channel.fetch_message(msg_id)
                 except Exception:
                     continue
-                owner = guild.get_member(int(info.get("owner_id"))) if info.get("owner_id") else None
-                view = TicketActionsView(cfg, info.get("category"), owner, channel.id)
+                owner = guild.get_member(info.owner_id) if info.owner_id else None
+                if view is None:
+                    view = TicketActionsView(cfg, info.category, owner, channel.id)
                 # if already claimed, set embed status accordingly (ONLY update the status field, keep description)
-                if info.get("claimed_by"):
+                if info.claimed_by:
                     try:
                         embed = msg.embeds[0] if msg.embeds else None
                         if embed:
-                            claimant = guild.get_member(int(info.get("claimed_by"))) if info.get("claimed_by") else None
-
-                            # récupération du role si configuré (on n'insère PAS sa mention dans l'embed)
-                            role = None
-                            for c in cfg.get("categories", []):
-                                if c.get("label") == info.get("category"):
-                                    nid = c.get("notify_role_id")
-                                    if nid:
-                                        role = guild.get_role(int(nid))
-                                    break
+                            claimant = guild.get_member(info.claimed_by)
 
                             opener_name = owner.name if owner else 'Utilisateur'
                             # Reformater l'ouverture (SANS la mention du rôle)
@@ -1192,10 +1432,10 @@ async def on_ready():
                                 # best effort: detect existing opening by searching la phrase "a créé un ticket"
                                 for i, f in enumerate(embed.fields):
                                     val = (f.value or "")
-                                    if "a créé un ticket" in val and info.get("category") in val:
+                                    if "a créé un ticket" in val and (info.category or "") in val:
                                         # use mention if member still exists, else fallback to name
                                         opener_display = owner.mention if owner else (owner.name if owner else 'Utilisateur')
-                                        embed.set_field_at(i, name="\u200b", value=f"• {opener_display} a créé un ticket concernant les **{info.get('category')}** !", inline=False)
+                                        embed.set_field_at(i, name="\u200b", value=f"• {opener_display} a créé un ticket concernant les **{info.category}** !", inline=False)
                                         replaced_open = True
                                         # ensure separator right after opening
                                         if len(embed.fields) <= i + 1 or "----" not in (embed.fields[i + 1].value or ""):
@@ -1209,7 +1449,7 @@ async def on_ready():
                                     opener_display = owner.mention if owner else (owner.name if owner else 'Utilisateur')
                                     # insert opening at 0 and separator at 1 if not present
                                     try:
-                                        embed.insert_field_at(0, name="\u200b", value=f"• {opener_display} a créé un ticket concernant les **{info.get('category')}** !", inline=False)
+                                        embed.insert_field_at(0, name="\u200b", value=f"• {opener_display} a créé un ticket concernant les **{info.category}** !", inline=False)
                                     except Exception:
                                         pass
                                     try:
@@ -1220,7 +1460,7 @@ async def on_ready():
                             except Exception:
                                 try:
                                     opener_name = owner.name if owner else 'Utilisateur'
-                                    embed.description = f"**{opener_name} a créé un ticket concernant {info.get('category')}**"
+                                    embed.description = f"**{opener_name} a créé un ticket concernant {info.category}**"
                                 except Exception:
                                     pass
 
@@ -1235,13 +1475,17 @@ async def on_ready():
                     except Exception:
                         logger.exception("Erreur pendant la restauration d'un ticket pris en charge")
                 try:
-                    bot.add_view(view, message_id=int(msg_id))
+                    bot.add_view(view, message_id=msg_id)
                 except Exception:
                     bot.add_view(view)
             except Exception:
                 logger.exception("Erreur lors de la restauration d'un ticket au démarrage")
+        HEALTH.restore_step()
 
     await save_config(GCFG)
+    HEALTH.end_restore()
+    if ARCHIVE_AFTER_DAYS > 0 and not any(t.get_name() == "sweep_departed_guilds" for t in BACKGROUND_TASKS):
+        spawn_background(sweep_departed_guilds()).set_name("sweep_departed_guilds")
     try:
         await bot.tree.sync()
     except Exception:
@@ -1270,11 +1514,8 @@ async def _update_support_message_view_for_guild(guild: discord.Guild, categorie
     """
     cfg = get_gcfg(GCFG, guild.id)
     ch = None
-    if cfg.get("support_channel_id"):
-        try:
-            ch = guild.get_channel(int(cfg["support_channel_id"]))
-        except Exception:
-            ch = None
+    if cfg.support_channel_id:
+        ch = guild.get_channel(cfg.support_channel_id)
     if not ch:
         ch = discord.utils.get(guild.text_channels, name=DEFAULT_SUPPORT_CHANNEL_NAME)
     if not ch:
@@ -1301,89 +1542,87 @@ async def _update_support_message_view_for_guild(guild: discord.Guild, categorie
 
 @bot.tree.command(name="modify-category", description="Modifier le titre, description ou emoji d'une catégorie")
 @app_commands.describe(old_label="Titre actuel de la catégorie", new_label="Nouveau titre (laisser vide pour ne pas changer)", new_description="Nouvelle description (laisser vide pour ne pas changer)", new_emoji="Nouvel emoji (laisser vide pour ne pas changer)")
+@instrument("/modify-category")
 async def modify_category(interaction: discord.Interaction, old_label: str, new_label: str = None, new_description: str = None, new_emoji: str = None):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
 
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    categories = cfg.get("categories", [])
+    categories = cfg.categories
     # find category (case-insensitive)
-    idx = None
-    for i, c in enumerate(categories):
-        if c.get("label", "").lower() == old_label.lower():
-            idx = i
-            break
+    idx, cat = cfg.find_category(old_label)
     if idx is None:
         await interaction.response.send_message("⚠️ Catégorie introuvable.", ephemeral=True)
         return
 
-    cat = categories[idx]
-    old_label_real = cat.get("label")
+    old_label_real = cat.label
 
     # Check uniqueness if renaming
-    if new_label and any(c.get("label","").lower() == new_label.lower() for i2,c in enumerate(categories) if i2 != idx):
+    if new_label and any(c.label.lower() == new_label.lower() for i2,c in enumerate(categories) if i2 != idx):
         await interaction.response.send_message("⚠️ Une autre catégorie porte déjà ce nom.", ephemeral=True)
         return
 
+    # première modification : la guilde reçoit sa propre copie des catégories par défaut
+    cat = cfg.own_categories()[idx]
     changed = []
     if new_label and new_label.strip():
-        cat["label"] = new_label.strip()
+        cat.label = new_label.strip()
         changed.append("nom")
     if new_description is not None and new_description != "":
-        cat["description"] = new_description
+        cat.description = new_description
         changed.append("description")
     if new_emoji is not None:
         stored_emoji = new_emoji if (new_emoji and new_emoji.strip()) else " "
-        cat["emoji"] = stored_emoji
+        cat.emoji = stored_emoji
         changed.append("emoji")
 
     # persist changes
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
 
     # Update any open_tickets entries that referenced the old label
     updated_tickets = 0
-    for key, entry in (cfg.get("open_tickets", {}) or {}).items():
+    for key, entry in cfg.open_tickets.items():
         try:
-            if entry.get("category") == old_label_real:
-                entry["category"] = cat["label"]
+            if entry.category == old_label_real:
+                entry.category = cat.label
                 updated_tickets += 1
 
                 # update channel topic if present
-                cid = entry.get("channel_id")
+                cid = entry.channel_id
                 if cid:
-                    ch = interaction.guild.get_channel(int(cid))
+                    ch = interaction.guild.get_channel(cid)
                     if ch and isinstance(ch.topic, str) and ch.topic.startswith("ticket_category:"):
                         try:
-                            await ch.edit(topic=f"ticket_category:{cat['label']}")
+                            await ch.edit(topic=f"ticket_category:{cat.label}")
                         except Exception:
                             logger.exception("Impossible de mettre à jour le topic du channel %s", ch.id)
 
                 # try to update the message embed title/status if possible (best-effort)
                 try:
-                    msg_id = entry.get("message_id")
+                    msg_id = entry.message_id
                     if cid and msg_id:
-                        ch = interaction.guild.get_channel(int(cid))
+                        ch = interaction.guild.get_channel(cid)
                         if ch:
                             try:
-                                msg = await ch.fetch_message(int(msg_id))
+                                msg = await ch.fetch_message(msg_id)
                                 if msg and msg.embeds:
                                     embed = msg.embeds[0]
                                     # update title if it matches old label
                                     try:
                                         if (embed.title or "") == old_label_real:
-                                            embed.title = cat["label"]
+                                            embed.title = cat.label
                                         # also update opening line if it contains the old label
                                         for i_field, f in enumerate(embed.fields):
                                             if isinstance(f.value, str) and old_label_real in f.value:
-                                                new_val = f.value.replace(old_label_real, cat["label"])
+                                                new_val = f.value.replace(old_label_real, cat.label)
                                                 embed.set_field_at(i_field, name=f.name or "\u200b", value=new_val, inline=f.inline)
                                                 break
                                     except Exception:
                                         pass
                                     try:
-                                        await msg.edit(embed=embed, view=TicketView(interaction.guild.id, cfg.get("categories", [])))
+                                        await msg.edit(embed=embed, view=TicketView(interaction.guild.id, cfg.categories))
                                     except Exception:
                                         logger.exception("Impossible d'éditer le message du ticket %s", msg.id)
                             except Exception:
@@ -1396,7 +1635,7 @@ async def modify_category(interaction: discord.Interaction, old_label: str, new_
 
     # Try to update the support message view so the selector reflects the new names/order
     try:
-        await _update_support_message_view_for_guild(interaction.guild, cfg.get("categories", []))
+        await _update_support_message_view_for_guild(interaction.guild, cfg.categories)
     except Exception:
         logger.exception("Erreur lors de la mise à jour du message support après modification de catégorie")
 
@@ -1405,23 +1644,20 @@ async def modify_category(interaction: discord.Interaction, old_label: str, new_
 
 @bot.tree.command(name="move-category", description="Déplacer une catégorie à une position donnée (1 = première)")
 @app_commands.describe(label="Titre de la catégorie à déplacer", position="Nouvelle position (1 = en haut)")
+@instrument("/move-category")
 async def move_category(interaction: discord.Interaction, label: str, position: int):
     if not is_admin(interaction):
         await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
         return
 
     cfg = get_gcfg(GCFG, interaction.guild.id)
-    cats = cfg.get("categories", [])
+    cats = cfg.categories
     if not cats:
         await interaction.response.send_message("⚠️ Aucune catégorie configurée.", ephemeral=True)
         return
 
     # find index
-    idx = None
-    for i, c in enumerate(cats):
-        if c.get("label", "").lower() == label.lower():
-            idx = i
-            break
+    idx, _ = cfg.find_category(label)
     if idx is None:
         await interaction.response.send_message("⚠️ Catégorie introuvable.", ephemeral=True)
         return
@@ -1433,22 +1669,23 @@ async def move_category(interaction: discord.Interaction, label: str, position:
         return
 
     # move
+    cats = cfg.own_categories()
     cat = cats.pop(idx)
     cats.insert(pos - 1, cat)
-    cfg["categories"] = cats
     await save_config(GCFG)
-    bot.add_view(TicketView(interaction.guild.id, cfg.get("categories", [])))
+    bot.add_view(TicketView(interaction.guild.id, cfg.categories))
 
     # update support message view
     try:
-        updated = await _update_support_message_view_for_guild(interaction.guild, cfg.get("categories", []))
+        updated = await _update_support_message_view_for_guild(interaction.guild, cfg.categories)
     except Exception:
         updated = False
 
-    await interaction.response.send_message(f"✅ Catégorie **{cat.get('label')}** déplacée en position {pos}." + ("" if updated else " (Le message support n'a pas pu être mis à jour automatiquement — utiliser /send-embed si nécessaire)"), ephemeral=True)
+    await interaction.response.send_message(f"✅ Catégorie **{cat.label}** déplacée en position {pos}." + ("" if updated else " (Le message support n'a pas pu être mis à jour automatiquement — utiliser /send-embed si nécessaire)"), ephemeral=True)
 
 
 @bot.tree.command(name="help", description="Affiche l'aide des commandes FastSupport")
+@instrument("/help")
 async def help_support(interaction: discord.Interaction):
     embed = discord.Embed(
         title="🆘 FastSupport — Aide",
@@ -1468,7 +1705,10 @@ async def help_support(interaction: discord.Interaction):
             "• `/remove-category` — Supprimer une catégorie\n"
             "• `/modify-category` — Modifier une catégorie\n"
             "• `/move-category` — Changer l’ordre des catégories\n"
-            "• `/list-categories` — Voir les catégories configurés"
+            "• `/list-categories` — Voir les catégories configurés\n"
+            "• `/perf-stats` — Latences des commandes et boutons\n"
+            "• `/rest-stats` — Appels à l’API Discord et budget de rate-limit\n"
+            "• `/compact-config` — Archiver les guildes quittées (propriétaire du bot)"
         ),
         inline=False
     )
@@ -1495,7 +1735,8 @@ async def help_support(interaction: discord.Interaction):
         "• `!close` — Fermer le ticket\n"
         "• `!add @user` — Ajouter un membre au ticket\n"
         "• `!remove @user` — Retirer un membre du ticket\n"
-        "• `!rename <nom>` — Renommer le ticket"
+        "• `!rename <nom>` — Renommer le ticket\n"
+        "• `/ticket-search` — Rechercher dans les tickets fermés"
 
     ),
     inline=False
@@ -1508,7 +1749,7 @@ async def help_support(interaction: discord.Interaction):
 
 # ---------------- Helpers + commands (slash + prefix) : close / rename / add / remove ----------------
 
-def _user_has_ticket_manage_privs(user: discord.Member, guild: discord.Guild, gcfg: dict, entry: dict) -> bool:
+def _user_has_ticket_manage_privs(user: discord.Member, guild: discord.Guild, gcfg: GuildConfig, entry: Ticket) -> bool:
     """
     Retourne True si l'utilisateur peut gérer/fermer/renommer/ajouter/retirer sur ce ticket.
     Logique identique à celle utilisée ailleurs (admin / claim / close_role_ids / legacy staff role).
@@ -1521,24 +1762,13 @@ def _user_has_ticket_manage_privs(user: discord.Member, guild: discord.Guild, gc
         pass
 
     # claim (celui qui a pris en charge)
-    try:
-        if entry and entry.get("claimed_by") and int(entry["claimed_by"]) == int(user.id):
-            return True
-    except Exception:
-        pass
+    if entry and entry.claimed_by == user.id:
+        return True
 
     # category close roles
-    try:
-        cat_label = entry.get("category") if entry else None
-        for c in (gcfg.get("categories", []) or []):
-            if c.get("label") == cat_label:
-                close_ids = c.get("close_role_ids", []) or []
-                user_role_ids = {r.id for r in user.roles}
-                if any(rid in user_role_ids for rid in close_ids):
-                    return True
-                break
-    except Exception:
-        pass
+    c = gcfg.category(entry.category) if entry else None
+    if c is not None and _member_has_any_role_id(user, c.close_role_ids):
+        return True
 
     # legacy staff role
     try:
@@ -1553,18 +1783,18 @@ def _user_has_ticket_manage_privs(user: discord.Member, guild: discord.Guild, gc
 
 async def _get_ticket_entry_and_gcfg(channel: discord.TextChannel):
     """
-    Retourne (entry, gcfg) si channel est connu dans open_tickets (clé = str(channel.id)).
+    Retourne (entry, gcfg) si channel est connu dans open_tickets (clé = channel.id).
     entry peut être None même si gcfg existe.
     """
     gcfg = get_gcfg(GCFG, channel.guild.id)
-    key = str(channel.id)
-    entry = (gcfg.get("open_tickets", {}) or {}).get(key)
+    entry = gcfg.open_tickets.get(channel.id)
     return entry, gcfg
 
 
 # ---------------- Slash commands: ticket-close / ticket-rename / ticket-add / ticket-remove ----------------
 
 @bot.tree.command(name="ticket-close", description="🔒 Fermer ce ticket (doit être exécuté depuis le salon ticket)")
+@instrument("/ticket-close")
 async def ticket_close(interaction: discord.Interaction):
     channel = interaction.channel
     guild = interaction.guild
@@ -1578,52 +1808,45 @@ async def ticket_close(interaction: discord.Interaction):
         await interaction.response.send_message("⚠️ Ce salon ne semble pas être un ticket.", ephemeral=True)
         return
 
-    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry):
         await interaction.response.send_message("⛔ Tu n'as pas la permission de fermer ce ticket.", ephemeral=True)
         return
 
-    # log
-    log_channel = await get_or_create_log_channel(guild)
-    if log_channel:
-        try:
-            owner_mention = "inconnu"
-            if entry and entry.get("owner_id"):
-                try:
-                    owner = guild.get_member(int(entry.get("owner_id")))
-                    owner_mention = owner.mention if owner else "inconnu"
-                except Exception:
-                    owner_mention = "inconnu"
-            embed = discord.Embed(
-                title="📁 Ticket fermé",
-                description=(
-                    f"**Salon :** {channel.name}\n**Fermé par :** {interaction.user.mention}\n"
-                    f"**Utilisateur :** {owner_mention}\n"
-                    f"**Heure :** {datetime.utcnow().isoformat()} UTC"
-                ),
-                color=discord.Color.red()
-            )
-            await log_channel.send(embed=embed)
-        except Exception:
-            logger.exception("Impossible d'envoyer le log de fermeture")
-
     # cleanup persisted open_tickets
     try:
-        key = str(channel.id)
-        if key in gcfg.get("open_tickets", {}):
-            del gcfg["open_tickets"][key]
+        if gcfg.open_tickets.pop(channel.id, None) is not None:
             await save_config(GCFG)
     except Exception:
         logger.exception("Erreur lors du cleanup open_tickets pour ticket-close")
 
     await interaction.response.send_message("🔒 Ticket fermé — suppression du salon.", ephemeral=True)
+    # log après l'accusé de réception : put() peut attendre (backpressure) jusqu'à put_timeout
     try:
-        await channel.delete()
+        owner_mention = "inconnu"
+        if entry and entry.owner_id:
+            try:
+                owner = guild.get_member(entry.owner_id)
+                owner_mention = owner.mention if owner else "inconnu"
+            except Exception:
+                owner_mention = "inconnu"
+        embed = discord.Embed(
+            title="📁 Ticket fermé",
+            description=(
+                f"**Salon :** {channel.name}\n**Fermé par :** {interaction.user.mention}\n"
+                f"**Utilisateur :** {owner_mention}\n"
+                f"**Heure :** {datetime.utcnow().isoformat()} UTC"
+            ),
+            color=discord.Color.red()
+        )
+        await send_log_embed(guild, embed)
     except Exception:
-        logger.exception("Impossible de supprimer le channel lors de ticket-close")
+        logger.exception("Impossible d'envoyer le log de fermeture")
+    await archive_and_delete_ticket(channel, ticket_header(entry, "close", interaction.user), entry)
 
 
 @bot.tree.command(name="ticket-rename", description="✏️ Renommer complètement le salon du ticket")
 @app_commands.describe(new_name="Nouveau nom du salon")
+@instrument("/ticket-rename")
 async def ticket_rename(interaction: discord.Interaction, new_name: str):
     channel = interaction.channel
     guild = interaction.guild
@@ -1637,7 +1860,7 @@ async def ticket_rename(interaction: discord.Interaction, new_name: str):
         await interaction.response.send_message("⚠️ Ce salon ne semble pas être un ticket.", ephemeral=True)
         return
 
-    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry):
         await interaction.response.send_message("⛔ Tu n'as pas la permission de renommer ce ticket.", ephemeral=True)
         return
 
@@ -1657,19 +1880,13 @@ async def ticket_rename(interaction: discord.Interaction, new_name: str):
         await interaction.response.send_message("❌ Erreur lors du renommage.", ephemeral=True)
         return
 
-    try:
-        if entry:
-            entry["channel_name"] = candidate
-            await save_config(GCFG)
-    except Exception:
-        logger.exception("Erreur lors de la sauvegarde après renommage")
-
     await interaction.response.send_message(f"✅ Salon renommé en `{candidate}`.", ephemeral=True)
 
 
 # ---------------- Slash: /ticket-add ----------------
 @bot.tree.command(name="ticket-add", description="➕ Ajouter un utilisateur visible au ticket (permission view/send)")
 @app_commands.describe(member="Utilisateur à ajouter au ticket")
+@instrument("/ticket-add")
 async def ticket_add(interaction: discord.Interaction, member: discord.Member):
     channel = interaction.channel
     guild = interaction.guild
@@ -1683,7 +1900,7 @@ async def ticket_add(interaction: discord.Interaction, member: discord.Member):
         await interaction.response.send_message("⚠️ Ce salon ne semble pas être un ticket.", ephemeral=True)
         return
 
-    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry):
         await interaction.response.send_message("⛔ Tu n'as pas la permission d'ajouter un utilisateur à ce ticket.", ephemeral=True)
         return
 
@@ -1721,6 +1938,7 @@ async def ticket_add(interaction: discord.Interaction, member: discord.Member):
 # ---------------- Slash: /ticket-remove ----------------
 @bot.tree.command(name="ticket-remove", description="➖ Retirer un utilisateur du ticket (retire overwrite explicite)")
 @app_commands.describe(member="Utilisateur à retirer du ticket")
+@instrument("/ticket-remove")
 async def ticket_remove(interaction: discord.Interaction, member: discord.Member):
     channel = interaction.channel
     guild = interaction.guild
@@ -1734,7 +1952,7 @@ async def ticket_remove(interaction: discord.Interaction, member: discord.Member
         await interaction.response.send_message("⚠️ Ce salon ne semble pas être un ticket.", ephemeral=True)
         return
 
-    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(interaction.user, guild, gcfg, entry):
         await interaction.response.send_message("⛔ Tu n'as pas la permission de retirer un utilisateur de ce ticket.", ephemeral=True)
         return
 
@@ -1768,10 +1986,184 @@ async def ticket_remove(interaction: discord.Interaction, member: discord.Member
         except Exception:
             pass
 
+# ---------------- Slash: /perf-stats ----------------
+@bot.tree.command(name="perf-stats", description="⏱️ Latences p50/p95/p99 par handler sur les 10 dernières minutes (admin only)")
+@app_commands.describe(handler="Filtrer sur un nom de handler (ex: ticket, /add)")
+@instrument("/perf-stats")
+async def perf_stats(interaction: discord.Interaction, handler: str = None):
+    if not is_admin(interaction):
+        await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
+        return
+    table = stats_table(name_filter=handler)
+    if table.count("\n") == 0:
+        await interaction.response.send_message("Aucune mesure sur les 10 dernières minutes.", ephemeral=True)
+        return
+    embed = discord.Embed(
+        title="⏱️ Performances (ms, fenêtre 10 min)",
+        description=f"```\n{table[:4000]}\n```",
+        color=discord.Color.from_rgb(54, 57, 63)
+    )
+    embed.set_footer(text="REST = attente API Discord • persist = save_config")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+# ---------------- Slash: /rest-stats ----------------
+@bot.tree.command(name="rest-stats", description="📡 Appels à l'API Discord par route depuis le démarrage (admin only)")
+@app_commands.describe(tout_le_bot="Toutes les guildes (propriétaire du bot uniquement)")
+@instrument("/rest-stats")
+async def rest_stats(interaction: discord.Interaction, tout_le_bot: bool = False):
+    if not is_admin(interaction):
+        await interaction.response.send_message("❌ Tu dois être administrateur pour utiliser cette commande.", ephemeral=True)
+        return
+    if tout_le_bot and not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("❌ Vue globale réservée au propriétaire du bot.", ephemeral=True)
+        return
+    acc = metrics.REST_ACCOUNTING
+    guild_id = None if tout_le_bot else interaction.guild.id
+    routes = acc.by_route(guild_id)
+    if not routes:
+        await interaction.response.send_message("Aucun appel REST enregistré depuis le démarrage.", ephemeral=True)
+        return
+    calls = sum(u.calls for u in routes.values())
+    limited = sum(u.ratelimited for u in routes.values())
+    uptime_min = max(1.0, (time.time() - acc.started_at) / 60.0)
+    embed = discord.Embed(
+        title="📡 API Discord — " + ("tout le bot" if tout_le_bot else interaction.guild.name),
+        description=f"```\n{acc.table(guild_id)[:4000]}\n```",
+        color=discord.Color.from_rgb(54, 57, 63)
+    )
+    embed.add_field(name="Appels", value=f"{calls} ({calls / uptime_min:.1f}/min)", inline=True)
+    embed.add_field(name="429", value=str(limited), inline=True)
+    if tout_le_bot:
+        top = sorted(acc.by_guild().items(), key=lambda kv: kv[1], reverse=True)[:5]
+        lines = []
+        for gid, n in top:
+            g = bot.get_guild(gid) if gid else None
+            lines.append(f"{g.name if g else (gid or 'hors guilde')} — {n}")
+        embed.add_field(name="Guildes les plus consommatrices", value="\n".join(lines), inline=False)
+    embed.set_footer(text="budget = X-RateLimit-Remaining/Limit du dernier appel • Ko = réponses reçues")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+# ---------------- Slash: /compact-config ----------------
+@bot.tree.command(name="compact-config", description="🗜️ Archive les guildes quittées par le bot (propriétaire du bot uniquement)")
+@app_commands.describe(jours="Délai depuis le départ du bot (défaut : FASTSUPPORT_ARCHIVE_AFTER_DAYS)")
+@instrument("/compact-config")
+async def compact_config_command(interaction: discord.Interaction, jours: app_commands.Range[int, 0, 3650] = None):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("❌ Réservé au propriétaire du bot.", ephemeral=True)
+        return
+    days = jours if jours is not None else max(0, ARCHIVE_AFTER_DAYS)
+    await interaction.response.defer(ephemeral=True)
+    try:
+        result = await compact_config(GCFG, days)
+    except Exception:
+        logger.exception("Erreur lors de /compact-config")
+        await interaction.followup.send("⚠️ Erreur pendant l'archivage (voir les logs).", ephemeral=True)
+        return
+    left = len(GCFG.left_guilds())
+    embed = discord.Embed(
+        title="🗜️ Compaction de la config",
+        description=f"Guildes quittées depuis plus de {days} jour(s) déplacées dans `{GUILD_ARCHIVE_DIR}`.",
+        color=discord.Color.from_rgb(54, 57, 63)
+    )
+    embed.add_field(name="Guildes archivées", value=str(result["guilds"]), inline=True)
+    embed.add_field(name="Octets retirés", value=f"{result['bytes']:,}".replace(",", " "), inline=True)
+    embed.add_field(name="Guildes en config", value=str(len(GCFG)), inline=True)
+    embed.add_field(name="En délai de grâce", value=str(left), inline=True)
+    embed.add_field(name="Archive", value=f"{len(GCFG.archived_ids())} guildes • {GCFG.archive_size() / 1024:.1f} Ko", inline=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+# ---------------- Slash: /ticket-search ----------------
+def build_search_embed(guild: discord.Guild, total: int, results: list, page: int) -> discord.Embed:
+    pages = max(1, -(-total // SEARCH_PAGE_SIZE))
+    embed = discord.Embed(
+        title="🔎 Recherche de tickets",
+        description=f"{total} ticket(s) trouvé(s)." if total else "Aucun ticket trouvé.",
+        color=discord.Color.from_rgb(54, 57, 63)
+    )
+    for r in results:
+        owner = f"<@{r['owner_id']}>" if r.get("owner_id") else "inconnu"
+        closed_at = (r.get("closed_at") or "")[:16].replace("T", " ")
+        value = f"**Utilisateur :** {owner}\n**Catégorie :** {r.get('category') or '—'}\n**Fermé le :** {closed_at} UTC"
+        if r.get("snippet"):
+            value += f"\n> {r['snippet'][:300]}"
+        embed.add_field(name=f"#{r.get('channel_name') or r.get('channel_id')}", value=value, inline=False)
+    embed.set_footer(text=f"Page {page}/{pages}")
+    return embed
+
+
+class SearchResultsView(discord.ui.View):
+    def __init__(self, author_id: int, guild: discord.Guild, query: str, owner_id: int, category: str, page: int, total: int):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.guild = guild
+        self.query = query
+        self.owner_id = owner_id
+        self.category = category
+        self.page = page
+        self.total = total
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        pages = max(1, -(-self.total // SEARCH_PAGE_SIZE))
+        self.previous.disabled = self.page <= 1
+        self.next.disabled = self.page >= pages
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("⛔ Cette recherche ne t'appartient pas.", ephemeral=True)
+            return
+        self.page = page
+        self.total, results = await TRANSCRIPT_INDEX.search(
+            self.guild.id, self.query, self.owner_id, self.category,
+            limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE
+        )
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=build_search_embed(self.guild, self.total, results, page), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    @instrument("button:search_previous")
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, max(1, self.page - 1))
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    @instrument("button:search_next")
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+
+@bot.tree.command(name="ticket-search", description="🔎 Rechercher dans les tickets fermés (utilisateur, catégorie, mots)")
+@app_commands.describe(query="Mots recherchés dans les messages", user="Auteur du ticket", category="Catégorie du ticket", page="Page de résultats")
+@instrument("/ticket-search")
+async def ticket_search(interaction: discord.Interaction, query: str = None, user: discord.User = None, category: str = None, page: int = 1):
+    guild = interaction.guild
+    gcfg = get_gcfg(GCFG, guild.id)
+    if not user_can_manage_tickets(interaction.user, guild, gcfg):
+        await interaction.response.send_message("⛔ Tu n'as pas la permission de rechercher dans les tickets.", ephemeral=True)
+        return
+
+    page = max(1, page)
+    owner_id = user.id if user else None
+    try:
+        total, results = await TRANSCRIPT_INDEX.search(
+            guild.id, query, owner_id, category,
+            limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE
+        )
+    except Exception:
+        logger.exception("Erreur lors de la recherche dans l'index des transcripts")
+        await interaction.response.send_message("❌ Recherche impossible (requête invalide ?).", ephemeral=True)
+        return
+
+    view = SearchResultsView(interaction.user.id, guild, query, owner_id, category, page, total)
+    await interaction.response.send_message(embed=build_search_embed(guild, total, results, page), view=view, ephemeral=True)
+
+
  # ---------------- Prefix: +close----------------
 
 @bot.command(name="close")
 @commands.guild_only()
+@instrument("!close")
 async def plus_close(ctx: commands.Context):
     """+close — fermer et supprimer ce ticket (doit être exécuté dans le salon ticket)."""
     channel = ctx.channel
@@ -1786,44 +2178,38 @@ async def plus_close(ctx: commands.Context):
         await ctx.send("⚠️ Ce salon ne semble pas être un ticket.")
         return
 
-    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry):
         await ctx.send("⛔ Tu n'as pas la permission de fermer ce ticket.")
         return
 
     # log
-    log_channel = await get_or_create_log_channel(guild)
-    if log_channel:
-        try:
-            embed = discord.Embed(
-                title="📁 Ticket fermé",
-                description=(
-                    f"**Salon :** {channel.name}\n**Fermé par :** {ctx.author.mention}\n"
-                    f"**Heure :** {datetime.utcnow().isoformat()} UTC"
-                ),
-                color=discord.Color.red()
-            )
-            await log_channel.send(embed=embed)
-        except Exception:
-            logger.exception("Impossible d'envoyer le log de fermeture")
+    try:
+        embed = discord.Embed(
+            title="📁 Ticket fermé",
+            description=(
+                f"**Salon :** {channel.name}\n**Fermé par :** {ctx.author.mention}\n"
+                f"**Heure :** {datetime.utcnow().isoformat()} UTC"
+            ),
+            color=discord.Color.red()
+        )
+        await send_log_embed(guild, embed)
+    except Exception:
+        logger.exception("Impossible d'envoyer le log de fermeture")
 
     try:
-        key = str(channel.id)
-        if key in gcfg.get("open_tickets", {}):
-            del gcfg["open_tickets"][key]
+        if gcfg.open_tickets.pop(channel.id, None) is not None:
             await save_config(GCFG)
     except Exception:
         logger.exception("Erreur lors du cleanup open_tickets pour +close")
 
     await ctx.send("🔒 Ticket fermé — suppression du salon.")
-    try:
-        await channel.delete()
-    except Exception:
-        logger.exception("Impossible de supprimer le channel lors de +close")
+    await archive_and_delete_ticket(channel, ticket_header(entry, "close", ctx.author), entry)
 
 
 # ---------------- Prefix: +add ----------------
 @bot.command(name="add")
 @commands.guild_only()
+@instrument("!add")
 async def plus_add(ctx: commands.Context, member: discord.Member):
     """+add @user — ajouter l'utilisateur au ticket (view/send)."""
     channel = ctx.channel
@@ -1838,7 +2224,7 @@ async def plus_add(ctx: commands.Context, member: discord.Member):
         await ctx.send("⚠️ Ce salon ne semble pas être un ticket.")
         return
 
-    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry):
         await ctx.send("⛔ Tu n'as pas la permission d'ajouter un utilisateur à ce ticket.")
         return
 
@@ -1869,6 +2255,7 @@ async def plus_add(ctx: commands.Context, member: discord.Member):
 # ---------------- Prefix: +remove ----------------
 @bot.command(name="remove")
 @commands.guild_only()
+@instrument("!remove")
 async def plus_remove(ctx: commands.Context, member: discord.Member):
     """+remove @user — retirer l'utilisateur du ticket (supprime overwrite explicite)."""
     channel = ctx.channel
@@ -1883,7 +2270,7 @@ async def plus_remove(ctx: commands.Context, member: discord.Member):
         await ctx.send("⚠️ Ce salon ne semble pas être un ticket.")
         return
 
-    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry):
         await ctx.send("⛔ Tu n'as pas la permission de retirer un utilisateur de ce ticket.")
         return
 
@@ -1915,6 +2302,7 @@ async def plus_remove(ctx: commands.Context, member: discord.Member):
 
 @bot.command(name="rename")
 @commands.guild_only()
+@instrument("!rename")
 async def plus_rename(ctx: commands.Context, *, new_name: str):
     """+rename <nouveau nom> — renomme complètement le salon du ticket."""
     channel = ctx.channel
@@ -1929,7 +2317,7 @@ async def plus_rename(ctx: commands.Context, *, new_name: str):
         await ctx.send("⚠️ Ce salon ne semble pas être un ticket.")
         return
 
-    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry or {}):
+    if not _user_has_ticket_manage_privs(ctx.author, guild, gcfg, entry):
         await ctx.send("⛔ Tu n'as pas la permission de renommer ce ticket.")
         return
 
@@ -1952,18 +2340,239 @@ async def plus_rename(ctx: commands.Context, *, new_name: str):
         return
     
 
-    
-    # sauvegarde si ticket persistant
+    await ctx.send(f"✅ Salon renommé en `{candidate}`.")
+
+# ---------- Run ----------
+
+# ---------------- Standby (bail de leader) ----------------
+WARM_VIEWS = {}     # guild_id -> (clé des catégories, TicketView) préparées par le standby
+STARTUP_VIEWS = {}  # guild_id -> {message_id: TicketActionsView} enregistrées avant la connexion
+
+
+def _categories_key(cfg: GuildConfig) -> tuple:
+    return tuple(c.key() for c in cfg.categories)
+
+
+def ticket_view_for(guild_id: int, cfg: GuildConfig) -> TicketView:
+    """TicketView de la guilde ; celle préparée en standby est reprise si les catégories n'ont pas changé."""
+    warm = WARM_VIEWS.pop(guild_id, None)
+    if warm is not None and warm[0] == _categories_key(cfg):
+        return warm[1]
+    return TicketView(guild_id, cfg.categories)
+
+
+async def warm_caches():
+    """Standby : configs parsées et TicketView construites à l'avance (dans la limite du cache LRU)."""
+    t0 = time.perf_counter()
+    gids = list(GCFG.keys())
+    if CONFIG_CACHE_GUILDS:
+        gids = gids[:CONFIG_CACHE_GUILDS]
+    for i, gid in enumerate(gids):
+        cfg = GCFG.get(gid)
+        if cfg is not None and not cfg.left_at:
+            WARM_VIEWS[gid] = (_categories_key(cfg), TicketView(gid, cfg.categories))
+        if i % 200 == 199:
+            await asyncio.sleep(0)
+    logger.info("Standby : %d guildes préchargées en %.1f s", len(WARM_VIEWS), time.perf_counter() - t0)
+
+
+def register_startup_views():
+    """
+    Avant la connexion : vues persistantes enregistrées depuis la config (sélecteur + une
+    TicketActionsView par ticket ouvert), sans fetch_message ; on_ready ne relit que les tickets
+    pris en charge (mise à jour de l'embed).
+    """
+    t0 = time.perf_counter()
+    bot.add_view(CloseTicketView())
+    n = 0
+    for gid in list(GCFG.keys()):
+        try:
+            cfg = GCFG.get(gid)
+            if cfg is None or cfg.left_at:
+                continue
+            bot.add_view(ticket_view_for(gid, cfg))
+            views = STARTUP_VIEWS[gid] = {}
+            for info in cfg.open_tickets.values():
+                if not info.message_id:
+                    continue
+                view = TicketActionsView(cfg, info.category, None, info.channel_id, owner_id=info.owner_id)
+                bot.add_view(view, message_id=info.message_id)
+                views[info.message_id] = view
+                n += 1
+        except Exception:
+            logger.exception("Impossible d'enregistrer les vues de la guilde %s avant la connexion", gid)
+    logger.info("Vues persistantes : %d guildes, %d tickets enregistrés en %.1f s",
+                len(STARTUP_VIEWS), n, time.perf_counter() - t0)
+
+
+async def run_standby(lease: LeaderLease):
+    """Attend la fin du bail du leader, caches chauds et config tenue à jour."""
+    HEALTH.set_role("standby")
+    await warm_caches()
+    leader = lease.describe()
+    logger.info("Standby : leader %s (term %s), relais dès l'expiration de son bail", leader["holder"], leader["term"])
+    last_refresh = time.monotonic()
+    while not await lease.try_acquire_async():
+        if SHUTTING_DOWN:
+            return False
+        await asyncio.sleep(LEASE_POLL)
+        if time.monotonic() - last_refresh > STANDBY_REFRESH:
+            last_refresh = time.monotonic()
+            try:
+                # fusion en place : les configs déjà parsées restent en mémoire ; attente du verrou
+                # (sauvegarde du leader en cours) sans bloquer la boucle
+                async with GCFG.lock.hold_async(timeout=CONFIG_LOCK_TIMEOUT):
+                    GCFG.refresh()
+            except LockTimeout:
+                logger.warning("Standby : config verrouillée depuis %.0f s, relecture reportée", CONFIG_LOCK_TIMEOUT)
+            except Exception:
+                logger.exception("Standby : impossible de relire la config")
+    logger.info("Standby : relais pris, connexion à la gateway")
+    return True
+
+
+async def keep_leadership(lease: LeaderLease):
+    """Renouvelle le bail ; s'il a été pris par un standby (boucle bloquée trop longtemps...), on s'arrête."""
+    while True:
+        await asyncio.sleep(lease.ttl / 3)
+        try:
+            still_leader = await lease.renew_async()
+        except Exception:
+            logger.exception("Renouvellement du bail de leader impossible")
+            continue
+        if not still_leader:
+            logger.critical("Bail de leader perdu au profit d'un autre processus : arrêt")
+            await bot.close()
+            return
+
+
+# ---------------- Arrêt propre ----------------
+SHUTTING_DOWN = False
+SHUTDOWN_TASK = None
+# tâches de fond sans fin : annulées à l'arrêt au lieu d'être attendues
+DAEMON_TASKS = ("sweep_departed_guilds", "keep_leadership")
+
+
+def request_shutdown(reason: str):
+    """Gestionnaire de signal : lance l'arrêt propre une seule fois."""
+    global SHUTDOWN_TASK
+    if SHUTDOWN_TASK is None:
+        SHUTDOWN_TASK = asyncio.create_task(graceful_shutdown(reason))
+
+
+async def graceful_shutdown(reason: str):
+    """
+    Plus de nouveaux tickets, interactions en cours terminées (dans la limite de SHUTDOWN_TIMEOUT),
+    logs groupés et transcripts envoyés, dernière sauvegarde atomique de la config, puis déconnexion.
+    """
+    global SHUTTING_DOWN
+    if SHUTTING_DOWN:
+        return
+    SHUTTING_DOWN = True
+    HEALTH.shutting_down = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SHUTDOWN_TIMEOUT
+    t0 = time.perf_counter()
+    logger.info("Arrêt demandé (%s) : plus de nouveaux tickets, %d interaction(s) en cours",
+                reason, len(ACTIVE_HANDLERS))
     try:
-        if entry:
-            entry["channel_name"] = candidate
+        # 1) interactions en cours (ouverture / fermeture de ticket...)
+        while ACTIVE_HANDLERS and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if ACTIVE_HANDLERS:
+            logger.warning("Arrêt : %d interaction(s) toujours en cours après %.0f s : %s", len(ACTIVE_HANDLERS),
+                           SHUTDOWN_TIMEOUT, ", ".join(sorted(set(ACTIVE_HANDLERS.values()))))
+
+        # 2) logs groupés en attente, puis uploads de transcripts et autres tâches de fond
+        try:
+            await asyncio.wait_for(LOG_QUEUE.flush(), max(0.1, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            logger.warning("Arrêt : logs groupés non envoyés dans le délai")
+        except Exception:
+            logger.exception("Arrêt : impossible de vider la file de logs")
+        pending = [t for t in BACKGROUND_TASKS if t.get_name() not in DAEMON_TASKS]
+        if pending:
+            _, not_done = await asyncio.wait(pending, timeout=max(0.1, deadline - loop.time()))
+            if not_done:
+                logger.warning("Arrêt : %d tâche(s) de fond abandonnée(s)", len(not_done))
+
+        # 3) instantané final de la config (même hors délai : c'est ce qui doit survivre)
+        if HEALTH.role != "standby":
             await save_config(GCFG)
+            logger.info("Arrêt : interactions terminées et config sauvegardée en %.1f s", time.perf_counter() - t0)
     except Exception:
-        logger.exception("Erreur lors de la sauvegarde après renommage")
-
-    await ctx.send(f"✅ Salon renommé en `{candidate}`.")
+        logger.exception("Erreur pendant l'arrêt propre")
+    finally:
+        for task in list(BACKGROUND_TASKS):
+            task.cancel()
+        await bot.close()
+
+
+async def main():
+    if TRACE_FILE:
+        tracing.configure(TRACE_FILE, max_bytes=TRACE_MAX_BYTES, backup_count=TRACE_BACKUPS)
+    logger.info("Démarrage (%s) : %d guildes en config", SHARDS.describe(), len(GCFG))
+    async with bot:
+        # serveur HTTP (keep-alive) dans la même boucle que le bot
+        http_server = await keep_alive(bot, port=HTTP_PORT)
+        HEALTH.lag.start()
+        watchdog = StallWatchdog(threshold=STALL_THRESHOLD_MS / 1000.0)
+        watchdog.start()
+        recorder = None
+        if RECORD_FILE:
+            # noms créés par le bot conservés en clair : le rejeu retrouve ses salons / rôles
+            recorder = TrafficRecorder(RECORD_FILE, max_bytes=RECORD_MAX_BYTES, keep_names=(
+                "@everyone", STAFF_ROLE, TICKET_CATEGORY_NAME, LOG_CHANNEL_NAME, DEFAULT_SUPPORT_CHANNEL_NAME))
+            recorder.start()
+            # lignes copiées telles quelles : les guildes ne sont pas chargées (cf. CONFIG_CACHE_GUILDS)
+            recorder.record_config(GCFG.raw_snapshot())
+            recorder.attach(bot._connection)
+        lease = None
+        if LEADER_LEASE_FILE:
+            suffix = f".shards-{format_shard_ids(SHARDS.shard_ids)}" if SHARDS.shard_ids else ""
+            lease = LeaderLease(LEADER_LEASE_FILE + suffix, ttl=LEASE_TTL)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, request_shutdown, sig.name)
+            except (NotImplementedError, RuntimeError):     # Windows : Ctrl+C -> KeyboardInterrupt
+                pass
+        try:
+            if lease is None:
+                await bot.login(TOKEN)
+                register_startup_views()
+                await bot.connect()
+            else:
+                # login (REST) dès maintenant : seul le leader se connecte à la gateway
+                await bot.login(TOKEN)
+                if await lease.try_acquire_async() or await run_standby(lease):
+                    HEALTH.set_role("leader")
+                    spawn_background(keep_leadership(lease)).set_name("keep_leadership")
+                    register_startup_views()
+                    await bot.connect()
+        finally:
+            if SHUTDOWN_TASK is not None:
+                await SHUTDOWN_TASK
+            # bail rendu après la dernière sauvegarde : le standby repart de la config à jour
+            if lease is not None:
+                await lease.release_async()
+            if recorder is not None:
+                recorder.close()
+            await watchdog.stop()
+            await HEALTH.lag.stop()
+            await http_server.stop()
+            for close in (TRANSCRIPT_INDEX.close, ATTACHMENT_STORE.close, GCFG.close):
+                try:
+                    result = close()
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception:
+                    logger.exception("Arrêt : erreur à la fermeture (%s)", close.__qualname__)
+            tracing.shutdown()
 
-# ---------- Run ----------
 
-keep_alive()
-bot.run(TOKEN)
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,186 @@
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import secrets
+import time
+
+
+logger = logging.getLogger("fastsupport.tracing")
+
+# Spans au format OTLP/JSON (un span par ligne, avec sa ressource) : chargeables hors-ligne
+# (jq, pandas, ou reconverties en ExportTraceServiceRequest pour Jaeger/Tempo).
+SERVICE_NAME = "fastsupport"
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_span_logger = logging.getLogger("fastsupport.tracing.spans")
+_span_logger.propagate = False
+_span_logger.setLevel(logging.INFO)
+_listener = None
+
+# span en cours dans la tâche courante (copié dans les sous-tâches gather/create_task)
+_CURRENT_SPAN = contextvars.ContextVar("fastsupport_current_span", default=None)
+
+
+def _attr_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encode les int64 en chaîne (les snowflakes Discord dépassent 2**53)
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message")
+
+    def __init__(self, name: str, parent=None, kind: str = "INTERNAL", attributes=None):
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else ""
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+
+    def to_otlp(self) -> dict:
+        return {
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _attr_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+def enabled() -> bool:
+    return _listener is not None
+
+
+def current_span():
+    return _CURRENT_SPAN.get()
+
+
+def current_trace_id():
+    sp = _CURRENT_SPAN.get()
+    return sp.trace_id if sp is not None else None
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str = "INTERNAL", new_trace: bool = False, **attributes):
+    """
+    Ouvre un span enfant du span courant (ou une nouvelle trace si `new_trace`
+    ou s'il n'y a pas de span en cours). Ne fait rien si le traçage est désactivé.
+    """
+    if _listener is None:
+        yield None
+        return
+    parent = None if new_trace else _CURRENT_SPAN.get()
+    sp = Span(name, parent, kind, attributes)
+    token = _CURRENT_SPAN.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.record_error(e)
+        raise
+    finally:
+        _CURRENT_SPAN.reset(token)
+        sp.end_ns = time.time_ns()
+        _export(sp)
+
+
+def _export(sp: Span):
+    try:
+        _span_logger.info(json.dumps(sp.to_otlp(), ensure_ascii=False, separators=(",", ":")))
+    except Exception:
+        logger.exception("Impossible d'exporter le span %s", sp.name)
+
+
+def _traced_requests(original):
+    async def request(route, *args, **kwargs):
+        if _listener is None:
+            return await original(route, *args, **kwargs)
+        with span(
+            f"discord {route.method} {route.path}",
+            kind="CLIENT",
+            **{
+                "http.request.method": route.method,
+                "discord.route": route.key,
+                "discord.guild_id": route.guild_id,
+                "discord.channel_id": route.channel_id,
+            },
+        ):
+            return await original(route, *args, **kwargs)
+    return request
+
+
+def instrument_http(http):
+    """Enveloppe `HTTPClient.request` : un span CLIENT par appel à l'API REST Discord."""
+    http.request = _traced_requests(http.request)
+    return http
+
+
+def instrument_webhooks(adapter=None):
+    """Idem pour les réponses d'interaction / followups (adaptateur webhook de discord.py)."""
+    if adapter is None:
+        from discord.webhook.async_ import async_context
+        adapter = async_context.get()
+    adapter.request = _traced_requests(adapter.request)
+    return adapter
+
+
+def configure(path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    """
+    Active l'export des spans vers `path` (JSONL avec rotation). L'écriture disque se fait
+    dans un thread (QueueListener) : la boucle asyncio ne fait qu'empiler la ligne.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    q = queue.SimpleQueue()
+    _span_logger.handlers[:] = [logging.handlers.QueueHandler(q)]
+    _listener = logging.handlers.QueueListener(q, handler)
+    _listener.start()
+    logger.info("Traçage activé : spans exportés dans %s", path)
+
+
+def shutdown():
+    """Vide la file et ferme le fichier de spans."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
+    _span_logger.handlers[:] = []
@@ -0,0 +1,314 @@
+import copy
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger("fastsupport.recorder")
+
+# Format de l'enregistrement (JSONL, une ligne par événement) :
+#   {"e": "HEADER", "v": 1, "started": "..."}
+#   {"t": 0.0, "e": "CONFIG", "d": {...}}                 config des guildes (anonymisée)
+#   {"t": 12.345, "e": "INTERACTION_CREATE", "d": {...}}   t = secondes depuis le début
+# Les payloads sont réduits aux champs utiles au rejeu (benchmarks/replay.py).
+FORMAT_VERSION = 1
+
+RECORDED_EVENTS = (
+    "READY",
+    "GUILD_CREATE",
+    "GUILD_DELETE",
+    "CHANNEL_CREATE",
+    "CHANNEL_DELETE",
+    "MESSAGE_CREATE",
+    "INTERACTION_CREATE",
+)
+
+# snowflakes Discord : 15 à 21 chiffres (y compris dans les custom_id et les mentions)
+_SNOWFLAKE_RE = re.compile(r"(?<!\d)\d{15,21}(?!\d)")
+# texte libre saisi par les utilisateurs / admins : remplacé par des « x » (longueur conservée)
+TEXT_KEYS = frozenset({"content", "username", "global_name", "nick", "name", "topic", "description",
+                       "channel_name", "value", "title"})
+# champs de profil (hashes d'avatar, e-mail...) : supprimés (valeur null)
+DROPPED_KEYS = frozenset({"avatar", "banner", "icon", "splash", "avatar_decoration_data", "email", "clan",
+                          "primary_guild", "collectibles", "banner_color", "accent_color"})
+# champs numériques qui ne sont pas des IDs (bitfields de permissions...)
+RAW_KEYS = frozenset({"permissions", "allow", "deny", "flags", "type", "position", "size"})
+
+
+class Anonymizer:
+    """
+    Pseudonymise les IDs (HMAC avec un secret propre à l'enregistrement, jamais écrit) :
+    un même ID donne toujours le même pseudonyme dans un fichier, mais rien ne permet de
+    remonter à l'ID réel ni de relier deux enregistrements. Le texte libre est masqué.
+    """
+
+    def __init__(self, secret: bytes = None, keep_names=()):
+        self._secret = secret or secrets.token_bytes(32)
+        self._cache = {}
+        self.keep_names = frozenset(keep_names)
+
+    def snowflake(self, value) -> str:
+        value = str(value)
+        anon = self._cache.get(value)
+        if anon is None:
+            digest = hmac.new(self._secret, value.encode("ascii"), hashlib.sha256).digest()
+            anon = self._cache[value] = str((int.from_bytes(digest[:8], "big") & ((1 << 63) - 1)) or 1)
+        return anon
+
+    def text(self, value: str) -> str:
+        if value in self.keep_names:
+            return value
+        return "x" * len(value)
+
+    def ids_in(self, value: str) -> str:
+        return _SNOWFLAKE_RE.sub(lambda m: self.snowflake(m.group(0)), value)
+
+    def __call__(self, obj, key: str = None):
+        if isinstance(obj, dict):
+            return {self.ids_in(k): self(v, k) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self(v, key) for v in obj]
+        if key in DROPPED_KEYS:
+            return None
+        if key in RAW_KEYS:
+            return obj
+        if isinstance(obj, str):
+            return self.text(obj) if key in TEXT_KEYS else self.ids_in(obj)
+        if isinstance(obj, int) and not isinstance(obj, bool) and obj >= 10 ** 14:
+            return int(self.snowflake(obj))
+        return obj
+
+    def command_data(self, data: dict) -> dict:
+        """Données d'une commande slash : noms de commande / d'options conservés, valeurs texte masquées."""
+        out = {k: self(v, k) for k, v in data.items() if k not in ("name", "options")}
+        if "name" in data:
+            out["name"] = data["name"]
+        if "options" in data:
+            out["options"] = [self._option(o) for o in data["options"]]
+        return out
+
+    def _option(self, option: dict) -> dict:
+        out = {"name": option.get("name"), "type": option.get("type")}
+        if "value" in option:
+            value = option["value"]
+            # type 3 = chaîne saisie par l'utilisateur ; les autres types sont des nombres / IDs
+            out["value"] = self.text(value) if option.get("type") == 3 and isinstance(value, str) else self(value)
+        if "focused" in option:
+            out["focused"] = option["focused"]
+        if "options" in option:
+            out["options"] = [self._option(o) for o in option["options"]]
+        return out
+
+
+# ---------------- Réduction des payloads (dans la boucle : copies, pas de sérialisation) ----------------
+def _compact_guild(d: dict, initial: bool) -> dict:
+    return {
+        "id": d.get("id"),
+        "name": d.get("name") or "",
+        "owner_id": d.get("owner_id"),
+        "initial": initial,
+        "member_count": d.get("member_count"),
+        "roles": [{k: r.get(k) for k in ("id", "name", "permissions", "position")} for r in d.get("roles") or []],
+        "channels": [_compact_channel(c) for c in d.get("channels") or []],
+    }
+
+
+def _compact_channel(d: dict) -> dict:
+    return {
+        "id": d.get("id"),
+        "guild_id": d.get("guild_id"),
+        "type": d.get("type"),
+        "name": d.get("name") or "",
+        "parent_id": d.get("parent_id"),
+        "position": d.get("position"),
+        "permission_overwrites": copy.deepcopy(d.get("permission_overwrites") or []),
+    }
+
+
+def _compact_message(d: dict) -> dict:
+    author = d.get("author") or {}
+    return {
+        "id": d.get("id"),
+        "channel_id": d.get("channel_id"),
+        "guild_id": d.get("guild_id"),
+        "author_id": author.get("id"),
+        "bot": bool(author.get("bot")),
+        "content_len": len(d.get("content") or ""),
+        "attachments": [a.get("size") or 0 for a in d.get("attachments") or []],
+        "embeds": len(d.get("embeds") or []),
+    }
+
+
+def _compact_interaction(d: dict) -> dict:
+    member = d.get("member") or {}
+    user = member.get("user") or d.get("user") or {}
+    out = {
+        "id": d.get("id"),
+        "type": d.get("type"),
+        "guild_id": d.get("guild_id"),
+        "channel_id": d.get("channel_id") or (d.get("channel") or {}).get("id"),
+        "user_id": user.get("id"),
+        "roles": list(member.get("roles") or []),
+        "data": copy.deepcopy(d.get("data") or {}),
+    }
+    message = d.get("message")
+    if message:
+        out["message_id"] = message.get("id")
+    return out
+
+
+class TrafficRecorder:
+    """
+    Enregistre les événements gateway traités par le bot (interactions, messages, salons,
+    guildes) dans un JSONL compact et anonymisé, rejouable avec benchmarks/replay.py.
+
+    Les parseurs de discord.py sont enveloppés (pas besoin de enable_debug_events) : la
+    boucle ne fait qu'extraire quelques champs ; l'anonymisation, la sérialisation et
+    l'écriture se font dans un thread. Chaque démarrage ajoute une session au fichier (HEADER,
+    CONFIG...) ; l'enregistrement s'arrête quand le fichier atteint `max_bytes`, sessions
+    précédentes comprises.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 200 * 1024 * 1024, keep_names=(), events=RECORDED_EVENTS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.events = tuple(events)
+        self.anonymizer = Anonymizer(keep_names=keep_names)
+        self.full = False
+        self.recorded = 0
+        self._t0 = time.monotonic()
+        self._queue = queue.SimpleQueue()
+        self._state = None
+        self._originals = {}
+        self._thread = None
+
+    # ---------------- Cycle de vie ----------------
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._t0 = time.monotonic()
+        self._thread = threading.Thread(target=self._writer, name="fastsupport-traffic-recorder", daemon=True)
+        self._thread.start()
+        self._queue.put({"e": "HEADER", "v": FORMAT_VERSION, "started": datetime.now(timezone.utc).isoformat()})
+        logger.info("Enregistrement du trafic dans %s", self.path)
+
+    def attach(self, state):
+        """Enveloppe les parseurs gateway de `state` (bot._connection)."""
+        self._state = state
+        for event in self.events:
+            original = state.parsers.get(event)
+            if original is None:
+                continue
+            self._originals[event] = original
+            state.parsers[event] = self._wrap(event, original)
+
+    def detach(self):
+        if self._state is not None:
+            self._state.parsers.update(self._originals)
+        self._originals = {}
+        self._state = None
+
+    def close(self):
+        """Restaure les parseurs, vide la file et ferme le fichier."""
+        self.detach()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10.0)
+            self._thread = None
+
+    def record_config(self, cfg):
+        """
+        Instantané de la config des guildes (le rejeu en a besoin pour reproduire les tickets) :
+        dict au format config_to_dict, ou objet avec to_dict() (config_store.RawSnapshot), converti
+        dans le thread d'écriture.
+        """
+        self._put("CONFIG", cfg if hasattr(cfg, "to_dict") else copy.deepcopy(cfg))
+
+    # ---------------- Capture ----------------
+    def _wrap(self, event: str, original):
+        def parser(data):
+            if not self.full:
+                try:
+                    self._capture(event, data)
+                except Exception:
+                    logger.exception("Enregistrement de l'événement %s impossible", event)
+            return original(data)
+        return parser
+
+    def _capture(self, event: str, data: dict):
+        if event == "INTERACTION_CREATE":
+            compact = _compact_interaction(data)
+        elif event == "MESSAGE_CREATE":
+            if not data.get("guild_id"):
+                return
+            compact = _compact_message(data)
+        elif event in ("CHANNEL_CREATE", "CHANNEL_DELETE"):
+            if not data.get("guild_id"):
+                return
+            compact = _compact_channel(data)
+        elif event == "GUILD_CREATE":
+            # guilde annoncée indisponible par READY = chargement initial ; sinon = ajout du bot
+            existing = self._state._get_guild(int(data["id"])) if self._state is not None else None
+            compact = _compact_guild(data, initial=existing is not None and existing.unavailable)
+        elif event == "GUILD_DELETE":
+            compact = {"id": data.get("id"), "unavailable": bool(data.get("unavailable"))}
+        elif event == "READY":
+            compact = {"user_id": (data.get("user") or {}).get("id"), "guilds": len(data.get("guilds") or [])}
+        else:
+            compact = copy.deepcopy(data)
+        self._put(event, compact)
+
+    def _put(self, event: str, data: dict):
+        self._queue.put({"t": round(time.monotonic() - self._t0, 3), "e": event, "d": data})
+
+    # ---------------- Écriture (thread) ----------------
+    def _anonymize(self, record: dict) -> dict:
+        data = record.get("d")
+        if data is None:
+            return record
+        if hasattr(data, "to_dict"):
+            data = data.to_dict()
+        if record["e"] == "INTERACTION_CREATE" and record["d"].get("type") in (2, 4):
+            command = data.pop("data")
+            data = dict(self.anonymizer(data), data=self.anonymizer.command_data(command))
+        else:
+            data = self.anonymizer(data)
+        return dict(record, d=data)
+
+    def _writer(self):
+        # fichier ouvert en ajout : max_bytes borne le fichier, pas seulement cette session
+        try:
+            written = os.path.getsize(self.path)
+        except OSError:
+            written = 0
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                try:
+                    line = json.dumps(self._anonymize(record), ensure_ascii=False, separators=(",", ":")) + "\n"
+                except Exception:
+                    logger.exception("Sérialisation de l'événement %s impossible", record.get("e"))
+                    continue
+                written += len(line.encode("utf-8"))
+                if written > self.max_bytes:
+                    self.full = True
+                    logger.warning("Enregistrement du trafic arrêté : %s a atteint %d octets", self.path, self.max_bytes)
+                    # vide la file sans écrire jusqu'à la fermeture
+                    while self._queue.get() is not None:
+                        pass
+                    break
+                f.write(line)
+                self.recorded += 1
+                if self._queue.empty():
+                    f.flush()
@@ -0,0 +1,151 @@
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+import discord
+
+import tracing
+
+
+logger = logging.getLogger("fastsupport.transcripts")
+
+# nombre de messages sérialisés avant chaque écriture disque (= une page d'historique Discord)
+PAGE_SIZE = 100
+# taille d'un morceau uploadé dans le salon de log (sous la limite d'upload par défaut)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def message_record(msg: discord.Message) -> dict:
+    """Sérialise un message en une ligne de transcript (JSON)."""
+    return {
+        "type": "message",
+        "id": msg.id,
+        "author_id": msg.author.id,
+        "author": str(msg.author),
+        "bot": bool(getattr(msg.author, "bot", False)),
+        "created_at": msg.created_at.isoformat(),
+        "edited_at": msg.edited_at.isoformat() if msg.edited_at else None,
+        "content": msg.content,
+        "embeds": [e.to_dict() for e in msg.embeds],
+        "attachments": [
+            {"filename": a.filename, "size": a.size, "content_type": a.content_type, "url": a.url}
+            for a in msg.attachments
+        ],
+    }
+
+
+def transcript_path(directory: str, guild_id: int, channel_id: int) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    return os.path.join(directory, str(guild_id), f"{channel_id}-{stamp}.jsonl.gz")
+
+
+async def export_transcript(channel: discord.TextChannel, directory: str, header: dict, index=None, attachments=None) -> str:
+    """
+    Exporte l'historique complet de `channel` en JSONL compressé (gzip) et retourne le chemin.
+
+    L'historique est parcouru page par page (du plus ancien au plus récent) et chaque page
+    est écrite sur disque avant de lire la suivante : la mémoire utilisée ne dépend pas de
+    la longueur de la conversation. La première ligne contient `header` (métadonnées du ticket).
+    Si `index` (TranscriptIndex) est fourni, chaque page y est indexée au fil de l'export.
+    Si `attachments` (AttachmentStore) est fourni, les pièces jointes de chaque page sont
+    archivées avant l'écriture de la page et référencées par leur SHA-256.
+    """
+    loop = asyncio.get_running_loop()
+    path = transcript_path(directory, channel.guild.id, channel.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    head = dict(header, type="ticket", guild_id=channel.guild.id, channel_id=channel.id,
+                channel_name=channel.name, exported_at=datetime.utcnow().isoformat())
+    ticket_ref = None
+    if index is not None:
+        try:
+            ticket_ref = await index.begin(head)
+        except Exception:
+            logger.exception("Impossible d'indexer le transcript du salon %s", channel.id)
+
+    async def write_page(gz, records, files):
+        if files:
+            with tracing.span("attachments_save", **{"fastsupport.files": len(files)}):
+                refs = await asyncio.gather(*(attachments.save(a) for _, a in files))
+            for (att_rec, _), ref in zip(files, refs):
+                att_rec["sha256"] = ref["sha256"]
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        with tracing.span("transcript_write", **{"fastsupport.messages": len(records), "fastsupport.bytes": len(data)}):
+            await loop.run_in_executor(None, gz.write, data)
+        if ticket_ref is not None:
+            try:
+                with tracing.span("search_index_add", **{"fastsupport.messages": len(records)}):
+                    await index.add_messages(ticket_ref, records)
+            except Exception:
+                logger.exception("Erreur d'indexation d'une page du transcript %s", channel.id)
+
+    fd, tmp_path = tempfile.mkstemp(prefix="tmp_transcript_", suffix=".jsonl.gz", dir=os.path.dirname(path))
+    count = 0
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            await loop.run_in_executor(None, gz.write, (json.dumps(head, ensure_ascii=False) + "\n").encode("utf-8"))
+            page, files = [], []
+            async for msg in channel.history(limit=None, oldest_first=True):
+                rec = message_record(msg)
+                page.append(rec)
+                if attachments is not None:
+                    files.extend(zip(rec["attachments"], msg.attachments))
+                count += 1
+                if len(page) >= PAGE_SIZE:
+                    await write_page(gz, page, files)
+                    page, files = [], []
+            if page:
+                await write_page(gz, page, files)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # historique illisible (Forbidden, salon supprimé, réseau...) : rien ne doit rester dans l'index
+        if ticket_ref is not None:
+            try:
+                await asyncio.shield(index.discard(ticket_ref))
+            except Exception:
+                logger.exception("Impossible de retirer de l'index le transcript %s", channel.id)
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+
+    if ticket_ref is not None:
+        try:
+            await index.finish(ticket_ref, path, count)
+        except Exception:
+            logger.exception("Impossible de finaliser l'index du transcript %s", channel.id)
+
+    logger.info("Transcript exporté: %s (%d messages)", path, count)
+    return path
+
+
+def _read_chunk(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+async def upload_transcript(log_channel: discord.TextChannel, path: str, *, chunk_size: int = UPLOAD_CHUNK_SIZE, label: str = None):
+    """
+    Envoie le transcript dans le salon de log, découpé en morceaux de `chunk_size` octets
+    (un seul morceau en mémoire à la fois). Les morceaux se recollent avec `cat`.
+    """
+    loop = asyncio.get_running_loop()
+    total = os.path.getsize(path)
+    parts = max(1, -(-total // chunk_size))
+    name = os.path.basename(path)
+    for i in range(parts):
+        data = await loop.run_in_executor(None, _read_chunk, path, i * chunk_size, chunk_size)
+        filename = name if parts == 1 else f"{name}.{i + 1:03d}"
+        content = None
+        if i == 0:
+            content = f"🧾 Transcript {label or name}" + (f" ({parts} parties)" if parts > 1 else "")
+        await log_channel.send(content=content, file=discord.File(io.BytesIO(data), filename=filename))